@@ -0,0 +1,223 @@
+# dataset/integrity.py
+"""
+Verifies the scanning{n} directories of a run with a pool of processes.
+
+    python dataset/integrity.py "/media/dawid/blensor data/jan20252" --workers 32
+
+Every scene directory is checked for:
+    - a complete test_{n}.txt: parseable, with the scene index and at least one object
+    - a scene description: a scene.json (see runtime/specs.py) or a scene.blend
+      with a valid header, as .blend files are only saved for sampled scenes
+    - every scan as a non-empty .evd (or .pcq) file, which is streamed to check
+      the record layout and that all coordinates are finite and within
+      'bound_factor * scene_size' of the origin
+    - no scan that failed its final QA check (see postprocessing/qa.py)
+
+Writes one JSON report per scene (integrity.jsonl) and the indices of the
+scenes to regenerate (regenerate.txt) to the run directory. Only the
+headers and the scans are read, so the check is bound by reading the
+scans once, which the workers do in parallel.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import functools
+import multiprocessing
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import EVD_DTYPE, EVD_TERMINATOR, iter_evd
+from postprocessing.codec import PointCloudDecoder
+from postprocessing.utils import read_scene_metadata, scene_metadata_filepath
+from runtime.specs import read_scene_spec, scene_spec_filepath
+
+config = SystemConfiguration()
+
+BLEND_MAGIC = b"BLENDER"
+
+
+def scene_index(scene_dir):
+    suffix = os.path.basename(os.path.normpath(scene_dir))[len("scanning"):]
+    return int(suffix) if suffix.isdigit() else None
+
+
+def _check_evd(filepath, bound):
+    size = os.path.getsize(filepath)
+    rest = size % EVD_DTYPE.itemsize
+    if rest not in (0, len(EVD_TERMINATOR)):
+        return None, f"{os.path.basename(filepath)} is truncated ({size} bytes)"
+    if rest:
+        with open(filepath, "rb") as file:
+            file.seek(-rest, os.SEEK_END)
+            if file.read() != EVD_TERMINATOR:
+                return None, f"{os.path.basename(filepath)} has a broken terminator"
+    return _check_points(filepath, (np.column_stack((r["x"], r["y"], r["z"])) for r in iter_evd(filepath)), bound)
+
+
+def _check_pcq(filepath, bound):
+    blocks = PointCloudDecoder(filepath).iter_blocks()
+    return _check_points(filepath, (np.column_stack((b["x"], b["y"], b["z"])) for b in blocks), bound)
+
+
+def _check_scan(filepath, bound):
+    """
+    Streams a .evd or .pcq scan. A scan that can't be read or decoded is a problem of the scene, not of the check.
+    """
+    check = _check_pcq if filepath.endswith(".pcq") else _check_evd
+    try:
+        return check(filepath, bound)
+    except Exception as error:
+        return None, f"{os.path.basename(filepath)} is unreadable: {type(error).__name__}: {error}"
+
+
+def _check_points(filepath, chunks, bound):
+    points = 0
+    for xyz in chunks:
+        points += len(xyz)
+        if not np.all(np.isfinite(xyz)):
+            return points, f"{os.path.basename(filepath)} holds non-finite coordinates"
+        if len(xyz) and np.abs(xyz).max() > bound:
+            return points, f"{os.path.basename(filepath)} holds points beyond {bound:.3f}"
+    if points == 0:
+        return 0, f"{os.path.basename(filepath)} is empty"
+    return points, None
+
+
+def check_scene(scene_dir, scan_names=("scan1", "scan2", "scan3"), bound_factor=None):
+    """
+    Checks a single scanning{n} directory.
+
+    Returns:
+        dict: "scene" (index), "dir", "ok", "problems" (list of str),
+              "points" (per scan) and "seconds" spent on the check.
+    """
+    if bound_factor is None:
+        bound_factor = config.get("integrity_bound_factor", 4.0)
+    start_time = time.time()
+    n = scene_index(scene_dir)
+    problems = []
+    points = {}
+
+    metadata = None
+    try:
+        metadata = read_scene_metadata(scene_metadata_filepath(scene_dir))
+    except (OSError, ValueError, SyntaxError) as error:
+        problems.append(f"test_{n}.txt: {error}")
+    if metadata is not None:
+        if metadata["scene"] != n:
+            problems.append(f"test_{n}.txt describes scene {metadata['scene']}")
+        if not metadata["objects"]:
+            problems.append(f"test_{n}.txt lists no objects")
+
+    spec_filepath = scene_spec_filepath(scene_dir)
+    blend_filepath = os.path.join(scene_dir, "scene.blend")
+    if os.path.exists(spec_filepath):
+        try:
+            spec = read_scene_spec(spec_filepath)
+            if metadata is not None and len(spec["objects"]) != len(metadata["objects"]):
+                problems.append(f"scene.json and test_{n}.txt list different objects")
+        except (OSError, ValueError, KeyError) as error:
+            problems.append(f"scene.json: {error}")
+    if os.path.exists(blend_filepath):
+        try:
+            with open(blend_filepath, "rb") as file:
+                if file.read(len(BLEND_MAGIC)) != BLEND_MAGIC:
+                    problems.append("scene.blend is not a .blend file")
+        except OSError as error:
+            problems.append(f"scene.blend is unreadable: {error}")
+    elif not os.path.exists(spec_filepath):
+        problems.append("neither scene.json nor scene.blend exists")
+
+    if metadata is not None:
+        bound = bound_factor * metadata["scene_size"]
+        for name in scan_names:
+            evd_filepath = os.path.join(scene_dir, f"{name}.evd")
+            pcq_filepath = os.path.join(scene_dir, f"{name}.pcq")
+            if os.path.exists(evd_filepath):
+                points[name], problem = _check_scan(evd_filepath, bound)
+            elif os.path.exists(pcq_filepath):
+                points[name], problem = _check_scan(pcq_filepath, bound)
+            else:
+                points[name], problem = None, f"{name} is missing"
+            if problem is not None:
+                problems.append(problem)
+
+        final_decisions = {decision["scan"]: decision for decision in metadata["scan_qa"]}
+        for scan, decision in sorted(final_decisions.items()):
+            if not decision.get("passed", True):
+                problems.append(f"{scan} failed scan QA: {'; '.join(decision.get('reasons', []))}")
+
+    return {
+        "scene": n,
+        "dir": scene_dir,
+        "ok": not problems,
+        "problems": problems,
+        "points": points,
+        "seconds": round(time.time() - start_time, 4),
+    }
+
+
+def check_tree(root, workers=None, scan_names=("scan1", "scan2", "scan3"), bound_factor=None, report_filepath=None, regenerate_filepath=None):
+    """
+    Checks all scanning{n} directories of a run in 'workers' processes.
+
+    Returns:
+        list: The reports of the scenes that failed, sorted by scene index.
+    """
+    if workers is None:
+        workers = config.get("integrity_workers", 16)
+    report_filepath = report_filepath or os.path.join(root, "integrity.jsonl")
+    regenerate_filepath = regenerate_filepath or os.path.join(root, "regenerate.txt")
+    scene_dirs = [d for d in glob.glob(os.path.join(root, "scanning*")) if os.path.isdir(d) and scene_index(d) is not None]
+    check = functools.partial(check_scene, scan_names=tuple(scan_names), bound_factor=bound_factor)
+
+    failed = []
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        # Directories are independent, so their order doesn't matter
+        reports = pool.imap_unordered(check, scene_dirs, chunksize=8) if pool is not None else map(check, scene_dirs)
+        with open(report_filepath, "w") as report_file:
+            for report in reports:
+                report_file.write(json.dumps(report) + "\n")
+                if not report["ok"]:
+                    failed.append(report)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    failed.sort(key=lambda report: report["scene"])
+    with open(regenerate_filepath, "w") as file:
+        for report in failed:
+            file.write(f"{report['scene']}\n")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the output directories of a run and list the scenes to regenerate.")
+    parser.add_argument("root", help="Directory holding the scanning{n} directories.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--scans", nargs="+", default=["scan1", "scan2", "scan3"], help="Scan names every scene must have.")
+    parser.add_argument("--report", default=None, help="Per-scene JSON lines report, by default <root>/integrity.jsonl.")
+    parser.add_argument("--regenerate", default=None, help="List of scenes to regenerate, by default <root>/regenerate.txt.")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    failed = check_tree(args.root, args.workers, args.scans, report_filepath=args.report, regenerate_filepath=args.regenerate)
+    for report in failed:
+        print(f"scanning{report['scene']}: {'; '.join(report['problems'])}")
+    print(f"{len(failed)} scenes to regenerate, checked in {time.time() - start_time:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# dataset/loader.py
+"""
+Reader API for consumers of a generated dataset.
+
+Example:
+    >>> dataset = ScanDataset("/media/dawid/blensor data/jan20252")
+    >>> loader = BatchLoader(dataset, batch_size=32, points_per_scan=4096, seed=0)
+    >>> for epoch in range(10):
+    ...     loader.set_epoch(epoch)
+    ...     for batch in loader:
+    ...         train_step(batch["points"], batch["labels"])
+"""
+
+import os
+import sys
+import glob
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import read_evd
+from postprocessing.codec import PointCloudDecoder
+from postprocessing.utils import read_scene_metadata, scene_metadata_filepath
+
+config = SystemConfiguration()
+
+
+class ScanDataset:
+    """
+    Index over the scans of a run, one item per scan file.
+
+    Every scanning{n} directory contributes one item per name in 'scan_names'.
+    If a packed .pcq file (see postprocessing/codec.py) exists it is used,
+    otherwise the .evd file written by BlenSor. A .pcq file only holds the
+    noisy or the noise-free points, so if it holds the other ones than
+    'noisy' asks for, the .evd file is read instead.
+    """
+
+    def __init__(self, root, scan_names=("scan1", "scan2", "scan3"), noisy=True):
+        self.root = root
+        self.noisy = noisy
+        self.items = []
+        for scene_dir in sorted(glob.glob(os.path.join(root, "scanning*")), key=_scene_index):
+            for name in scan_names:
+                for extension in (".pcq", ".evd"):
+                    filepath = os.path.join(scene_dir, name + extension)
+                    if os.path.exists(filepath):
+                        self.items.append((scene_dir, filepath))
+                        break
+
+
+    def __len__(self):
+        return len(self.items)
+
+
+    def load(self, i):
+        """
+        Reads and decodes one scan.
+
+        Returns:
+            dict: "points" (N, 3) float32, "labels" (N,) int64 object ids,
+                  "scene_params" (dict parsed from test_{n}.txt) and "filepath".
+
+        Raises:
+            ValueError: If only a .pcq file with the wrong kind of points exists.
+        """
+        scene_dir, filepath = self.items[i]
+        if filepath.endswith(".pcq"):
+            decoder = PointCloudDecoder(filepath)
+            if decoder.index["noisy"] != self.noisy:
+                evd_filepath = os.path.splitext(filepath)[0] + ".evd"
+                if not os.path.exists(evd_filepath):
+                    kind = "noisy" if decoder.index["noisy"] else "noise-free"
+                    raise ValueError(f"{filepath} holds {kind} points and there is no .evd file to read the others from.")
+                filepath = evd_filepath
+        if filepath.endswith(".pcq"):
+            records = decoder.read()
+            points = np.column_stack((records["x"], records["y"], records["z"]))
+        else:
+            records = read_evd(filepath)
+            suffix = "_noise" if self.noisy else ""
+            points = np.column_stack((records["x" + suffix], records["y" + suffix], records["z" + suffix]))
+        return {
+            "points": points.astype(np.float32),
+            "labels": records["object_id"].astype(np.int64),
+            "scene_params": read_scene_metadata(scene_metadata_filepath(scene_dir)),
+            "filepath": filepath,
+        }
+
+
+class BatchLoader:
+    """
+    Iterates over a ScanDataset in fixed-size batches, decoding ahead in a thread pool.
+
+    Every scan is resampled to exactly 'points_per_scan' points (with
+    replacement if it has fewer), so a batch holds arrays of shape
+    (batch_size, points_per_scan, 3) and (batch_size, points_per_scan).
+
+    The order only depends on 'seed' and the epoch: the scan order is a seeded
+    permutation, results are consumed in submission order whatever thread
+    finishes first, and the shuffle buffer and the resampling use seeded
+    random states as well.
+    """
+
+    def __init__(
+            self,
+            dataset: ScanDataset,
+            batch_size: int,
+            points_per_scan: int,
+            seed: int = 0,
+            shuffle: bool = True,
+            shuffle_buffer: int = None,
+            workers: int = None,
+            prefetch: int = None,
+            drop_last: bool = False
+    ):
+        if batch_size < 1 or points_per_scan < 1:
+            raise ValueError("batch_size and points_per_scan must be positive.")
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.points_per_scan = points_per_scan
+        self.seed = seed
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer if shuffle_buffer is not None else config.get("loader_shuffle_buffer", 64)
+        self.workers = workers if workers is not None else config.get("loader_workers", 4)
+        self.prefetch = prefetch if prefetch is not None else config.get("loader_prefetch", 16)
+        self.drop_last = drop_last
+        self.epoch = 0
+
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.dataset) // self.batch_size
+        return (len(self.dataset) + self.batch_size - 1) // self.batch_size
+
+
+    def __iter__(self):
+        order = np.arange(len(self.dataset))
+        if self.shuffle:
+            order = np.random.RandomState([self.seed, self.epoch]).permutation(order)
+        buffer_state = np.random.RandomState([self.seed, self.epoch, 1])
+
+        batch = []
+        for sample in self._shuffled(self._prefetched(order), buffer_state):
+            batch.append(sample)
+            if len(batch) == self.batch_size:
+                yield self._collate(batch)
+                batch = []
+        if batch and not self.drop_last:
+            yield self._collate(batch)
+
+
+    def _load_sample(self, i):
+        sample = self.dataset.load(i)
+        n = len(sample["points"])
+        random_state = np.random.RandomState([self.seed, self.epoch, 2, i])
+        if n == 0:
+            picked = np.zeros(self.points_per_scan, dtype=np.int64)
+            sample["points"] = np.zeros((1, 3), dtype=np.float32)
+            sample["labels"] = np.zeros(1, dtype=np.int64)
+        else:
+            picked = random_state.choice(n, self.points_per_scan, replace=n < self.points_per_scan)
+        sample["points"] = sample["points"][picked]
+        sample["labels"] = sample["labels"][picked]
+        return sample
+
+
+    def _prefetched(self, order):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = collections.deque()
+            for i in order:
+                pending.append(executor.submit(self._load_sample, int(i)))
+                if len(pending) >= self.prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+    def _shuffled(self, samples, random_state):
+        if not self.shuffle or self.shuffle_buffer <= 1:
+            yield from samples
+            return
+        buffer = []
+        for sample in samples:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(sample)
+                continue
+            j = random_state.randint(len(buffer))
+            yield buffer[j]
+            buffer[j] = sample
+        random_state.shuffle(buffer)
+        yield from buffer
+
+
+    def _collate(self, samples):
+        return {
+            "points": np.stack([sample["points"] for sample in samples]),
+            "labels": np.stack([sample["labels"] for sample in samples]),
+            "scene_params": [sample["scene_params"] for sample in samples],
+            "filepaths": [sample["filepath"] for sample in samples],
+        }
+
+
+def _scene_index(scene_dir):
+    suffix = os.path.basename(scene_dir)[len("scanning"):]
+    return int(suffix) if suffix.isdigit() else -1
@@ -0,0 +1,110 @@
+# dataset/tests/test_integrity.py
+
+import os
+import json
+import unittest
+import tempfile
+import numpy as np
+from scanner import evd
+from postprocessing import codec
+from dataset.integrity import check_scene, check_tree
+
+OBJECT = {"type": "box", "location": [0, 0, 0], "rotation": [0, 0, 0], "size": [1, 1, 1]}
+
+
+def write_scene(root, n, points=100, scans=("scan1", "scan2", "scan3"), qa=None):
+    scene_dir = os.path.join(root, f"scanning{n}")
+    os.makedirs(scene_dir)
+    with open(os.path.join(scene_dir, f"test_{n}.txt"), "w") as file:
+        file.write(f"Scene: {n} at 1.00s\nscene_size: 2.500\n")
+        for decision in qa or []:
+            file.write(f"scan_qa: {decision}\n")
+        file.write("========================================================\nObjects generated:\n")
+        file.write(str(OBJECT) + "\n")
+    with open(os.path.join(scene_dir, "scene.json"), "w") as file:
+        json.dump({"version": 1, "scene": n, "seed": None, "objects": [OBJECT], "camera": {}}, file)
+
+    records = np.zeros(points, dtype=evd.EVD_DTYPE)
+    records["x"] = np.linspace(-1, 1, points)
+    for name in scans:
+        evd.write_evd(os.path.join(scene_dir, f"{name}.evd"), records)
+    return scene_dir
+
+
+class TestIntegrity(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_complete_scene_passes(self):
+        report = check_scene(write_scene(self.root, 0))
+        self.assertTrue(report["ok"], report["problems"])
+        self.assertEqual(report["points"], {"scan1": 100, "scan2": 100, "scan3": 100})
+
+    def test_packed_scan_is_accepted(self):
+        scene_dir = write_scene(self.root, 0)
+        codec.encode_evd(os.path.join(scene_dir, "scan2.evd"), os.path.join(scene_dir, "scan2.pcq"), 2.5)
+        os.remove(os.path.join(scene_dir, "scan2.evd"))
+        self.assertTrue(check_scene(scene_dir)["ok"])
+
+    def test_corrupt_packed_scan_is_reported(self):
+        scene_dir = write_scene(self.root, 0)
+        pcq_filepath = os.path.join(scene_dir, "scan2.pcq")
+        codec.encode_evd(os.path.join(scene_dir, "scan2.evd"), pcq_filepath, 2.5)
+        os.remove(os.path.join(scene_dir, "scan2.evd"))
+        with open(pcq_filepath, "r+b") as file:
+            data = bytearray(file.read())
+            data[len(data) // 3] ^= 0x10
+            file.seek(0)
+            file.write(data)
+        write_scene(self.root, 1)
+
+        failed = check_tree(self.root, workers=2)
+        self.assertEqual([report["scene"] for report in failed], [0])
+        self.assertIn("scan2.pcq is unreadable", failed[0]["problems"][0])
+
+    def test_broken_scans_are_reported(self):
+        scene_dir = write_scene(self.root, 0, scans=("scan1", "scan2"))
+        with open(os.path.join(scene_dir, "scan2.evd"), "ab") as file:
+            file.write(b"\0" * 10)
+        problems = check_scene(scene_dir)["problems"]
+        self.assertEqual(len(problems), 2)
+        self.assertTrue(any("truncated" in problem for problem in problems))
+        self.assertTrue(any("scan3 is missing" in problem for problem in problems))
+
+    def test_points_out_of_bounds_are_reported(self):
+        scene_dir = write_scene(self.root, 0)
+        records = evd.read_evd(os.path.join(scene_dir, "scan1.evd")).copy()
+        records["z"][5] = 100.0
+        evd.write_evd(os.path.join(scene_dir, "scan1.evd"), records)
+        self.assertIn("beyond", check_scene(scene_dir)["problems"][0])
+
+    def test_scene_without_description_and_failed_qa(self):
+        scene_dir = write_scene(self.root, 0, qa=[
+            {"scan": "scan1.evd", "attempt": 0, "passed": False, "reasons": ["0 points"]},
+            {"scan": "scan1.evd", "attempt": 1, "passed": True, "reasons": []},
+            {"scan": "scan2.evd", "attempt": 0, "passed": False, "reasons": ["0 points"]},
+        ])
+        os.remove(os.path.join(scene_dir, "scene.json"))
+        problems = check_scene(scene_dir)["problems"]
+        self.assertEqual(len(problems), 2)
+        self.assertIn("scan2.evd failed scan QA", problems[1])
+
+    def test_tree_lists_scenes_to_regenerate(self):
+        for n in range(12):
+            scene_dir = write_scene(self.root, n, points=0 if n in (3, 7) else 100)
+        os.remove(os.path.join(self.root, "scanning10", "test_10.txt"))
+        failed = check_tree(self.root, workers=2)
+        self.assertEqual([report["scene"] for report in failed], [3, 7, 10])
+        with open(os.path.join(self.root, "regenerate.txt")) as file:
+            self.assertEqual(file.read().split(), ["3", "7", "10"])
+        with open(os.path.join(self.root, "integrity.jsonl")) as file:
+            self.assertEqual(len(file.readlines()), 12)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
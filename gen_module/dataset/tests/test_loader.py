@@ -0,0 +1,75 @@
+# dataset/tests/test_loader.py
+
+import os
+import unittest
+import tempfile
+import numpy as np
+from scanner import evd
+from postprocessing import codec
+from dataset.loader import ScanDataset, BatchLoader
+
+
+def write_scene(root, n, points, packed=False):
+    scene_dir = os.path.join(root, f"scanning{n}")
+    os.makedirs(scene_dir)
+    with open(os.path.join(scene_dir, f"test_{n}.txt"), "w") as file:
+        file.write(f"Scene: {n} at 1.00s\nscene_size: 2.500\nObjects generated:\n")
+        file.write(str({"type": "box", "location": [0, 0, 0], "rotation": [0, 0, 0], "size": [1, 1, 1]}) + "\n")
+
+    records = np.zeros(points, dtype=evd.EVD_DTYPE)
+    records["x_noise"] = n
+    records["object_id"] = np.arange(points) % 3
+    evd.write_evd(os.path.join(scene_dir, "scan1.evd"), records)
+    if packed:
+        codec.encode_evd(os.path.join(scene_dir, "scan1.evd"), os.path.join(scene_dir, "scan1.pcq"), 2.5)
+
+
+class TestBatchLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for n in range(10):
+            write_scene(self.tmpdir.name, n, points=50 + 10 * n, packed=n % 2 == 0)
+        self.dataset = ScanDataset(self.tmpdir.name, scan_names=("scan1",))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_prefers_packed_files(self):
+        self.assertEqual(len(self.dataset), 10)
+        extensions = [os.path.splitext(filepath)[1] for _, filepath in self.dataset.items]
+        self.assertEqual(extensions, [".pcq", ".evd"] * 5)
+
+    def test_noise_free_points_skip_noisy_packed_files(self):
+        dataset = ScanDataset(self.tmpdir.name, scan_names=("scan1",), noisy=False)
+        item = dataset.load(0)
+        self.assertTrue(item["filepath"].endswith(".evd"))
+        self.assertTrue(np.all(item["points"][:, 0] == 0))
+
+        os.remove(os.path.join(self.tmpdir.name, "scanning0", "scan1.evd"))
+        with self.assertRaises(ValueError):
+            dataset.load(0)
+
+    def test_batch_shapes(self):
+        loader = BatchLoader(self.dataset, batch_size=4, points_per_scan=64, workers=3, prefetch=4)
+        batches = list(loader)
+        self.assertEqual(len(batches), len(loader))
+        self.assertEqual([len(b["scene_params"]) for b in batches], [4, 4, 2])
+        self.assertEqual(batches[0]["points"].shape, (4, 64, 3))
+        self.assertEqual(batches[0]["labels"].shape, (4, 64))
+
+    def test_deterministic_epochs(self):
+        def scene_order(loader):
+            return [int(round(p[0, 0])) for batch in loader for p in batch["points"]]
+
+        loader = BatchLoader(self.dataset, batch_size=3, points_per_scan=16, seed=7, shuffle_buffer=4)
+        first = scene_order(loader)
+        self.assertEqual(first, scene_order(loader))
+        self.assertEqual(sorted(first), list(range(10)))
+
+        loader.set_epoch(1)
+        self.assertNotEqual(first, scene_order(loader))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -9,6 +9,7 @@ import mathutils
 import time
 import random
 import csv
+import argparse
 
 # Get the directory of the script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -32,6 +33,15 @@ from scanner import main as scanner_main
 from scanner.scanner_params import ScannerParams
 from scene_generator import main as scene_generator_main
 from scene_generator.scene_generator_params import SceneGeneratorParams, PrimitiveObjects
+from runtime.main import RuntimeModule
+from runtime.cache import SceneCache
+from postprocessing.pipeline import scan_pipeline
+from scene_generator.utils import purge_orphan_data
+from runtime.watchdog import MemoryWatchdog
+from runtime.utils import RECYCLE_EXIT_CODE, write_checkpoint, read_checkpoint
+from runtime.telemetry import worker_event_log, scene_event, directory_bytes
+from runtime.profiler import SamplingProfiler
+from scanner.noise import noise_models
 
 def direction_to_rotation(direction):
     """
@@ -112,6 +122,10 @@ def record(radius=10, frames=250, video_title=f"video.mp4"):
     # Render the animation
     bpy.ops.render.render(animation=True)
 
+    # Drop the circular path again, otherwise every preview leaves an orphan action behind
+    camera_obj.animation_data_clear()
+    purge_orphan_data(collections=("actions",))
+
 
 def write_params_to_csv(filename, params):
     """
@@ -195,7 +209,47 @@ def main():
     write_params_to_csv(f"/home/dawid/Desktop/generator_params/params.csv", data)
     return
 
-def main2():
+def main2(start=9000, end=10_000, checkpoint=None, output_dir="/media/dawid/blensor data/jan20252", seed_per_scene=False, cache_dir=None, postprocess=None, target_density=None, time_budget=None, events_dir=None, profile_dir=None, noise_variants=None, scan_workers=1):
+    """
+    Generates and scans the scenes start..end-1 of the 10 000 scene sweep.
+
+    If a checkpoint file is given, the sweep continues from the scene stored in
+    it, and the memory watchdog may end the worker early with
+    RECYCLE_EXIT_CODE, see runtime/supervisor.py for restarting it. Without a
+    checkpoint the worker is never recycled.
+
+    With seed_per_scene, every scene is seeded from its own index, so a scene
+    comes out the same no matter how the sweep is split between workers
+    (see runtime/scheduler.py).
+
+    With a cache_dir, scenes generated by an earlier run with the same
+    parameters are linked from the cache (see runtime/cache.py). Needs
+    seed_per_scene, as scenes can only be identified by their own seed.
+
+    postprocess names the stages of postprocessing/pipeline.py the scans
+    are run through in the background, e.g. ["encode", "range_image"].
+    QA thumbnails come from its "preview" stage (or postprocessing/preview.py
+    over the finished run), for every scene instead of a Cycles video of
+    every 100th.
+
+    With a target_density (points per square metre), every scan chooses its
+    own frame range and angular resolution instead of the fixed 200 frames,
+    within time_budget seconds per scan if given (see scanner/density.py).
+
+    With an events_dir, every scene is logged there for runtime/telemetry.py.
+
+    With a profile_dir, the stacks of every few scenes are sampled and
+    written there as collapsed stacks, see runtime/profiler.py.
+
+    noise_variants names noise models of scanner/noise.py, e.g. ["gaussian", "dropout"].
+    With them, every scan is made without noise and a noisy copy per model is
+    written next to it, e.g. scan1_vlp16.evd.
+
+    With scan_workers above 1, the frames of every scan are split between
+    that many Blender processes (see scan_range_chunked() in scanner/utils.py).
+    """
+    if cache_dir is not None and not seed_per_scene:
+        raise ValueError("The scene cache needs seed_per_scene.")
     random.seed(2025)
 
     s = 10_000
@@ -207,19 +261,37 @@ def main2():
     object_sizes = np.linspace(0.8/100, 1, s)
     #bpy.ops.wm.read_factory_settings(use_empty=True)
 
+    pipeline = scan_pipeline(postprocess) if postprocess else None
+    profiler = SamplingProfiler(profile_dir) if profile_dir else None
+    # Objects are reused between scenes instead of being deleted and re-created
+    runtime = RuntimeModule(use_object_pool=True, cache=SceneCache(cache_dir) if cache_dir else None, pipeline=pipeline, profiler=profiler,
+                            noise_models=noise_models(noise_variants) if noise_variants else None)
+    scans = ["scan1.evd", "scan2.evd", "scan3.evd"]
+
+    resumed = read_checkpoint(checkpoint)
+    if resumed is not None:
+        start = resumed
+        if not seed_per_scene:
+            # A restarted worker can't replay the random sequence of the previous one
+            random.seed(f"2025-{start}")
+    watchdog = MemoryWatchdog(log_filepath=f"{output_dir}/memory_{start}.csv")
+    events = worker_event_log(events_dir) if events_dir else None
+
     start_time = time.time()
-    for n in range(9000, s):
+    for n in range(start, end):
+        seed = f"2025-{n}" if seed_per_scene else None
+        if seed is not None:
+            random.seed(seed)
+        runtime.begin_scene(n)
         dirname = f"scanning{n}"
-        dir = f"/media/dawid/blensor data/jan20252/{dirname}"
-        os.makedirs(f"/media/dawid/blensor data/jan20252/{dirname}")
-        f = open(f"/media/dawid/blensor data/jan20252/{dirname}/test_{n}.txt", "w+")
+        dir = f"{output_dir}/{dirname}"
+        os.makedirs(dir, exist_ok=True)
         obj_size = object_sizes[n]
         scene_size = obj_size*2.5
         ds = obj_size*0.5
         min_size = obj_size - ds
         max_size = obj_size + ds
 
-        sg = scene_generator_main.SceneGeneratorModule()
         sg_params = SceneGeneratorParams(
             scene_size=scene_size,
             objects_to_generate={
@@ -235,30 +307,7 @@ def main2():
             allow_overlap=True
         )
 
-        sg.clean_scene()
-        aabbs, object_params = sg.generate_scene(sg_params)
-        
-        #cam = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
-        #bpy.context.scene.objects.link(cam)
-        #bpy.context.scene.camera = cam
-
-        bpy.ops.wm.save_as_mainfile(filepath=f"{dir}/scene.blend")
-        if n % 100 == 0:
-            record(radius=scene_size*4, frames=100, video_title=f"scene_{n}.mp4")
-
-        f.write(f"Scene: {n} at {time.time()-start_time:.2f}s\n")
-        f.write(f"scene_size: {scene_size:.3f}\n")
-        f.write(f"object_count_range: (5, 8)\n")
-        f.write(f"object_size_range: ({min_size:.3f}, {max_size:.3f})\n")
-        f.write(f"object_height_distribution: (0, {scene_size/2:.3f})\n")
-        f.write(f"========================================================\n")
-        f.write(f"Objects generated:\n")
-        for obj in object_params:
-            f.write(str(obj) + "\n")
-        f.close()
-        
         scanner = bpy.data.objects["Camera"]
-        sc = scanner_main.ScannerModule()
         sc_params = ScannerParams(
             scanner_object=scanner,
             scene_size=scene_size,
@@ -266,19 +315,95 @@ def main2():
             frame_end=200,
             min_angle=0,
             max_angle=180,
-            add_noisy_blender_mesh=True
+            # Noisy variants are made from a noise-free scan, without BlenSor's noisy mesh
+            add_noisy_blender_mesh=not noise_variants,
+            target_density=target_density,
+            time_budget=time_budget,
+            scan_workers=scan_workers
         )
-        sc.scan_scene(sc_params, aabbs, dir=dir, filename="scan1.evd")
-        sc.scan_scene(sc_params, aabbs, dir=dir, filename="scan2.evd")
-        sc.scan_scene(sc_params, aabbs, dir=dir, filename="scan3.evd")
 
+        try:
+            cached = runtime.restore_cached_scene(n, dir, seed, sg_params, sc_params, scans)
+            if not cached:
+                aabbs, object_params = runtime.generate_scene(sg_params)
+
+                #cam = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+                #bpy.context.scene.objects.link(cam)
+                #bpy.context.scene.camera = cam
+
+                # Only every few scenes keep their .blend file, the others
+                # are rebuilt from scene.json when needed (runtime/rebuild.py)
+                if runtime.saves_blend(n):
+                    runtime.save_scene(dir)
+
+                runtime.scan_scene(sc_params, aabbs, dir, scans)
+                runtime.write_scene_metadata(n, dir, time.time()-start_time, sg_params, object_params)
+                runtime.write_scene_spec(n, dir, seed, object_params, sc_params)
+                runtime.store_cached_scene(n, dir, seed, sg_params, sc_params, scans)
+        except Exception:
+            # Logged like a failed daemon job, the error still ends the worker
+            if events is not None:
+                events.emit(scene_event(n, "failed", runtime.timings))
+            raise
+        runtime.end_scene()
+
+        if events is not None:
+            events.emit(scene_event(n, "cached" if cached else "ok", runtime.timings, directory_bytes(dir)))
+        if checkpoint is not None:
+            write_checkpoint(checkpoint, n + 1)
+        watchdog.sample(n)
+        if pipeline is not None and n % 10 == 0:
+            pipeline.log_report()
+        # Without a checkpoint, a restarted worker would start over from 'start'
+        if checkpoint is not None and watchdog.should_recycle() and n + 1 < end:
+            print(f"Recycling worker after scene {n}")
+            if pipeline is not None:
+                pipeline.close()
+            if profiler is not None:
+                profiler.close()
+            sys.exit(RECYCLE_EXIT_CODE)
+
+    if pipeline is not None:
+        pipeline.close()
+        pipeline.log_report()
+    if profiler is not None:
+        profiler.close()
 
     end_time = time.time()
     print("Total scan time: %.2f s"%(end_time-start_time))
     sys.exit(0)
 
+def parse_arguments():
+    """
+    Parses the arguments given to the script after '--' on the Blender command
+    line, e.g. blender -b -P main.py -- --sweep --start 0 --end 100
+    """
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Blender data generation tool.")
+    parser.add_argument("--sweep", action="store_true", help="Run the scene sweep of main2() instead of main().")
+    parser.add_argument("--start", type=int, default=9000, help="First scene index of the sweep.")
+    parser.add_argument("--end", type=int, default=10_000, help="Scene index the sweep stops at (exclusive).")
+    parser.add_argument("--checkpoint", default=None, help="File storing the next scene index, used to resume the sweep.")
+    parser.add_argument("--seed-per-scene", action="store_true", help="Seed every scene from its index.")
+    parser.add_argument("--cache", default=None, help="Directory of the scene cache, needs --seed-per-scene.")
+    parser.add_argument("--postprocess", nargs="*", default=None, help="Post-processing stages, e.g. encode range_image normals.")
+    parser.add_argument("--target-density", type=float, default=None, help="Scan density in points per square metre, enables adaptive scans.")
+    parser.add_argument("--time-budget", type=float, default=None, help="Seconds an adaptive scan may take.")
+    parser.add_argument("--events", default=None, help="Directory of the telemetry event logs, see runtime/telemetry.py.")
+    parser.add_argument("--profile", default=None, help="Directory for the collapsed stacks of sampled scenes, see runtime/profiler.py.")
+    parser.add_argument("--scan-workers", type=int, default=1, help="Blender processes every scan is split between.")
+    parser.add_argument("--noise-variants", nargs="*", default=None, help="Noise models of scanner/noise.py to write a noisy copy of every scan with, e.g. gaussian laplace distance_bias dropout.")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_arguments()
+    if args.sweep:
+        main2(start=args.start, end=args.end, checkpoint=args.checkpoint, seed_per_scene=args.seed_per_scene, cache_dir=args.cache, postprocess=args.postprocess,
+              target_density=args.target_density, time_budget=args.time_budget, events_dir=args.events, profile_dir=args.profile,
+              noise_variants=args.noise_variants, scan_workers=args.scan_workers)
+    else:
+        main()
 
 
 
@@ -0,0 +1,307 @@
+# postprocessing/codec.py
+"""
+Compact storage of scans as quantized, delta-encoded and block compressed point clouds (.pcq).
+
+    python postprocessing/codec.py encode "/media/dawid/blensor data/jan20252" --check
+
+File layout:
+    - 4 bytes magic b"PCQ1"
+    - compressed blocks, one after another
+    - JSON index with the quantization step, the fields and (offset, length, count) per block
+    - footer: uint64 offset of the index, followed by the magic again
+
+Every block holds up to 'block_size' points and can be decoded on its own.
+Inside a block the points are ordered by laser ring and azimuth, so neighbouring
+points are close to each other and their deltas are small. Each column is
+delta-encoded, zigzag-mapped to unsigned integers, split into byte planes
+and the whole block is compressed with zlib.
+
+Only the point positions (by default the noisy ones), the object id and the
+laser ring are stored. Positions are rounded to a grid with a step of
+'tolerance * scene_size', so the error per coordinate is at most half a step.
+"""
+
+import os
+import sys
+import glob
+import json
+import zlib
+import struct
+import argparse
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import iter_evd
+from postprocessing.utils import laser_rings, read_scene_metadata, scene_metadata_filepath
+
+config = SystemConfiguration()
+
+MAGIC = b"PCQ1"
+FOOTER = struct.Struct("<Q4s")
+FIELDS = ("x", "y", "z", "object_id", "ring")
+DECODED_DTYPE = np.dtype([("x", "f8"), ("y", "f8"), ("z", "f8"), ("object_id", "u8"), ("ring", "u1")])
+
+
+def _pack_column(name, values):
+    deltas = np.empty_like(values)
+    deltas[:1] = values[:1]
+    deltas[1:] = np.diff(values)
+    zigzag = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64)
+    if len(zigzag) and zigzag.max() > np.iinfo(np.uint32).max:
+        if name in ("x", "y", "z"):
+            raise ValueError(f"Quantized deltas of '{name}' don't fit 32 bits, the points span too many tolerance steps. Increase the tolerance.")
+        raise ValueError(f"Deltas of '{name}' don't fit 32 bits, its values are more than 2**31 apart.")
+    # Byte planes: all lowest bytes first, then all second bytes, ...
+    return zigzag.astype("<u4").view(np.uint8).reshape(-1, 4).T.tobytes()
+
+
+def _unpack_column(data, count):
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(4, count)
+    zigzag = np.ascontiguousarray(planes.T).view("<u4").reshape(count).astype(np.int64)
+    deltas = (zigzag >> 1) ^ -(zigzag & 1)
+    return np.cumsum(deltas)
+
+
+def block_order(records):
+    """
+    Returns the order the points of one block are stored in: by laser ring, then by azimuth.
+    """
+    return np.lexsort((records["yaw"], laser_rings(records["pitch"])))
+
+
+class PointCloudEncoder:
+    """
+    Streaming encoder, records can be written in chunks of any size.
+
+    Example:
+        >>> with PointCloudEncoder("scan1.pcq", scene_size=2.5) as encoder:
+        ...     for records in iter_evd("scan1.evd"):
+        ...         encoder.write(records)
+    """
+
+    def __init__(self, filepath, scene_size, tolerance=None, block_size=None, noisy=True, compression_level=6):
+        if tolerance is None:
+            tolerance = config.get("codec_tolerance", 1e-4)
+        if block_size is None:
+            block_size = config.get("codec_block_size", 65536)
+        if not scene_size > 0:
+            raise ValueError(f"'scene_size' {scene_size} must be a positive number.")
+        if not tolerance > 0:
+            raise ValueError(f"'tolerance' {tolerance} must be a positive number.")
+        self.step = float(scene_size) * tolerance
+        self.block_size = block_size
+        self.noisy = noisy
+        self.compression_level = compression_level
+        self._file = open(filepath, "wb")
+        self._file.write(MAGIC)
+        self._pending = []
+        self._pending_count = 0
+        self._blocks = []
+
+
+    def write(self, records):
+        self._pending.append(records)
+        self._pending_count += len(records)
+        while self._pending_count >= self.block_size:
+            pending = np.concatenate(self._pending)
+            self._write_block(pending[:self.block_size])
+            self._pending = [pending[self.block_size:]]
+            self._pending_count = len(self._pending[0])
+
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._pending_count:
+            self._write_block(np.concatenate(self._pending))
+        self._pending = []
+
+        index_offset = self._file.tell()
+        index = {
+            "step": self.step,
+            "block_size": self.block_size,
+            "noisy": self.noisy,
+            "fields": list(FIELDS),
+            "count": sum(block[2] for block in self._blocks),
+            "blocks": self._blocks,
+        }
+        self._file.write(json.dumps(index).encode("utf-8"))
+        self._file.write(FOOTER.pack(index_offset, MAGIC))
+        self._file.close()
+        self._file = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def _write_block(self, records):
+        records = records[block_order(records)]
+        suffix = "_noise" if self.noisy else ""
+        columns = [np.round(records[axis + suffix] / self.step).astype(np.int64) for axis in "xyz"]
+        columns.append(records["object_id"].astype(np.int64))
+        columns.append(laser_rings(records["pitch"]).astype(np.int64))
+
+        data = zlib.compress(b"".join(_pack_column(name, column) for name, column in zip(FIELDS, columns)), self.compression_level)
+        self._blocks.append([self._file.tell(), len(data), len(records)])
+        self._file.write(data)
+
+
+class PointCloudDecoder:
+    """
+    Reads .pcq files. Only the blocks overlapping the requested range are read.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filepath} is not a .pcq file.")
+            file.seek(-FOOTER.size, os.SEEK_END)
+            footer_offset = file.tell()
+            index_offset, magic = FOOTER.unpack(file.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{filepath} is truncated.")
+            file.seek(index_offset)
+            self.index = json.loads(file.read(footer_offset - index_offset).decode("utf-8"))
+        self.step = self.index["step"]
+        self.blocks = self.index["blocks"]
+
+
+    def __len__(self):
+        return self.index["count"]
+
+
+    def read(self, start=0, stop=None):
+        """
+        Decodes the points [start, stop) in storage order.
+
+        Returns:
+            np.ndarray: Structured array with the fields of DECODED_DTYPE.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        parts = []
+        first = 0
+        with open(self.filepath, "rb") as file:
+            for offset, length, count in self.blocks:
+                last = first + count
+                if last > start and first < stop:
+                    file.seek(offset)
+                    block = self._decode_block(file.read(length), count)
+                    parts.append(block[max(start - first, 0):min(stop, last) - first])
+                first = last
+        if not parts:
+            return np.zeros(0, dtype=DECODED_DTYPE)
+        return np.concatenate(parts)
+
+
+    def iter_blocks(self):
+        """
+        Yields the decoded blocks one by one.
+        """
+        with open(self.filepath, "rb") as file:
+            for offset, length, count in self.blocks:
+                file.seek(offset)
+                yield self._decode_block(file.read(length), count)
+
+
+    def _decode_block(self, data, count):
+        payload = zlib.decompress(data)
+        column_size = 4 * count
+        columns = [_unpack_column(payload[i * column_size:(i + 1) * column_size], count) for i in range(len(FIELDS))]
+
+        block = np.empty(count, dtype=DECODED_DTYPE)
+        for axis, column in zip("xyz", columns[:3]):
+            block[axis] = column * self.step
+        block["object_id"] = columns[3]
+        block["ring"] = columns[4]
+        return block
+
+
+def encode_evd(evd_filepath, pcq_filepath, scene_size, tolerance=None, block_size=None, noisy=True):
+    """
+    Encodes an .evd scan, streaming it in chunks.
+
+    Returns:
+        int: Number of encoded points.
+    """
+    count = 0
+    with PointCloudEncoder(pcq_filepath, scene_size, tolerance, block_size, noisy) as encoder:
+        for records in iter_evd(evd_filepath):
+            encoder.write(records)
+            count += len(records)
+    return count
+
+
+def check_round_trip(evd_filepath, pcq_filepath):
+    """
+    Compares a .pcq file against the .evd scan it was encoded from.
+
+    Returns:
+        float: The largest coordinate error.
+
+    Raises:
+        ValueError: If the point count, the object ids or the rings don't
+                    match, or an error is larger than half a quantization step.
+    """
+    decoder = PointCloudDecoder(pcq_filepath)
+    suffix = "_noise" if decoder.index["noisy"] else ""
+    max_error = 0.0
+    decoded_blocks = decoder.iter_blocks()
+    for records in iter_evd(evd_filepath, chunk_records=decoder.index["block_size"]):
+        decoded = next(decoded_blocks, None)
+        if decoded is None or len(decoded) != len(records):
+            raise ValueError(f"{pcq_filepath} does not hold the same points as {evd_filepath}.")
+        records = records[block_order(records)]
+        if not np.array_equal(decoded["object_id"], records["object_id"]):
+            raise ValueError(f"Object ids of {pcq_filepath} don't match {evd_filepath}.")
+        if not np.array_equal(decoded["ring"], laser_rings(records["pitch"])):
+            raise ValueError(f"Laser rings of {pcq_filepath} don't match {evd_filepath}.")
+        for axis in "xyz":
+            if len(records):
+                max_error = max(max_error, float(np.max(np.abs(decoded[axis] - records[axis + suffix]))))
+
+    if next(decoded_blocks, None) is not None:
+        raise ValueError(f"{pcq_filepath} holds more points than {evd_filepath}.")
+    if max_error > decoder.step / 2 * (1 + 1e-6):
+        raise ValueError(f"Error {max_error} of {pcq_filepath} is larger than half a step ({decoder.step / 2}).")
+    return max_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode the .evd scans of a run into .pcq files.")
+    parser.add_argument("command", choices=["encode"])
+    parser.add_argument("root", help="Directory holding the scanning{n} directories.")
+    parser.add_argument("--tolerance", type=float, default=None, help="Quantization step as a fraction of scene_size.")
+    parser.add_argument("--check", action="store_true", help="Verify every file after encoding it.")
+    parser.add_argument("--remove", action="store_true", help="Remove the .evd file after a successful check.")
+    args = parser.parse_args()
+
+    evd_size = pcq_size = 0
+    for scene_dir in sorted(glob.glob(os.path.join(args.root, "scanning*"))):
+        scene_size = read_scene_metadata(scene_metadata_filepath(scene_dir))["scene_size"]
+        for evd_filepath in sorted(glob.glob(os.path.join(scene_dir, "*.evd"))):
+            pcq_filepath = os.path.splitext(evd_filepath)[0] + ".pcq"
+            encode_evd(evd_filepath, pcq_filepath, scene_size, tolerance=args.tolerance)
+            evd_size += os.path.getsize(evd_filepath)
+            pcq_size += os.path.getsize(pcq_filepath)
+            if args.check or args.remove:
+                check_round_trip(evd_filepath, pcq_filepath)
+            if args.remove:
+                os.remove(evd_filepath)
+
+    if pcq_size:
+        print(f"Encoded {evd_size / 1e6:.1f} MB into {pcq_size / 1e6:.1f} MB ({evd_size / pcq_size:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
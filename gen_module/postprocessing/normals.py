@@ -0,0 +1,303 @@
+# postprocessing/normals.py
+"""
+Per-point normals and curvature of scans, estimated from their k nearest neighbours.
+
+    python postprocessing/normals.py "/media/dawid/blensor data/jan20252" --check
+
+Writes scan1.normals.npz next to every scan1.evd, holding the unit "normals"
+(N, 3) and "curvature" (N,) of the points in file order. Normals are
+oriented towards the scanner, whose location during every scan is read
+from the "scan_locations" of the scene's scene.json. Scenes without it,
+e.g. from runs before it was recorded, keep the sign PCA gives.
+
+The normal of a point is the direction of least variance of its neighbours
+(PCA), and its curvature is the share of that variance in the total,
+lambda_0 / (lambda_0 + lambda_1 + lambda_2), 0 on a plane and at most 1/3.
+
+Neighbours are searched with a uniform voxel grid, in chunks of points, so
+only the neighbours of one chunk are held in memory at a time. With --check
+the estimates are compared against ground-truth normals computed from the
+object params in test_{n}.txt.
+"""
+
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import read_evd
+from scene_generator.surface_sampling import euler_to_matrix, local_triangles
+from postprocessing.utils import read_scene_metadata, scene_metadata_filepath
+from runtime.specs import read_scene_spec, scene_spec_filepath
+
+config = SystemConfiguration()
+
+
+_OFFSETS = {}
+
+
+def _cell_offsets(radius):
+    if radius not in _OFFSETS:
+        offsets = np.arange(-radius, radius + 1)
+        _OFFSETS[radius] = np.stack(np.meshgrid(offsets, offsets, offsets, indexing="ij"), axis=-1).reshape(-1, 3)
+    return _OFFSETS[radius]
+
+
+class GridIndex:
+    """
+    Uniform voxel grid over a point cloud for k-nearest-neighbour queries.
+
+    Scanned points lie on surfaces, so the cell size is derived from the
+    surface area the cloud covers, estimated from the cells a coarse grid
+    occupies, such that a cell holds about k points.
+
+    Searches are exact, unless the k nearest neighbours of a point are more
+    than MAX_RADIUS cells away from it.
+    """
+
+    MAX_RADIUS = 3
+
+
+    def __init__(self, points, k: int, cell_size: float = None):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.k = k
+        if cell_size is None:
+            cell_size = self._estimate_cell_size()
+        self.cell_size = cell_size
+        self.origin = self.points.min(axis=0)
+
+        cells = np.floor((self.points - self.origin) / cell_size).astype(np.int64)
+        self.shape = cells.max(axis=0) + 1
+        keys = np.ravel_multi_index(cells.T, self.shape)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.cells = cells
+
+
+    def _estimate_cell_size(self):
+        extent = float(np.max(self.points.max(axis=0) - self.points.min(axis=0)))
+        if extent == 0:
+            return 1.0
+        coarse = extent / 64
+        occupied = len(np.unique(np.floor(self.points / coarse).astype(np.int64), axis=0))
+        area = occupied * coarse ** 2
+        return max(np.sqrt(self.k * area / len(self.points)), extent * 1e-6)
+
+
+    def candidates(self, cell, radius=1):
+        """
+        Returns the indices of the points in the cells around 'cell'.
+        """
+        around = _cell_offsets(radius) + cell
+        around = around[np.all((around >= 0) & (around < self.shape), axis=1)]
+        keys = np.ravel_multi_index(around.T, self.shape)
+        found = np.searchsorted(self.keys, keys)
+        present = found < len(self.keys)
+        found, keys = found[present], keys[present]
+        found = found[self.keys[found] == keys]
+        return np.concatenate([self.order[self.starts[i]:self.starts[i] + self.counts[i]] for i in found])
+
+
+    def knn(self, queries):
+        """
+        Returns the k nearest neighbours of the given point indices (the point itself included).
+
+        Returns:
+            np.ndarray: Neighbour indices of shape (len(queries), k). Points
+                        with fewer than k points around them repeat their nearest ones.
+        """
+        queries = np.asarray(queries)
+        neighbours = np.empty((len(queries), self.k), dtype=np.int64)
+        query_cells = self.cells[queries]
+        # Queries of the same cell share their candidates
+        keys = np.ravel_multi_index(query_cells.T, self.shape)
+        order = np.argsort(keys, kind="stable")
+        _, starts = np.unique(keys[order], return_index=True)
+        for group in np.split(order, starts[1:]):
+            cell = query_cells[group[0]]
+            radius = 0
+            while True:
+                radius += 1
+                candidates = self.candidates(cell, radius)
+                distances = np.sum((self.points[queries[group], None, :] - self.points[None, candidates, :]) ** 2, axis=2)
+                k = min(self.k, len(candidates))
+                nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                # Every point closer than 'radius' cells is among the candidates
+                kth = distances[np.arange(len(group)), nearest[:, -1]]
+                if radius == self.MAX_RADIUS or (k == self.k and np.all(kth <= (radius * self.cell_size) ** 2)):
+                    break
+            if k < self.k:
+                nearest = np.concatenate([nearest, np.repeat(nearest[:, :1], self.k - k, axis=1)], axis=1)
+            neighbours[group] = candidates[nearest]
+        return neighbours
+
+
+def pca_normals(points, neighbours):
+    """
+    Returns the PCA normals and curvature of points from their neighbour indices of shape (n, k).
+    """
+    patches = points[neighbours]
+    centered = patches - patches.mean(axis=1, keepdims=True)
+    covariances = np.einsum("nki,nkj->nij", centered, centered) / neighbours.shape[1]
+    eigenvalues, eigenvectors = np.linalg.eigh(covariances)
+    eigenvalues = np.maximum(eigenvalues, 0)
+    normals = eigenvectors[:, :, 0]
+    total = eigenvalues.sum(axis=1)
+    curvature = np.where(total > 0, eigenvalues[:, 0] / np.where(total > 0, total, 1), 0)
+    return normals, curvature
+
+
+def estimate_normals(points, k: int = None, chunk_size: int = None, viewpoint=None):
+    """
+    Estimates the normals and curvature of every point of a cloud.
+
+    Parameters:
+        points (np.ndarray): Points of shape (N, 3).
+        k (int or None): Number of neighbours.
+        chunk_size (int or None): Points processed at once.
+        viewpoint (sequence or None): If given, normals are flipped to face it.
+
+    Returns:
+        tuple: Unit normals (N, 3) and curvature (N,).
+    """
+    if k is None:
+        k = config.get("normals_neighbours", 16)
+    if chunk_size is None:
+        chunk_size = config.get("normals_chunk_size", 65536)
+    points = np.asarray(points, dtype=np.float64)
+    normals = np.zeros((len(points), 3))
+    curvature = np.zeros(len(points))
+    if len(points) == 0:
+        return normals, curvature
+
+    index = GridIndex(points, k)
+    # Chunks of spatially sorted points share most of their candidate cells
+    for chunk in np.array_split(index.order, max(1, -(-len(points) // chunk_size))):
+        normals[chunk], curvature[chunk] = pca_normals(points, index.knn(chunk))
+
+    if viewpoint is not None:
+        away = np.einsum("ij,ij->i", normals, np.asarray(viewpoint, dtype=np.float64) - points) < 0
+        normals[away] *= -1
+    return normals, curvature
+
+
+def _point_triangle_distances(points, triangles):
+    """
+    Returns the distances of points (n, 3) to triangles (T, 3, 3) as an (n, T) array.
+    """
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    normals = np.cross(b - a, c - a)
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-300)[:, None]
+    relative = points[:, None, :] - a[None]
+    height = np.einsum("ntj,tj->nt", relative, normals)
+    projected = points[:, None, :] - height[..., None] * normals[None]
+
+    inside = np.ones(height.shape, dtype=bool)
+    for start, end in ((a, b), (b, c), (c, a)):
+        inside &= np.einsum("ntj,tj->nt", np.cross(end - start, projected - start[None]), normals) >= 0
+
+    edge_distances = []
+    for start, end in ((a, b), (b, c), (c, a)):
+        edge = end - start
+        t = np.clip(np.einsum("ntj,tj->nt", points[:, None, :] - start[None], edge) / np.einsum("tj,tj->t", edge, edge), 0, 1)
+        closest = start[None] + t[..., None] * edge[None]
+        edge_distances.append(np.linalg.norm(points[:, None, :] - closest, axis=2))
+    return np.where(inside, np.abs(height), np.min(edge_distances, axis=0))
+
+
+def object_surface_normals(points, params):
+    """
+    Returns the outward normal of the surface point nearest to each point, and the distance to it.
+    """
+    location = np.asarray(params["location"], dtype=np.float64)
+    if params["type"] == "sphere":
+        relative = points - location
+        lengths = np.maximum(np.linalg.norm(relative, axis=1), 1e-300)
+        return relative / lengths[:, None], np.abs(lengths - params["size"])
+
+    rotation = euler_to_matrix(params["rotation"])
+    local = (points - location) @ rotation
+    triangles = local_triangles(params)
+    distances = _point_triangle_distances(local, triangles)
+    nearest = np.argmin(distances, axis=1)
+    face_normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    face_normals /= np.linalg.norm(face_normals, axis=1)[:, None]
+    return face_normals[nearest] @ rotation.T, distances[np.arange(len(points)), nearest]
+
+
+def ground_truth_normals(points, object_params, chunk_size: int = None):
+    """
+    Computes the true normals of scanned points from the primitives they lie on.
+
+    Every point is assigned to the object whose surface is nearest to it.
+    For all primitives except spheres this is the exact mesh Blender creates,
+    e.g. the 32-sided prism of a cylinder.
+
+    Returns:
+        tuple: Unit normals (N, 3), the distance to the surface (N,) and the
+               index of the nearest object in 'object_params' (N,).
+    """
+    if chunk_size is None:
+        chunk_size = config.get("normals_chunk_size", 65536) // 16
+    points = np.asarray(points, dtype=np.float64)
+    normals = np.zeros((len(points), 3))
+    distances = np.full(len(points), np.inf)
+    labels = np.full(len(points), -1, dtype=np.int64)
+    for start in range(0, len(points), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        for label, params in enumerate(object_params):
+            object_normals, object_distances = object_surface_normals(points[chunk], params)
+            closer = object_distances < distances[chunk]
+            normals[chunk][closer] = object_normals[closer]
+            distances[chunk][closer] = object_distances[closer]
+            labels[chunk][closer] = label
+    return normals, distances, labels
+
+
+def normal_angle_errors(estimated, truth):
+    """
+    Returns the angles in degrees between estimated and true normals, ignoring their orientation.
+    """
+    cosines = np.abs(np.einsum("ij,ij->i", estimated, truth))
+    return np.degrees(np.arccos(np.clip(cosines, 0, 1)))
+
+
+def normals_filepath(scan_filepath):
+    return os.path.splitext(scan_filepath)[0] + ".normals.npz"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate per-point normals and curvature of the .evd scans of a run.")
+    parser.add_argument("root", help="Directory holding the scanning{n} directories.")
+    parser.add_argument("--k", type=int, default=None, help="Number of neighbours.")
+    parser.add_argument("--exact", action="store_true", help="Use the exact instead of the noisy positions.")
+    parser.add_argument("--check", action="store_true", help="Report the angle error against the ground-truth normals.")
+    args = parser.parse_args()
+
+    suffix = "" if args.exact else "_noise"
+    for scene_dir in sorted(glob.glob(os.path.join(args.root, "scanning*"))):
+        metadata = read_scene_metadata(scene_metadata_filepath(scene_dir)) if args.check else None
+        spec_filepath = scene_spec_filepath(scene_dir)
+        scan_locations = read_scene_spec(spec_filepath).get("scan_locations", {}) if os.path.exists(spec_filepath) else {}
+        for evd_filepath in sorted(glob.glob(os.path.join(scene_dir, "*.evd"))):
+            records = read_evd(evd_filepath)
+            points = np.column_stack([records[axis + suffix] for axis in "xyz"])
+            normals, curvature = estimate_normals(points, args.k, viewpoint=scan_locations.get(os.path.basename(evd_filepath)))
+            with open(normals_filepath(evd_filepath), "wb") as file:
+                np.savez_compressed(file, normals=normals.astype(np.float32), curvature=curvature.astype(np.float32))
+
+            if metadata is not None and len(points):
+                truth, _, _ = ground_truth_normals(points, metadata["objects"])
+                errors = normal_angle_errors(normals, truth)
+                print(f"{evd_filepath}: median error {np.median(errors):.2f} deg, 90th percentile {np.percentile(errors, 90):.2f} deg")
+
+
+if __name__ == "__main__":
+    main()
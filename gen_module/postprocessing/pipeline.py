@@ -0,0 +1,285 @@
+# postprocessing/pipeline.py
+"""
+Post-processes scans in background processes while Blender goes on with the next scene.
+
+Example, inside the driver:
+    >>> pipeline = Pipeline([Stage("encode", encode_scan), Stage("normals", estimate_scan_normals, workers=2)])
+    >>> pipeline.submit({"filepath": ".../scan1.evd", "scene_size": 2.5})
+    >>> ...
+    >>> pipeline.close()
+
+Every stage runs in its own worker processes and hands its results to the
+next stage through a bounded queue. When a stage falls behind, its queue
+fills up, and eventually submit() blocks, so a slow stage throttles the
+scene generation instead of piling up scans in memory.
+
+Items are dicts, passed between processes by pickling. Stage functions take
+an item and return it (possibly changed), or None to drop it. An exception
+drops the item and is counted as a failure of the stage. Scan items carry
+the filepath of the scan. The first stage reads it and hands the "records"
+down the chain with the item, so a scan is read once, and not by Blender.
+
+A worker that dies (e.g. killed for running out of memory) loses its item.
+close() notices it and still stops the following stages.
+
+The worker processes are forked, so they must not use bpy.
+"""
+
+import os
+import sys
+import time
+import queue
+import traceback
+import multiprocessing
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from postprocessing.codec import PointCloudEncoder
+from postprocessing.range_image import project_records, range_image_filepath, write_range_image
+from postprocessing.normals import estimate_normals, normals_filepath
+from postprocessing.preview import preview_filepath, render_points, scan_points, write_png
+from scanner.evd import read_evd
+
+config = SystemConfiguration()
+
+_STOP = None
+
+
+def load_records(item):
+    """
+    Returns the scan item with its "records", read from its file unless the item carries them.
+    """
+    if "records" in item:
+        return item
+    return dict(item, records=read_evd(item["filepath"]))
+
+
+def encode_scan(item):
+    """
+    Writes the scan as a .pcq file next to it, see postprocessing/codec.py.
+    """
+    item = load_records(item)
+    with PointCloudEncoder(os.path.splitext(item["filepath"])[0] + ".pcq", item["scene_size"]) as encoder:
+        encoder.write(item["records"])
+    return item
+
+
+def project_scan(item):
+    """
+    Writes the range image of the scan next to it, see postprocessing/range_image.py.
+    """
+    item = load_records(item)
+    write_range_image(range_image_filepath(item["filepath"]), project_records(item["records"]))
+    return item
+
+
+def estimate_scan_normals(item):
+    """
+    Writes the normals and curvature of the scan next to it, see postprocessing/normals.py.
+    Normals face the item's "viewpoint", the scanner location, if it has one.
+    """
+    item = load_records(item)
+    points = np.column_stack([item["records"][axis + "_noise"] for axis in "xyz"])
+    normals, curvature = estimate_normals(points, viewpoint=item.get("viewpoint"))
+    with open(normals_filepath(item["filepath"]), "wb") as file:
+        np.savez_compressed(file, normals=normals.astype(np.float32), curvature=curvature.astype(np.float32))
+    return item
+
+
+def preview_scan(item):
+    """
+    Writes a small preview image of the scan next to it, see postprocessing/preview.py.
+    """
+    item = load_records(item)
+    write_png(preview_filepath(item["filepath"]), render_points(*scan_points(item["records"])))
+    return item
+
+
+# Stages that can be chosen by name, e.g. on the command line of main.py
+SCAN_STAGES = {
+    "encode": encode_scan,
+    "range_image": project_scan,
+    "normals": estimate_scan_normals,
+    "preview": preview_scan,
+}
+
+
+class Stage:
+
+    def __init__(self, name: str, function, workers: int = 1):
+        if workers < 1:
+            raise ValueError(f"'workers' {workers} of stage {name} must be at least 1.")
+        self.name = name
+        self.function = function
+        self.workers = workers
+
+
+class Pipeline:
+    """
+    Chain of stages connected by bounded queues.
+    """
+
+    def __init__(self, stages, queue_size: int = None):
+        if queue_size is None:
+            queue_size = config.get("pipeline_queue_size", 8)
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = list(stages)
+        self.queues = [multiprocessing.Queue(queue_size) for _ in self.stages]
+        # Per stage: processed items, failed items and busy seconds over all workers
+        self.counters = [multiprocessing.Array("d", 3) for _ in self.stages]
+        self.running = [multiprocessing.Value("i", stage.workers) for stage in self.stages]
+        self.start_time = time.time()
+        self.submitted = 0
+
+        self.processes = []
+        for i, stage in enumerate(self.stages):
+            processes = []
+            for _ in range(stage.workers):
+                process = multiprocessing.Process(target=self._work, args=(i,), daemon=True)
+                process.start()
+                processes.append(process)
+            self.processes.append(processes)
+
+
+    def submit(self, item):
+        """
+        Hands an item to the first stage. Blocks while the first queue is full.
+        """
+        self.queues[0].put(item)
+        self.submitted += 1
+
+
+    def close(self):
+        """
+        Waits until every submitted item went through all stages and stops the workers.
+
+        Returns:
+            list: The final report, see report().
+        """
+        self._stop(0)
+        for i in range(len(self.stages)):
+            self._join(i)
+        return self.report()
+
+
+    def _stop(self, i):
+        """
+        Sends a stop to every worker of stage i, unless all of them are dead.
+        """
+        for _ in range(self.stages[i].workers):
+            while True:
+                try:
+                    self.queues[i].put(_STOP, timeout=1)
+                    break
+                except queue.Full:
+                    if not any(process.is_alive() for process in self.processes[i]):
+                        return
+
+
+    def _join(self, i):
+        """
+        Waits for the workers of stage i. Stops the next stage if a worker of this one died before it could.
+        """
+        next_processes = self.processes[i + 1] if i + 1 < len(self.stages) else []
+        while any(process.is_alive() for process in self.processes[i]):
+            for process in self.processes[i]:
+                process.join(timeout=1)
+            if next_processes and not any(process.is_alive() for process in next_processes):
+                # Nothing reads the next queue anymore, so the workers of this stage would block on it
+                self._drain(i + 1)
+        dead = [process.exitcode for process in self.processes[i] if process.exitcode != 0]
+        if dead:
+            print(f"[{self.stages[i].name}] {len(dead)} workers died, exit codes {dead}")
+        # The last worker stops the next stage, unless a worker died and never counted itself out
+        if self.running[i].value > 0 and next_processes:
+            self._stop(i + 1)
+
+
+    def _drain(self, i):
+        try:
+            while True:
+                self.queues[i].get_nowait()
+        except queue.Empty:
+            pass
+
+
+    def report(self):
+        """
+        Returns one dict per stage with the processed and failed item counts,
+        the throughput in items per second of wall time, the share of time its
+        workers were busy, and the number of items waiting in its queue.
+        """
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        report = []
+        for stage, queue, counters in zip(self.stages, self.queues, self.counters):
+            processed, failed, busy = counters[:]
+            try:
+                depth = queue.qsize()
+            except NotImplementedError:
+                depth = None
+            report.append({
+                "stage": stage.name,
+                "processed": int(processed),
+                "failed": int(failed),
+                "per_second": processed / elapsed,
+                "busy": busy / (elapsed * stage.workers),
+                "queue_depth": depth,
+            })
+        return report
+
+
+    def log_report(self):
+        for stage in self.report():
+            depth = "?" if stage["queue_depth"] is None else stage["queue_depth"]
+            print(f"[{stage['stage']}] {stage['processed']} done, {stage['failed']} failed, "
+                  f"{stage['per_second']:.2f}/s, busy {stage['busy']:.0%}, queued {depth}")
+
+
+    def _work(self, i):
+        stage = self.stages[i]
+        queue = self.queues[i]
+        next_queue = self.queues[i + 1] if i + 1 < len(self.stages) else None
+        counters = self.counters[i]
+        while True:
+            item = queue.get()
+            if item is _STOP:
+                break
+            start_time = time.time()
+            try:
+                result = stage.function(item)
+                failed = 0
+            except Exception:
+                print(f"[{stage.name}] failed:")
+                traceback.print_exc()
+                result = None
+                failed = 1
+            with counters.get_lock():
+                counters[0] += 1 - failed
+                counters[1] += failed
+                counters[2] += time.time() - start_time
+            if result is not None and next_queue is not None:
+                next_queue.put(result)
+
+        # The last worker of a stage stops the next stage
+        with self.running[i].get_lock():
+            self.running[i].value -= 1
+            last = self.running[i].value == 0
+        if last and next_queue is not None:
+            for _ in range(self.stages[i + 1].workers):
+                next_queue.put(_STOP)
+
+
+def scan_pipeline(names, workers: int = 1, queue_size: int = None):
+    """
+    Creates a pipeline of the SCAN_STAGES with the given names, in order.
+    """
+    unknown = [name for name in names if name not in SCAN_STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stages: {unknown}. Known stages: {sorted(SCAN_STAGES)}")
+    return Pipeline([Stage(name, SCAN_STAGES[name], workers) for name in names], queue_size)
@@ -0,0 +1,273 @@
+# postprocessing/preview.py
+"""
+Small preview images of scans, rendered with NumPy instead of Blender.
+
+    python postprocessing/preview.py "/media/dawid/blensor data/jan20252" --sheet sheet.png
+
+Every scan gets a preview next to it, scanning{n}/scan1.preview.png, the
+same file the "preview" stage of postprocessing/pipeline.py writes. The
+contact sheet has a row per scene and is written row by row, so only one
+row of previews is held in memory.
+
+Points are projected with a pinhole camera looking at the center of the
+cloud from above and to the side, kept per pixel only if they are nearest to
+the camera (z-buffer), and drawn as small squares. They are coloured by object id, or
+by depth, and shaded darker with depth so the shapes stay readable.
+
+PNG files are written with zlib and struct only. A preview takes a small
+fraction of a second, so previews can be made for every scene.
+"""
+
+import os
+import sys
+import glob
+import zlib
+import struct
+import argparse
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import read_evd
+
+config = SystemConfiguration()
+
+BACKGROUND = (24, 24, 28)
+# Near to far
+DEPTH_COLORS = np.array([[253, 231, 37], [53, 183, 121], [49, 104, 142], [68, 1, 84]], dtype=np.float64)
+
+
+def object_colors(object_ids):
+    """
+    Distinct colours per object id, hues spread by the golden ratio.
+    """
+    hue = np.mod(np.asarray(object_ids, dtype=np.float64) * 0.618033988749895, 1.0) * 6
+    x = 1 - np.abs(np.mod(hue, 2) - 1)
+    sector = hue.astype(np.int64) % 6
+    zeros, ones = np.zeros_like(hue), np.ones_like(hue)
+    r = np.choose(sector, [ones, x, zeros, zeros, x, ones])
+    g = np.choose(sector, [x, ones, ones, x, zeros, zeros])
+    b = np.choose(sector, [zeros, zeros, x, ones, ones, x])
+    return np.column_stack((r, g, b)) * 200 + 55
+
+
+def depth_colors(depth):
+    """
+    Colours from near (yellow) to far (purple), for depths normalized to [0, 1].
+    """
+    position = np.clip(depth, 0, 1) * (len(DEPTH_COLORS) - 1)
+    low = np.minimum(position.astype(np.int64), len(DEPTH_COLORS) - 2)
+    t = (position - low)[:, None]
+    return DEPTH_COLORS[low] * (1 - t) + DEPTH_COLORS[low + 1] * t
+
+
+def look_at(eye, target):
+    """
+    Returns the rotation of a camera at 'eye' looking at 'target', with z up. Rows are the camera axes.
+    """
+    forward = np.asarray(target, dtype=np.float64) - np.asarray(eye, dtype=np.float64)
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, [0.0, 0.0, 1.0])
+    if np.linalg.norm(right) < 1e-9:
+        right = np.array([1.0, 0.0, 0.0])
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    return np.stack((right, up, forward))
+
+
+def render_points(points, object_ids=None, color_by="object", size=None, point_size=None, azimuth=45.0, elevation=30.0, fov=40.0):
+    """
+    Renders a point cloud into an RGB image.
+
+    Parameters:
+        points (np.ndarray): (N, 3) points.
+        object_ids (np.ndarray or None): Object id per point, needed for color_by="object".
+        color_by (str): "object" or "depth".
+        size (int): Width and height of the image in pixels.
+        point_size (int): Width of the square drawn per point.
+        azimuth, elevation (float): Direction the camera looks from, in degrees.
+        fov (float): Field of view in degrees.
+
+    Returns:
+        np.ndarray: (size, size, 3) uint8 image.
+    """
+    if size is None:
+        size = config.get("preview_size", 256)
+    if point_size is None:
+        point_size = config.get("preview_point_size", 2)
+    if color_by not in ("object", "depth"):
+        raise ValueError(f"Unknown color_by: {color_by}")
+    image = np.empty((size, size, 3), dtype=np.uint8)
+    image[:] = BACKGROUND
+    points = np.asarray(points, dtype=np.float64)
+    finite = np.all(np.isfinite(points), axis=1)
+    points = points[finite]
+    if len(points) == 0:
+        return image
+    if object_ids is None:
+        color_by = "depth"
+    else:
+        object_ids = np.asarray(object_ids)[finite]
+
+    # Frame the bounding sphere of the cloud
+    low, high = points.min(axis=0), points.max(axis=0)
+    center = (low + high) / 2
+    radius = max(np.linalg.norm(high - low) / 2, 1e-9)
+    distance = radius / np.sin(np.radians(fov) / 2)
+    a, e = np.radians(azimuth), np.radians(elevation)
+    eye = center + distance * np.array([np.cos(e) * np.cos(a), np.cos(e) * np.sin(a), np.sin(e)])
+    camera = (points - eye) @ look_at(eye, center).T
+    depth = camera[:, 2]
+    focal = size / 2 / np.tan(np.radians(fov) / 2)
+    u = (size / 2 + focal * camera[:, 0] / depth).astype(np.int64)
+    v = (size / 2 - focal * camera[:, 1] / depth).astype(np.int64)
+
+    near, far = distance - radius, distance + radius
+    normalized = (depth - near) / (far - near)
+    if color_by == "object":
+        colors = object_colors(object_ids)
+    else:
+        colors = depth_colors(normalized)
+    colors = colors * (1 - 0.5 * np.clip(normalized, 0, 1))[:, None]
+
+    # Every point covers a point_size x point_size square
+    offsets = np.arange(point_size) - point_size // 2
+    du, dv = np.meshgrid(offsets, offsets)
+    u = (u[:, None] + du.reshape(-1)).reshape(-1)
+    v = (v[:, None] + dv.reshape(-1)).reshape(-1)
+    index = np.repeat(np.arange(len(points)), point_size * point_size)
+    inside = (u >= 0) & (u < size) & (v >= 0) & (v < size)
+    pixel, index = v[inside] * size + u[inside], index[inside]
+
+    # Z-buffer: sort by pixel, then depth, and keep the nearest point of every pixel
+    order = np.lexsort((depth[index], pixel))
+    pixel, index = pixel[order], index[order]
+    first = np.ones(len(pixel), dtype=bool)
+    first[1:] = pixel[1:] != pixel[:-1]
+    image.reshape(-1, 3)[pixel[first]] = np.clip(colors[index[first]], 0, 255).astype(np.uint8)
+    return image
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+
+def _png_rows(image):
+    # Every row starts with filter type 0 (none)
+    height = image.shape[0]
+    return np.concatenate((np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)), axis=1).tobytes()
+
+
+def write_png(filepath, image):
+    """
+    Writes an (H, W, 3) uint8 image as a PNG file.
+    """
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape[:2]
+    with open(filepath, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        file.write(_png_chunk(b"IDAT", zlib.compress(_png_rows(image), 6)))
+        file.write(_png_chunk(b"IEND", b""))
+
+
+class ContactSheetWriter:
+    """
+    Writes a contact sheet of 'count' tiles as a PNG file, one row of tiles at a time.
+    """
+
+    def __init__(self, filepath, count: int, columns: int, tile_size: int, gap: int = 2):
+        if count < 1 or columns < 1:
+            raise ValueError("A contact sheet needs at least one tile and one column.")
+        self.columns = columns
+        self.tile_size = tile_size
+        self.gap = gap
+        self.rows = -(-count // columns)
+        self.width = columns * tile_size + (columns - 1) * gap
+        height = self.rows * tile_size + (self.rows - 1) * gap
+        self._row = []
+        self._rows_written = 0
+        self._compressor = zlib.compressobj(6)
+        self._file = open(filepath, "wb")
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        self._file.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, height, 8, 2, 0, 0, 0)))
+
+
+    def add(self, image):
+        self._row.append(image)
+        if len(self._row) == self.columns:
+            self._write_row()
+
+
+    def close(self):
+        while self._rows_written < self.rows:
+            self._write_row()
+        self._file.write(_png_chunk(b"IDAT", self._compressor.flush()))
+        self._file.write(_png_chunk(b"IEND", b""))
+        self._file.close()
+
+
+    def _write_row(self):
+        strip = np.zeros((self.tile_size + (self.gap if self._rows_written < self.rows - 1 else 0), self.width, 3), dtype=np.uint8)
+        for column, image in enumerate(self._row):
+            x = column * (self.tile_size + self.gap)
+            strip[:self.tile_size, x:x + self.tile_size] = image
+        self._row = []
+        self._rows_written += 1
+        data = self._compressor.compress(_png_rows(strip))
+        if data:
+            self._file.write(_png_chunk(b"IDAT", data))
+
+
+def scan_points(records, max_points=None, noisy=True):
+    """
+    Returns the points and object ids of scan records, thinned out to at most 'max_points'.
+    """
+    if max_points is None:
+        max_points = config.get("preview_max_points", 200000)
+    step = max(1, -(-len(records) // max_points))
+    records = records[::step]
+    suffix = "_noise" if noisy else ""
+    points = np.column_stack([records[axis + suffix] for axis in "xyz"])
+    return points, records["object_id"]
+
+
+def preview_filepath(scan_filepath):
+    return os.path.splitext(scan_filepath)[0] + ".preview.png"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a preview of every scan of a run.")
+    parser.add_argument("root", help="Directory holding the scanning{n} directories.")
+    parser.add_argument("--scans", nargs="+", default=["scan1", "scan2", "scan3"], help="Scan names of every scene, one sheet column each.")
+    parser.add_argument("--color-by", choices=["object", "depth"], default="object")
+    parser.add_argument("--size", type=int, default=None, help="Width and height of a preview in pixels.")
+    parser.add_argument("--sheet", default=None, help="Also write a contact sheet of all previews to this file, a row per scene.")
+    args = parser.parse_args()
+
+    size = args.size or config.get("preview_size", 256)
+    scene_dirs = [d for d in glob.glob(os.path.join(args.root, "scanning*")) if os.path.basename(d)[len("scanning"):].isdigit()]
+    scene_dirs.sort(key=lambda d: int(os.path.basename(d)[len("scanning"):]))
+    sheet = ContactSheetWriter(args.sheet, len(scene_dirs) * len(args.scans), len(args.scans), size) if args.sheet and scene_dirs else None
+    try:
+        for scene_dir in scene_dirs:
+            for name in args.scans:
+                filepath = os.path.join(scene_dir, f"{name}.evd")
+                if os.path.exists(filepath):
+                    image = render_points(*scan_points(read_evd(filepath)), color_by=args.color_by, size=size)
+                    write_png(preview_filepath(filepath), image)
+                else:
+                    image = render_points(np.zeros((0, 3)), size=size)
+                if sheet is not None:
+                    sheet.add(image)
+    finally:
+        if sheet is not None:
+            sheet.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# postprocessing/qa.py
+"""
+Quality checks of scans, cheap enough to run right after every scan.
+
+    python postprocessing/qa.py "/media/dawid/blensor data/jan20252"
+
+A scan is streamed once and every return is assigned to the AABBs of the
+scene objects it falls into (grown by a small margin). From that:
+    - points: number of returns
+    - coverage: share of the objects hit by at least 'min_hits_per_object' returns
+    - outlier_rate: share of the returns outside of every AABB
+
+A scan fails if it has too few points (the scanner faced away from every
+object), too little coverage (most objects were hidden or out of range) or
+too many outliers (the scanner was inside geometry or the returns are
+broken). RuntimeModule rescans failed scans from a new viewpoint.
+"""
+
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import iter_evd
+from postprocessing.utils import read_scene_metadata, scene_metadata_filepath
+
+config = SystemConfiguration()
+
+# Upper bound of points x AABBs compared at once
+_BATCH_ELEMENTS = 1 << 22
+
+
+class ScanReport:
+
+    def __init__(self, points, hit_counts, outliers, min_points, min_hits_per_object, min_coverage, max_outlier_rate):
+        self.points = int(points)
+        self.hit_counts = np.asarray(hit_counts, dtype=np.int64)
+        self.outliers = int(outliers)
+        self.coverage = float(np.mean(self.hit_counts >= min_hits_per_object)) if len(self.hit_counts) else 0.0
+        self.outlier_rate = self.outliers / self.points if self.points else 0.0
+
+        self.reasons = []
+        if self.points < min_points:
+            self.reasons.append(f"{self.points} points, expected at least {min_points}")
+        if self.coverage < min_coverage:
+            self.reasons.append(f"coverage {self.coverage:.2f} below {min_coverage}")
+        if self.outlier_rate > max_outlier_rate:
+            self.reasons.append(f"outlier rate {self.outlier_rate:.3f} above {max_outlier_rate}")
+
+
+    @property
+    def passed(self):
+        return not self.reasons
+
+
+    def as_dict(self):
+        return {
+            "passed": self.passed,
+            "points": self.points,
+            "coverage": round(self.coverage, 4),
+            "outlier_rate": round(self.outlier_rate, 4),
+            "objects_hit": int(np.count_nonzero(self.hit_counts)),
+            "reasons": list(self.reasons),
+        }
+
+
+    def __repr__(self):
+        status = "passed" if self.passed else "failed: " + "; ".join(self.reasons)
+        return f"ScanReport({self.points} points, coverage {self.coverage:.2f}, outliers {self.outlier_rate:.3f}, {status})"
+
+
+def check_records(chunks, aabbs, scene_size, min_points=None, min_hits_per_object=None, min_coverage=None, max_outlier_rate=None, margin=None):
+    """
+    Checks a scan given as an iterable of record chunks, e.g. iter_evd(filepath).
+
+    Parameters:
+        aabbs (list): (min, max) corners of the objects of the scene.
+        scene_size (float): Scales the margin the AABBs are grown by.
+        margin (float): Margin as a fraction of scene_size.
+
+    Returns:
+        ScanReport: The measured values and whether the scan passed.
+    """
+    if min_points is None:
+        min_points = config.get("qa_min_points", 1000)
+    if min_hits_per_object is None:
+        min_hits_per_object = config.get("qa_min_hits_per_object", 10)
+    if min_coverage is None:
+        min_coverage = config.get("qa_min_coverage", 0.5)
+    if max_outlier_rate is None:
+        max_outlier_rate = config.get("qa_max_outlier_rate", 0.2)
+    if margin is None:
+        margin = config.get("qa_aabb_margin", 0.01)
+
+    # AABBs from get_aabb() hold mathutils vectors
+    aabbs = np.array([[list(low), list(high)] for low, high in aabbs], dtype=np.float64).reshape(-1, 2, 3)
+    low = aabbs[:, 0] - margin * scene_size
+    high = aabbs[:, 1] + margin * scene_size
+    batch_size = max(1, _BATCH_ELEMENTS // max(len(aabbs), 1))
+
+    points = 0
+    outliers = 0
+    hit_counts = np.zeros(len(aabbs), dtype=np.int64)
+    for records in chunks:
+        xyz = np.stack((records["x"], records["y"], records["z"]), axis=1)
+        points += len(xyz)
+        for start in range(0, len(xyz), batch_size):
+            batch = xyz[start:start + batch_size, None, :]
+            inside = np.all((batch >= low) & (batch <= high), axis=2)
+            hit_counts += inside.sum(axis=0)
+            outliers += int(np.count_nonzero(~inside.any(axis=1)))
+    return ScanReport(points, hit_counts, outliers, min_points, min_hits_per_object, min_coverage, max_outlier_rate)
+
+
+def check_scan(filepath, aabbs, scene_size, **thresholds):
+    """
+    Streams an .evd scan through check_records().
+    """
+    return check_records(iter_evd(filepath), aabbs, scene_size, **thresholds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the scans of a run and list the ones that fail.")
+    parser.add_argument("root", help="Directory holding the scanning{n} directories.")
+    args = parser.parse_args()
+
+    # Only needed here, the AABBs of a run are recomputed from its metadata
+    from scene_generator.surface_sampling import world_aabb
+
+    checked = failed = 0
+    for scene_dir in sorted(glob.glob(os.path.join(args.root, "scanning*"))):
+        metadata = read_scene_metadata(scene_metadata_filepath(scene_dir))
+        aabbs = [world_aabb(params) for params in metadata["objects"]]
+        for evd_filepath in sorted(glob.glob(os.path.join(scene_dir, "*.evd"))):
+            report = check_scan(evd_filepath, aabbs, metadata["scene_size"])
+            checked += 1
+            if not report.passed:
+                failed += 1
+                print(f"{evd_filepath}: {report}")
+    print(f"{failed} of {checked} scans failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
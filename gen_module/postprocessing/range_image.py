@@ -0,0 +1,148 @@
+# postprocessing/range_image.py
+"""
+Projects VLP-16 scans onto range images, one row per laser ring.
+
+    python postprocessing/range_image.py "/media/dawid/blensor data/jan20252"
+
+Writes scan1.range.npz next to every scan1.evd, holding three channels of
+shape (16, columns), row 0 being the lowest laser:
+    - range:     distance of the return in meters, 0 where there is no return
+    - intensity: brightness of the return color, as .evd files carry no separate
+                 intensity, 0 where there is no return
+    - object_id: object id of the return, -1 where there is no return
+
+The azimuth resolution matches the angle_resolution the scans are taken
+with (0.1 degrees, 3600 columns). A scan of several frames hits most pixels
+more than once, and the nearest return is kept.
+"""
+
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import iter_evd
+from postprocessing.utils import laser_rings, VLP16_ELEVATIONS
+
+config = SystemConfiguration()
+
+ROWS = len(VLP16_ELEVATIONS)
+
+
+def image_columns(azimuth_resolution):
+    columns = int(round(360.0 / azimuth_resolution))
+    if not np.isclose(columns * azimuth_resolution, 360.0):
+        raise ValueError(f"'azimuth_resolution' {azimuth_resolution} must divide 360 degrees.")
+    return columns
+
+
+def empty_range_image(columns):
+    return {
+        "range": np.zeros((ROWS, columns), dtype=np.float32),
+        "intensity": np.zeros((ROWS, columns), dtype=np.float32),
+        "object_id": np.full((ROWS, columns), -1, dtype=np.int32),
+    }
+
+
+def project_records(records, azimuth_resolution=None, noisy=True, image=None):
+    """
+    Projects .evd records onto a range image.
+
+    Parameters:
+        records (np.ndarray): Records with the fields of EVD_DTYPE.
+        azimuth_resolution (float or None): Width of a column in degrees.
+        noisy (bool): Use the noisy distances instead of the exact ones.
+        image (dict or None): A range image to add the records to, returns
+            already in it are only replaced by nearer ones.
+
+    Returns:
+        dict: The "range", "intensity" and "object_id" channels.
+    """
+    if azimuth_resolution is None:
+        azimuth_resolution = config.get("range_image_azimuth_resolution", 0.1)
+    columns = image_columns(azimuth_resolution)
+    if image is None:
+        image = empty_range_image(columns)
+
+    distance = records["distance_noise" if noisy else "distance"]
+    valid = distance > 0
+    records, distance = records[valid], distance[valid]
+    azimuth = np.mod(np.degrees(records["yaw"]), 360.0)
+    column = np.minimum((azimuth / azimuth_resolution).astype(np.int64), columns - 1)
+    pixel = laser_rings(records["pitch"]).astype(np.int64) * columns + column
+
+    # Nearest return of every pixel: sort by pixel, then distance, and take the first of each pixel
+    order = np.lexsort((distance, pixel))
+    pixel = pixel[order]
+    first = np.ones(len(pixel), dtype=bool)
+    first[1:] = pixel[1:] != pixel[:-1]
+    nearest = order[first]
+    pixel = pixel[first]
+
+    ranges = image["range"].reshape(-1)
+    closer = (ranges[pixel] == 0) | (distance[nearest] < ranges[pixel])
+    pixel, nearest = pixel[closer], nearest[closer]
+    ranges[pixel] = distance[nearest]
+    image["intensity"].reshape(-1)[pixel] = (records["r"][nearest] + records["g"][nearest] + records["b"][nearest]) / 3.0
+    image["object_id"].reshape(-1)[pixel] = records["object_id"][nearest].astype(np.int32)
+    return image
+
+
+def project_evd(evd_filepath, azimuth_resolution=None, noisy=True):
+    """
+    Projects an .evd scan onto a range image, streaming it in chunks.
+    """
+    image = None
+    for records in iter_evd(evd_filepath):
+        image = project_records(records, azimuth_resolution, noisy, image)
+    if image is None:
+        if azimuth_resolution is None:
+            azimuth_resolution = config.get("range_image_azimuth_resolution", 0.1)
+        image = empty_range_image(image_columns(azimuth_resolution))
+    return image
+
+
+def range_image_filepath(scan_filepath):
+    return os.path.splitext(scan_filepath)[0] + ".range.npz"
+
+
+def write_range_image(filepath, image):
+    """
+    Writes a range image as a compressed .npz file.
+    """
+    columns = image["range"].shape[1]
+    with open(filepath, "wb") as file:
+        np.savez_compressed(
+            file,
+            azimuth_resolution=np.float64(360.0 / columns),
+            elevations=VLP16_ELEVATIONS,
+            **image
+        )
+
+
+def read_range_image(filepath):
+    with np.load(filepath) as data:
+        return {key: data[key] for key in data.files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project the .evd scans of a run onto range images.")
+    parser.add_argument("root", help="Directory holding the scanning{n} directories.")
+    parser.add_argument("--resolution", type=float, default=None, help="Azimuth resolution in degrees.")
+    parser.add_argument("--exact", action="store_true", help="Use the exact instead of the noisy distances.")
+    args = parser.parse_args()
+
+    for evd_filepath in sorted(glob.glob(os.path.join(args.root, "scanning*", "*.evd"))):
+        image = project_evd(evd_filepath, args.resolution, noisy=not args.exact)
+        write_range_image(range_image_filepath(evd_filepath), image)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# postprocessing/tests/test_codec.py
+
+import os
+import unittest
+import tempfile
+import numpy as np
+from scanner import evd
+from postprocessing import codec, utils
+
+
+def make_scan(n, scene_size, seed=0):
+    """
+    A fake VLP-16 sweep: 16 rings, azimuth increasing over time, points on a sphere of radius scene_size.
+    """
+    random_state = np.random.RandomState(seed)
+    records = np.zeros(n, dtype=evd.EVD_DTYPE)
+    records["pitch"] = utils.VLP16_ELEVATIONS[np.arange(n) % 16]
+    records["yaw"] = np.repeat(np.linspace(0, 2 * np.pi, n // 16 + 1), 16)[:n]
+    records["distance"] = scene_size * (1 + 0.01 * random_state.normal(size=n))
+    x = records["distance"] * np.cos(records["pitch"]) * np.cos(records["yaw"])
+    y = records["distance"] * np.cos(records["pitch"]) * np.sin(records["yaw"])
+    z = records["distance"] * np.sin(records["pitch"])
+    for axis, values in zip("xyz", (x, y, z)):
+        records[axis] = values
+        records[axis + "_noise"] = values + random_state.normal(0, 0.001 * scene_size, n)
+    records["object_id"] = (records["yaw"] * 3).astype(np.uint64)
+    return records
+
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.evd_filepath = os.path.join(self.tmpdir.name, "scan.evd")
+        self.pcq_filepath = os.path.join(self.tmpdir.name, "scan.pcq")
+        self.scene_size = 2.5
+        self.records = make_scan(10_000, self.scene_size)
+        evd.write_evd(self.evd_filepath, self.records)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        count = codec.encode_evd(self.evd_filepath, self.pcq_filepath, self.scene_size, tolerance=1e-4, block_size=3000)
+        self.assertEqual(count, len(self.records))
+
+        max_error = codec.check_round_trip(self.evd_filepath, self.pcq_filepath)
+        self.assertLessEqual(max_error, self.scene_size * 1e-4 / 2 + 1e-12)
+        self.assertLess(os.path.getsize(self.pcq_filepath) * 4, os.path.getsize(self.evd_filepath))
+
+    def test_sub_range_matches_full_decode(self):
+        codec.encode_evd(self.evd_filepath, self.pcq_filepath, self.scene_size, block_size=1000)
+        decoder = codec.PointCloudDecoder(self.pcq_filepath)
+        full = decoder.read()
+
+        self.assertEqual(len(full), len(self.records))
+        np.testing.assert_array_equal(decoder.read(2500, 4200), full[2500:4200])
+        self.assertEqual(len(decoder.read(9990, 20000)), 10)
+
+    def test_detects_mismatch(self):
+        codec.encode_evd(self.evd_filepath, self.pcq_filepath, self.scene_size)
+        evd.write_evd(self.evd_filepath, make_scan(10_000, self.scene_size, seed=1))
+        with self.assertRaises(ValueError):
+            codec.check_round_trip(self.evd_filepath, self.pcq_filepath)
+
+    def test_overflow_names_the_column(self):
+        records = self.records.copy()
+        records["object_id"][::2] = 2 ** 40
+        with self.assertRaisesRegex(ValueError, "'object_id'.*2\\*\\*31") as context:
+            with codec.PointCloudEncoder(self.pcq_filepath, self.scene_size) as encoder:
+                encoder.write(records)
+        self.assertNotIn("tolerance", str(context.exception))
+
+        with self.assertRaisesRegex(ValueError, "'x'.*Increase the tolerance"):
+            with codec.PointCloudEncoder(self.pcq_filepath, self.scene_size, tolerance=1e-12) as encoder:
+                encoder.write(self.records)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,47 @@
+# postprocessing/tests/test_normals.py
+
+import unittest
+import numpy as np
+from scene_generator.surface_sampling import sample_scene_points
+from postprocessing import normals
+
+
+class TestNormals(unittest.TestCase):
+
+    OBJECTS = [
+        {"type": "box", "size": [1, 2, 1.5], "location": [0, 0, 0], "rotation": [0.3, 0.2, 1.0]},
+        {"type": "cylinder", "radius": 0.5, "depth": 1, "vertices": 32, "location": [3, 0, 0], "rotation": [1.0, 0, 0.4]},
+        {"type": "sphere", "size": 0.8, "location": [0, 3, 0], "rotation": [0, 0, 0]},
+        {"type": "pyramid", "radius": 0.7, "depth": 1.2, "vertices": 4, "location": [3, 3, 1], "rotation": [0.1, 0.5, 0.2]},
+    ]
+
+    def setUp(self):
+        self.points, self.normals, self.labels = sample_scene_points(self.OBJECTS, 20_000, np.random.RandomState(0))
+
+    def test_knn_matches_brute_force(self):
+        index = normals.GridIndex(self.points, k=8)
+        queries = np.arange(0, len(self.points), 997)
+        found = index.knn(queries)
+        for query, neighbours in zip(queries, found):
+            distances = np.sum((self.points - self.points[query]) ** 2, axis=1)
+            np.testing.assert_allclose(np.sort(distances[neighbours]), np.sort(distances)[:8])
+
+    def test_ground_truth_normals(self):
+        truth, distances, labels = normals.ground_truth_normals(self.points, self.OBJECTS)
+        np.testing.assert_allclose(distances, 0, atol=1e-9)
+        np.testing.assert_array_equal(labels, self.labels)
+        # Points on edges may get the normal of the neighbouring face
+        self.assertGreater(np.mean(np.einsum("ij,ij->i", truth, self.normals) > 0.999), 0.99)
+
+    def test_estimates_match_ground_truth(self):
+        estimated, curvature = normals.estimate_normals(self.points, k=16, chunk_size=5000)
+        errors = normals.normal_angle_errors(estimated, self.normals)
+        self.assertLess(np.median(errors), 1.0)
+        self.assertTrue(np.all((curvature >= 0) & (curvature <= 1 / 3 + 1e-9)))
+
+        chunked, _ = normals.estimate_normals(self.points, k=16, chunk_size=777)
+        np.testing.assert_allclose(normals.normal_angle_errors(chunked, estimated), 0, atol=1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,150 @@
+# postprocessing/tests/test_pipeline.py
+
+import os
+import unittest
+import tempfile
+import numpy as np
+from unittest import mock
+from postprocessing import pipeline
+from postprocessing.codec import PointCloudDecoder
+from postprocessing.tests.test_codec import make_scan
+from scanner.evd import read_evd, write_evd
+
+
+def double(item):
+    return dict(item, value=item["value"] * 2)
+
+
+def drop_odd(item):
+    if item["value"] % 4:
+        return None
+    return item
+
+
+def fail_on_zero(item):
+    if item["value"] == 0:
+        raise ValueError("zero")
+    return item
+
+
+def die_on_zero(item):
+    if item["value"] == 0:
+        os._exit(1)
+    return item
+
+
+class Collect:
+    """
+    Writes the values reaching the end of the pipeline to a file, one per line.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def __call__(self, item):
+        with open(self.filepath, "a") as file:
+            file.write(f"{item['value']}\n")
+        return item
+
+
+class CountReads:
+    """
+    Reads .evd files and writes their paths to a file, one per line.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def __call__(self, filepath):
+        with open(self.filepath, "a") as file:
+            file.write(f"{filepath}\n")
+        return read_evd(filepath)
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmpdir.name, "output.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_items_pass_all_stages(self):
+        stages = [
+            pipeline.Stage("double", double, workers=3),
+            pipeline.Stage("fail", fail_on_zero, workers=2),
+            pipeline.Stage("drop", drop_odd),
+            pipeline.Stage("collect", Collect(self.output)),
+        ]
+        chain = pipeline.Pipeline(stages, queue_size=2)
+        for value in range(20):
+            chain.submit({"value": value})
+        report = chain.close()
+
+        with open(self.output) as file:
+            values = sorted(int(line) for line in file)
+        self.assertEqual(values, [v * 2 for v in range(2, 20, 2)])
+        self.assertEqual([stage["processed"] for stage in report], [20, 19, 19, 9])
+        self.assertEqual(report[1]["failed"], 1)
+
+    def test_scan_stages_write_outputs(self):
+        records = make_scan(5000, 2.5)
+        records["distance_noise"] = records["distance"]
+        filepath = os.path.join(self.tmpdir.name, "scan1.evd")
+        chain = pipeline.scan_pipeline(["encode", "range_image", "normals"])
+        chain.submit({"filepath": filepath, "records": records, "scene_size": 2.5})
+        report = chain.close()
+
+        self.assertTrue(all(stage["processed"] == 1 for stage in report))
+        for name in ("scan1.pcq", "scan1.range.npz", "scan1.normals.npz"):
+            self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, name)))
+
+    def test_normals_face_the_viewpoint(self):
+        records = make_scan(5000, 2.5)
+        filepath = os.path.join(self.tmpdir.name, "scan1.evd")
+        viewpoint = [0.1, -0.2, 0.3]
+        pipeline.estimate_scan_normals({"filepath": filepath, "records": records, "viewpoint": viewpoint})
+
+        with np.load(pipeline.normals_filepath(filepath)) as data:
+            normals = data["normals"]
+        points = np.column_stack([records[axis + "_noise"] for axis in "xyz"])
+        self.assertTrue(np.all(np.einsum("ij,ij->i", normals, viewpoint - points) >= 0))
+
+    def test_close_survives_a_dead_worker(self):
+        stages = [
+            pipeline.Stage("die", die_on_zero, workers=2),
+            pipeline.Stage("collect", Collect(self.output)),
+        ]
+        chain = pipeline.Pipeline(stages, queue_size=2)
+        for value in range(6):
+            chain.submit({"value": value})
+        report = chain.close()
+
+        with open(self.output) as file:
+            values = sorted(int(line) for line in file)
+        self.assertEqual(values, [1, 2, 3, 4, 5])
+        self.assertEqual(report[1]["processed"], 5)
+
+    def test_scan_items_are_read_once_by_the_stages(self):
+        records = make_scan(5000, 2.5)
+        filepath = os.path.join(self.tmpdir.name, "scan1.evd")
+        write_evd(filepath, records)
+        # The workers are forked, so they read through the patched function
+        with mock.patch.object(pipeline, "read_evd", CountReads(self.output)):
+            chain = pipeline.scan_pipeline(["encode", "range_image", "normals", "preview"])
+            chain.submit({"filepath": filepath, "scene_size": 2.5})
+            report = chain.close()
+
+        self.assertTrue(all(stage["processed"] == 1 for stage in report))
+        self.assertEqual(len(PointCloudDecoder(os.path.join(self.tmpdir.name, "scan1.pcq"))), 5000)
+        with open(self.output) as file:
+            self.assertEqual(file.read().splitlines(), [filepath])
+
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            pipeline.scan_pipeline(["encode", "compress"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
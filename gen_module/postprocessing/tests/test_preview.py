@@ -0,0 +1,97 @@
+# postprocessing/tests/test_preview.py
+
+import os
+import time
+import zlib
+import struct
+import unittest
+import tempfile
+import numpy as np
+from scanner.evd import EVD_DTYPE
+from postprocessing.preview import BACKGROUND, ContactSheetWriter, object_colors, render_points, scan_points, write_png
+
+
+def read_png(filepath):
+    with open(filepath, "rb") as file:
+        data = file.read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks, position = {}, 8
+    while position < len(data):
+        length, = struct.unpack(">I", data[position:position + 4])
+        kind = data[position + 4:position + 8]
+        body = data[position + 8:position + 8 + length]
+        crc, = struct.unpack(">I", data[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(kind + body) & 0xffffffff
+        chunks[kind] = chunks.get(kind, b"") + body
+        position += 12 + length
+    width, height = struct.unpack(">II", chunks[b"IHDR"][:8])
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, -1)
+    return rows[:, 1:].reshape(height, width, 3)
+
+
+def contact_sheet(images, columns, gap):
+    # The whole sheet in memory, what ContactSheetWriter must write row by row
+    height, width = images[0].shape[:2]
+    rows = -(-len(images) // columns)
+    sheet = np.zeros((rows * height + (rows - 1) * gap, columns * width + (columns - 1) * gap, 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        row, column = divmod(i, columns)
+        y, x = row * (height + gap), column * (width + gap)
+        sheet[y:y + height, x:x + width] = image
+    return sheet
+
+
+class TestPreview(unittest.TestCase):
+
+    def test_png_round_trip(self):
+        image = np.random.RandomState(0).randint(0, 256, (5, 7, 3)).astype(np.uint8)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "preview.png")
+            write_png(filepath, image)
+            np.testing.assert_array_equal(read_png(filepath), image)
+
+    def test_nearest_point_wins(self):
+        # Two points on the line of sight of the camera, only the near one is drawn
+        direction = np.array([np.cos(np.radians(30)) * np.cos(np.radians(45)),
+                              np.cos(np.radians(30)) * np.sin(np.radians(45)),
+                              np.sin(np.radians(30))])
+        points = np.array([direction, -direction])
+        image = render_points(points, np.array([1, 2]), size=32, point_size=1)
+        drawn = image[np.any(image != BACKGROUND, axis=2)]
+        self.assertEqual(len(drawn), 1)
+        np.testing.assert_array_equal(drawn[0], object_colors([1])[0].astype(np.uint8))
+
+    def test_empty_cloud_is_background(self):
+        image = render_points(np.full((3, 3), np.nan), size=8)
+        self.assertTrue(np.all(image == BACKGROUND))
+
+    def test_scene_preview_is_fast(self):
+        random_state = np.random.RandomState(0)
+        records = np.zeros(1000000, dtype=EVD_DTYPE)
+        for axis in "xyz":
+            records[axis + "_noise"] = random_state.uniform(-2, 2, len(records))
+        records["object_id"] = random_state.randint(0, 20, len(records))
+        start_time = time.time()
+        points, object_ids = scan_points(records, max_points=200000)
+        image = render_points(points, object_ids, size=256)
+        self.assertLess(time.time() - start_time, 1.0)
+        self.assertEqual(len(points), 200000)
+        self.assertEqual(image.shape, (256, 256, 3))
+        self.assertGreater(np.mean(np.any(image != BACKGROUND, axis=2)), 0.2)
+
+    def test_streamed_contact_sheet(self):
+        images = [np.full((4, 4, 3), 10 * i, dtype=np.uint8) for i in range(5)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "sheet.png")
+            writer = ContactSheetWriter(filepath, count=5, columns=3, tile_size=4, gap=1)
+            for image in images:
+                writer.add(image)
+            writer.close()
+            sheet = read_png(filepath)
+        self.assertEqual(sheet.shape, (9, 14, 3))
+        self.assertTrue(np.all(sheet[5:9, 5:9] == 40))
+        np.testing.assert_array_equal(sheet, contact_sheet(images, columns=3, gap=1))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,85 @@
+# postprocessing/tests/test_qa.py
+
+import os
+import unittest
+import tempfile
+import numpy as np
+from scanner.evd import EVD_DTYPE, write_evd
+from postprocessing.qa import check_records, check_scan
+from postprocessing.utils import read_scene_metadata
+
+
+def make_hits(aabbs, counts, outliers, seed=0):
+    random_state = np.random.RandomState(seed)
+    points = [random_state.uniform(low, high, (count, 3)) for (low, high), count in zip(aabbs, counts)]
+    points.append(random_state.uniform(50, 60, (outliers, 3)))
+    points = np.concatenate(points)
+    records = np.zeros(len(points), dtype=EVD_DTYPE)
+    for i, axis in enumerate("xyz"):
+        records[axis] = records[f"{axis}_noise"] = points[:, i]
+    return records
+
+
+class TestScanQA(unittest.TestCase):
+
+    AABBS = [([-1, -1, -1], [0, 0, 0]), ([0.5, 0.5, 0.5], [1, 1, 1]), ([2, 2, 2], [3, 3, 3]), ([-3, 2, 0], [-2, 3, 1])]
+    THRESHOLDS = dict(min_points=100, min_hits_per_object=10, min_coverage=0.5, max_outlier_rate=0.2, margin=0.01)
+
+    def check(self, records, chunk=1000, **thresholds):
+        chunks = [records[i:i + chunk] for i in range(0, len(records), chunk)]
+        return check_records(chunks, self.AABBS, 2.5, **dict(self.THRESHOLDS, **thresholds))
+
+    def test_good_scan_passes(self):
+        report = self.check(make_hits(self.AABBS, [500, 300, 200, 100], 50))
+        self.assertTrue(report.passed)
+        self.assertEqual(report.points, 1150)
+        self.assertEqual(report.coverage, 1.0)
+        self.assertAlmostEqual(report.outlier_rate, 50 / 1150)
+        self.assertEqual(report.as_dict()["objects_hit"], 4)
+
+    def test_empty_scan_fails(self):
+        report = self.check(np.zeros(0, dtype=EVD_DTYPE))
+        self.assertFalse(report.passed)
+        self.assertEqual(len(report.reasons), 2)
+
+    def test_scan_facing_one_object_fails(self):
+        report = self.check(make_hits(self.AABBS, [2000, 0, 0, 5], 0))
+        self.assertFalse(report.passed)
+        self.assertEqual(report.coverage, 0.25)
+
+    def test_outliers_fail(self):
+        report = self.check(make_hits(self.AABBS, [100, 100, 100, 100], 200))
+        self.assertFalse(report.passed)
+        self.assertIn("outlier", report.reasons[0])
+
+    def test_batches_match_a_single_pass(self):
+        records = make_hits(self.AABBS, [500, 300, 200, 100], 50)
+        expected = self.check(records, chunk=len(records))
+        report = self.check(records, chunk=7)
+        np.testing.assert_array_equal(report.hit_counts, expected.hit_counts)
+        self.assertEqual(report.outliers, expected.outliers)
+
+    def test_check_scan_streams_evd(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "scan1.evd")
+            write_evd(filepath, make_hits(self.AABBS, [500, 300, 200, 100], 50))
+            report = check_scan(filepath, self.AABBS, 2.5, **self.THRESHOLDS)
+        self.assertTrue(report.passed)
+        self.assertEqual(report.points, 1150)
+
+    def test_decisions_are_read_from_metadata(self):
+        decision = {"scan": "scan1.evd", "attempt": 0, "passed": False, "reasons": ["0 points"], "rescan": True}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "test_3.txt")
+            with open(filepath, "w") as file:
+                file.write("Scene: 3 at 1.00s\nscene_size: 2.500\n")
+                file.write(f"scan_qa: {decision}\n")
+                file.write("========================================================\nObjects generated:\n")
+                file.write(str({"type": "box", "location": [0, 0, 0]}) + "\n")
+            metadata = read_scene_metadata(filepath)
+        self.assertEqual(metadata["scan_qa"], [decision])
+        self.assertEqual(len(metadata["objects"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,52 @@
+# postprocessing/tests/test_range_image.py
+
+import os
+import unittest
+import tempfile
+import numpy as np
+from scanner import evd
+from postprocessing import range_image
+from postprocessing.tests.test_codec import make_scan
+
+
+class TestRangeImage(unittest.TestCase):
+
+    def setUp(self):
+        self.records = make_scan(20_000, 2.5)
+        self.records["distance_noise"] = self.records["distance"]
+
+    def test_projection_keeps_nearest_return(self):
+        image = range_image.project_records(self.records, azimuth_resolution=0.1)
+        self.assertEqual(image["range"].shape, (16, 3600))
+
+        rows = np.arange(len(self.records)) % 16
+        columns = np.minimum((np.degrees(self.records["yaw"]) / 0.1).astype(int), 3599)
+        expected = np.zeros((16, 3600))
+        for row, column, distance in zip(rows, columns, self.records["distance"]):
+            if expected[row, column] == 0 or distance < expected[row, column]:
+                expected[row, column] = distance
+        np.testing.assert_allclose(image["range"], expected, rtol=1e-6)
+        self.assertTrue(np.all((image["object_id"] == -1) == (expected == 0)))
+
+    def test_chunks_give_the_same_image(self):
+        whole = range_image.project_records(self.records, azimuth_resolution=0.2)
+        chunked = None
+        for chunk in np.array_split(self.records[::-1], 7):
+            chunked = range_image.project_records(chunk, azimuth_resolution=0.2, image=chunked)
+        for channel in ("range", "intensity", "object_id"):
+            np.testing.assert_array_equal(whole[channel], chunked[channel])
+
+    def test_evd_to_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            evd_filepath = os.path.join(tmpdir, "scan1.evd")
+            evd.write_evd(evd_filepath, self.records)
+            image = range_image.project_evd(evd_filepath)
+            filepath = range_image.range_image_filepath(evd_filepath)
+            range_image.write_range_image(filepath, image)
+            stored = range_image.read_range_image(filepath)
+        self.assertAlmostEqual(float(stored["azimuth_resolution"]), 0.1)
+        np.testing.assert_array_equal(stored["range"], image["range"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
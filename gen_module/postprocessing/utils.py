@@ -0,0 +1,64 @@
+# postprocessing/utils.py
+
+import os
+import re
+import ast
+import numpy as np
+
+# Elevation angles of the 16 lasers of a VLP-16, from bottom to top
+VLP16_ELEVATIONS = np.radians(np.arange(-15, 16, 2))
+
+
+def laser_rings(pitch):
+    """
+    Maps the pitch (radians) of every return to the VLP-16 laser ring that produced it.
+
+    Returns:
+        np.ndarray: Ring index per return (uint8), 0 for the lowest laser.
+    """
+    pitch = np.asarray(pitch, dtype=np.float64)
+    rings = np.clip(np.round((pitch - VLP16_ELEVATIONS[0]) / (VLP16_ELEVATIONS[1] - VLP16_ELEVATIONS[0])), 0, 15)
+    return rings.astype(np.uint8)
+
+
+def read_scene_metadata(filepath):
+    """
+    Parses the test_{n}.txt file main2() writes for every scene.
+
+    Returns:
+        dict: "scene" (index), "scene_size" (float), "objects" (list of object params)
+              and "scan_qa" (list of the scan QA decisions, see postprocessing/qa.py).
+
+    Raises:
+        ValueError: If the file does not contain a scene_size.
+    """
+    metadata = {"scene": None, "scene_size": None, "objects": [], "scan_qa": []}
+    in_objects = False
+    with open(filepath, "r") as file:
+        for line in file:
+            line = line.strip()
+            if in_objects:
+                if line:
+                    # Values written from numpy floats may be shown as np.float64(...)
+                    line = re.sub(r"np\.float\d+\(([^()]*)\)", r"\1", line)
+                    metadata["objects"].append(ast.literal_eval(line))
+            elif line.startswith("Scene:"):
+                metadata["scene"] = int(line.split()[1])
+            elif line.startswith("scene_size:"):
+                metadata["scene_size"] = float(line.split(":", 1)[1])
+            elif line.startswith("scan_qa:"):
+                metadata["scan_qa"].append(ast.literal_eval(line.split(":", 1)[1].strip()))
+            elif line.startswith("Objects generated:"):
+                in_objects = True
+
+    if metadata["scene_size"] is None:
+        raise ValueError(f"{filepath} does not contain a scene_size.")
+    return metadata
+
+
+def scene_metadata_filepath(scene_dir):
+    """
+    Returns the path of the test_{n}.txt file of a scanning{n} directory.
+    """
+    n = os.path.basename(os.path.normpath(scene_dir))[len("scanning"):]
+    return os.path.join(scene_dir, f"test_{n}.txt")
@@ -0,0 +1,277 @@
+# runtime/cache.py
+"""
+Content-addressed cache of generated scenes.
+
+A scene is identified by the hash of its full specification: the scene
+index, the seed, the SceneGeneratorParams, the ScannerParams, the requested
+scan files and the version of the code that generates them. The outputs of a
+scene (scene.json, test_{n}.txt, the scans and scene.blend if it was saved)
+are stored under that hash,
+so a sweep that is run again only generates the scenes whose specification
+changed. The others are hard linked from the cache.
+
+Layout of the cache directory:
+    entries/<ab>/<hash>/        the output files of one scene
+    entries/<ab>/<hash>.used    touched on every hit, its mtime orders the LRU eviction
+    tmp/                        entries being stored
+
+Outputs are shared with the cache through hard links, so they must not be
+modified in place. Removing them (e.g. postprocessing/codec.py --remove) is
+fine, and a scene that is generated again first unlinks its old outputs
+(see unlink_outputs()), so writing them never reaches the cache.
+
+Other workers may evict entries at any time. An entry that disappears
+while it is linked is a miss, and one that disappears while the cache is
+counted is skipped.
+
+The size of the cache is kept as a running total of the entries this
+process stored, and recounted from the files every 'rescan_interval'
+stores, as other workers store entries too.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+
+from system_parameters import SystemConfiguration
+
+config = SystemConfiguration()
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Everything that changes the outputs of a scene
+CODE_PATHS = (
+    "scene_generator", "scanner", "runtime/main.py", "runtime/specs.py", "postprocessing/qa.py",
+    "system_parameters.py", "system_parameters.json",
+)
+
+
+def code_version(paths=CODE_PATHS, root=project_root):
+    """
+    Returns a hash of the source files that generate a scene. Tests are left out.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        path = os.path.join(root, path)
+        if os.path.isfile(path):
+            filepaths = [path]
+        else:
+            filepaths = []
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [d for d in dirnames if d not in ("tests", "__pycache__")]
+                filepaths += [os.path.join(dirpath, f) for f in filenames if f.endswith((".py", ".json"))]
+        for filepath in sorted(filepaths):
+            digest.update(os.path.relpath(filepath, root).encode("utf-8"))
+            with open(filepath, "rb") as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def scene_spec(n, seed, scene_params, scanner_params, scans, clutter_params=None):
+    """
+    Returns the specification of a scene as a JSON-serializable dict.
+    """
+    spec = {
+        "scene": n,
+        "seed": seed,
+        "scene_params": {
+            "scene_size": scene_params.scene_size,
+            "objects_to_generate": sorted(obj.name for obj in scene_params.objects_to_generate),
+            "object_count_range": list(scene_params.object_count_range),
+            "object_size_range": list(scene_params.object_size_range),
+            "object_height_distribution": list(scene_params.object_height_distribution),
+            "allow_overlap": scene_params.allow_overlap,
+        },
+        "scanner_params": {
+            "scanner_object": scanner_params.scanner_object.name,
+            "scene_size": scanner_params.scene_size,
+            "frame_start": scanner_params.frame_start,
+            "frame_end": scanner_params.frame_end,
+            "min_angle": scanner_params.min_angle,
+            "max_angle": scanner_params.max_angle,
+            "add_blender_mesh": scanner_params.add_blender_mesh,
+            "add_noisy_blender_mesh": scanner_params.add_noisy_blender_mesh,
+            "noise_sigma": scanner_params.noise_sigma,
+            "target_density": scanner_params.target_density,
+            "time_budget": scanner_params.time_budget,
+        },
+        "scans": list(scans),
+    }
+    if clutter_params is not None:
+        spec["clutter_params"] = clutter_params_spec(clutter_params)
+    return spec
+
+
+def clutter_params_spec(clutter_params):
+    """
+    Returns the ClutterParams as a JSON-serializable dict, in the message format of runtime/daemon.py.
+    """
+    return {
+        "objects_to_generate": sorted(obj.name for obj in clutter_params.objects_to_generate),
+        "object_count_range": list(clutter_params.object_count_range),
+        "object_size_range": list(clutter_params.object_size_range),
+        "allow_overlap": clutter_params.allow_overlap,
+        "vertices": clutter_params.vertices,
+    }
+
+
+def scene_output_files(n, scans, blend=False):
+    """
+    Returns the names of the files a scene writes to its directory.
+    scene.blend is only part of it for scenes whose .blend file is saved.
+    """
+    return ["scene.json", f"test_{n}.txt"] + list(scans) + (["scene.blend"] if blend else [])
+
+
+def unlink_outputs(dir, filenames):
+    """
+    Removes the given outputs of a scene before it is generated again. They
+    may be hard links into the cache, which writing in place would corrupt.
+    """
+    for filename in filenames:
+        filepath = os.path.join(dir, filename)
+        if os.path.lexists(filepath):
+            os.remove(filepath)
+
+
+class SceneCache:
+
+    def __init__(self, root: str, max_size_gb: float = None, version: str = None, rescan_interval: int = None):
+        if max_size_gb is None:
+            max_size_gb = config.get("cache_max_size_gb", 100)
+        if rescan_interval is None:
+            rescan_interval = config.get("cache_rescan_interval", 100)
+        if not max_size_gb > 0:
+            raise ValueError(f"'max_size_gb' {max_size_gb} must be a positive number.")
+        if rescan_interval < 1:
+            raise ValueError(f"'rescan_interval' {rescan_interval} must be at least 1.")
+        self.root = root
+        self.max_bytes = int(max_size_gb * 1024 ** 3)
+        self.version = version if version is not None else code_version()
+        self.rescan_interval = rescan_interval
+        # Bytes in the cache, None until counted by evict()
+        self.total_bytes = None
+        self._stores = 0
+        os.makedirs(os.path.join(root, "entries"), exist_ok=True)
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+
+    def key(self, spec):
+        content = json.dumps({"spec": spec, "version": self.version}, sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+    def entry_path(self, key):
+        return os.path.join(self.root, "entries", key[:2], key)
+
+
+    def lookup(self, key, dir, filenames):
+        """
+        Links the cached files of an entry into 'dir'.
+
+        Returns:
+            bool: False if the entry is not cached, or lacks one of the files.
+                  Also False if another worker evicts it while it is linked,
+                  the files linked up to then are left for the caller to unlink.
+        """
+        entry = self.entry_path(key)
+        if not all(os.path.isfile(os.path.join(entry, filename)) for filename in filenames):
+            return False
+        os.makedirs(dir, exist_ok=True)
+        try:
+            for filename in filenames:
+                destination = os.path.join(dir, filename)
+                if os.path.lexists(destination):
+                    os.remove(destination)
+                _link_or_copy(os.path.join(entry, filename), destination)
+        except FileNotFoundError:
+            return False
+        self._touch(key)
+        return True
+
+
+    def store(self, key, dir, filenames):
+        """
+        Adds the given files of 'dir' to the cache and evicts old entries if needed.
+        """
+        entry = self.entry_path(key)
+        if os.path.isdir(entry):
+            self._touch(key)
+            return
+        tmp = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+        os.makedirs(tmp)
+        for filename in filenames:
+            _link_or_copy(os.path.join(dir, filename), os.path.join(tmp, filename))
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        size = sum(os.path.getsize(os.path.join(tmp, filename)) for filename in filenames)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Stored by another worker in the meantime
+            shutil.rmtree(tmp, ignore_errors=True)
+            size = 0
+        self._touch(key)
+        self._stores += 1
+        if self.total_bytes is not None:
+            self.total_bytes += size
+        if self.total_bytes is None or self.total_bytes > self.max_bytes or self._stores % self.rescan_interval == 0:
+            self.evict()
+
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits 'max_bytes'.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        entries = []
+        total = 0
+        for prefix in os.listdir(os.path.join(self.root, "entries")):
+            prefix_path = os.path.join(self.root, "entries", prefix)
+            for key in os.listdir(prefix_path):
+                entry = os.path.join(prefix_path, key)
+                if not os.path.isdir(entry):
+                    continue
+                try:
+                    size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                    try:
+                        used = os.path.getmtime(entry + ".used")
+                    except FileNotFoundError:
+                        used = os.path.getmtime(entry)
+                except FileNotFoundError:
+                    # Evicted by another worker while counting
+                    continue
+                entries.append((used, size, key))
+                total += size
+
+        removed = 0
+        for used, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry = self.entry_path(key)
+            shutil.rmtree(entry, ignore_errors=True)
+            try:
+                os.remove(entry + ".used")
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self.total_bytes = total
+        return removed
+
+
+    def _touch(self, key):
+        with open(self.entry_path(key) + ".used", "a"):
+            pass
+        os.utime(self.entry_path(key) + ".used", None)
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Different filesystem, or links are not supported
+        shutil.copy2(source, destination)
@@ -0,0 +1,258 @@
+# runtime/client.py
+"""
+Client of the warm Blender worker of runtime/daemon.py.
+
+Runs with a regular Python interpreter, e.g. to run a part of the main2()
+sweep through a single warm worker:
+
+    python runtime/client.py --blender /opt/blensor/blender --blend base.blend \
+        --output "/media/dawid/blensor data/jan20252" --start 0 --end 100
+
+The worker is restarted whenever it asks to be recycled or dies. A scene
+the worker fails is retried, and skipped after 'maximum_attempts' failures.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from runtime.sweep import SweepDefinition, MAIN2_SWEEP
+
+config = SystemConfiguration()
+
+
+class WorkerError(RuntimeError):
+    """
+    Raised when the worker replies to a job with an error.
+    """
+
+
+class WorkerClient:
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        self.socket_path = socket_path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_path)
+        self._stream = self._socket.makefile("rw")
+        self._next_id = 0
+
+
+    def request(self, message):
+        """
+        Sends a message and waits for its reply.
+
+        Raises:
+            WorkerError: If the worker could not handle the message.
+            ConnectionError: If the worker closed the connection, e.g. because it crashed.
+        """
+        self._next_id += 1
+        message = dict(message, id=self._next_id)
+        self._stream.write(json.dumps(message) + "\n")
+        self._stream.flush()
+        line = self._stream.readline()
+        if not line:
+            raise ConnectionError(f"Worker at {self.socket_path} closed the connection.")
+        reply = json.loads(line)
+        if reply["status"] != "ok":
+            raise WorkerError(f"{reply['error']}\n{reply.get('traceback', '')}")
+        return reply
+
+
+    def ping(self):
+        return self.request({"command": "ping"})
+
+
+    def submit(self, scene_message):
+        return self.request(dict(scene_message, command="scene"))
+
+
+    def shutdown(self):
+        try:
+            self.request({"command": "shutdown"})
+        finally:
+            self.close()
+
+
+    def close(self):
+        self._stream.close()
+        self._socket.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def sweep_scene_message(sweep: SweepDefinition, n: int, output_dir: str, scans=None, target_density=None, time_budget=None):
+    """
+    Builds the job for scene n of a sweep, with the same parameters and seed
+    main2(seed_per_scene=True) uses with the same scanner options.
+    """
+    object_size = sweep.object_size(n)
+    scene_size = sweep.scene_size(n)
+    if scans is None:
+        scans = [f"scan{i + 1}.evd" for i in range(sweep.scans_per_scene)]
+    return {
+        "scene": n,
+        "dir": f"{output_dir}/scanning{n}",
+        "seed": f"2025-{n}",
+        "scene_params": {
+            "scene_size": scene_size,
+            "objects_to_generate": [primitive.upper() for primitive in sweep.primitives],
+            "object_count_range": list(sweep.object_count_range),
+            "object_size_range": [object_size * 0.5, object_size * 1.5],
+            "object_height_distribution": [0, scene_size / 2],
+            "allow_overlap": True,
+        },
+        "scanner_params": {
+            "scene_size": scene_size,
+            "frame_start": sweep.frame_start,
+            "frame_end": sweep.frame_end,
+            "min_angle": 0,
+            "max_angle": 180,
+            "add_noisy_blender_mesh": True,
+            "target_density": target_density,
+            "time_budget": time_budget,
+        },
+        "scans": scans,
+    }
+
+
+def start_worker(blender, blend, socket_path, daemon_args=(), timeout=300):
+    """
+    Starts runtime/daemon.py in Blender and waits until it answers.
+
+    Parameters:
+        daemon_args (list): Further arguments of the daemon, e.g. ["--cache", dir].
+
+    Returns:
+        tuple: The worker process and a connected WorkerClient.
+    """
+    command = [blender, "-b"]
+    if blend:
+        command.append(blend)
+    command += ["-P", os.path.join(script_dir, "daemon.py"), "--", "--socket", socket_path] + list(daemon_args)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    process = subprocess.Popen(command)
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Worker exited with {process.returncode} while starting.")
+        if os.path.exists(socket_path):
+            try:
+                client = WorkerClient(socket_path)
+                client.ping()
+                return process, client
+            except OSError:
+                pass
+        time.sleep(0.5)
+    process.kill()
+    raise TimeoutError(f"Worker did not start listening on {socket_path} within {timeout}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run main2() sweep scenes through a warm Blender worker.")
+    parser.add_argument("--blender", default="blender", help="Path to the Blender (BlenSor) binary.")
+    parser.add_argument("--blend", default="", help="The .blend file to open, e.g. one with the scanner camera.")
+    parser.add_argument("--socket", default=f"/tmp/blender-worker-{os.getpid()}.sock")
+    parser.add_argument("--output", required=True, help="Directory the scanning{n} directories are written to.")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=MAIN2_SWEEP.count)
+    parser.add_argument("--cache", default=None, help="Directory of the scene cache, see runtime/cache.py.")
+    parser.add_argument("--postprocess", nargs="*", default=None, help="Post-processing stages, see postprocessing/pipeline.py.")
+    parser.add_argument("--events", default=None, help="Directory of the telemetry event logs, see runtime/telemetry.py.")
+    parser.add_argument("--profile", default=None, help="Directory for the collapsed stacks of sampled scenes, see runtime/profiler.py.")
+    parser.add_argument("--target-density", type=float, default=None, help="Scan density in points per square metre, enables adaptive scans.")
+    parser.add_argument("--time-budget", type=float, default=None, help="Seconds an adaptive scan may take.")
+    parser.add_argument("--scan-workers", type=int, default=1, help="Blender processes every scan is split between.")
+    parser.add_argument("--noise-variants", nargs="*", default=None, help="Noise models of scanner/noise.py to write a noisy copy of every scan with, e.g. gaussian laplace distance_bias dropout.")
+    args = parser.parse_args()
+
+    # Every worker, including restarted ones, gets the same arguments
+    daemon_args = ["--memory-log", f"{args.output}/memory_{args.start}.csv"]
+    if args.cache:
+        daemon_args += ["--cache", args.cache]
+    if args.postprocess:
+        daemon_args += ["--postprocess"] + args.postprocess
+    if args.events:
+        daemon_args += ["--events", args.events]
+    if args.profile:
+        daemon_args += ["--profile", args.profile]
+    if args.scan_workers > 1:
+        daemon_args += ["--scan-workers", str(args.scan_workers)]
+    if args.noise_variants:
+        daemon_args += ["--noise-variants"] + args.noise_variants
+
+    maximum_attempts = config.get("maximum_attempts", 3)
+    process, client = start_worker(args.blender, args.blend, args.socket, daemon_args)
+    n = args.start
+    attempts = 0
+    recycled = False
+    skipped = []
+    try:
+        while n < args.end:
+            try:
+                reply = client.submit(sweep_scene_message(MAIN2_SWEEP, n, args.output, target_density=args.target_density, time_budget=args.time_budget))
+            except WorkerError as error:
+                # The worker survives a failed scene, only the scene is retried
+                attempts += 1
+                print(f"Scene {n} failed: {str(error).splitlines()[0]}")
+                if attempts >= maximum_attempts:
+                    print(f"Skipping scene {n} after {attempts} attempts")
+                    skipped.append(n)
+                    n += 1
+                    attempts = 0
+                continue
+            except ConnectionError:
+                attempts += 1
+                if attempts >= maximum_attempts:
+                    raise RuntimeError(f"Worker died {attempts} times during scene {n}")
+                print(f"Worker died during scene {n}, restarting it")
+                process.wait()
+                process, client = start_worker(args.blender, args.blend, args.socket, daemon_args)
+                continue
+            timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in reply["timings"].items())
+            print(f"Scene {n}{' (cached)' if reply['cached'] else ''}: {timings}")
+            n += 1
+            attempts = 0
+            recycled = reply["recycle"]
+            if recycled and n < args.end:
+                client.close()
+                process.wait()
+                print(f"Recycling worker after scene {n - 1}")
+                process, client = start_worker(args.blender, args.blend, args.socket, daemon_args)
+                recycled = False
+        if recycled:
+            # The worker exits by itself after asking to be recycled
+            client.close()
+        else:
+            client.shutdown()
+        process.wait()
+    except BaseException:
+        process.terminate()
+        process.wait()
+        raise
+    if skipped:
+        print(f"Skipped scenes: {skipped}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
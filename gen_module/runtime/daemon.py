@@ -0,0 +1,218 @@
+# runtime/daemon.py
+"""
+Long-lived Blender worker that takes scene jobs over a Unix socket.
+
+Started once with Blender, so Blender itself, BlenSor and the modules of the
+tool are only loaded once, instead of once per job:
+
+    blender -b base.blend -P runtime/daemon.py -- --socket /tmp/blender-worker.sock
+
+Jobs are sent as JSON messages, one per line, and are handled one at a time.
+Every message gets exactly one reply line. See runtime/client.py for the
+client side.
+
+Messages:
+    {"command": "ping"}
+    {"command": "shutdown"}
+    {"command": "scene", "id": ..., "scene": n, "dir": ..., "seed": ...,
+     "scene_params": {...}, "scanner_params": {...}, "scans": ["scan1.evd", ...],
+     "clutter_params": {...} (optional, see scene_generator/clutter.py)}
+
+Replies:
+    {"id": ..., "status": "ok", "timings": {...}, "cached": false, "object_count": ...,
+     "scan_qa": [...], "recycle": false}
+    {"id": ..., "status": "error", "error": ..., "traceback": ...}
+
+After every scene the memory watchdog is sampled. Once it asks for a restart,
+the reply has "recycle": true and the daemon exits with RECYCLE_EXIT_CODE after
+sending it, so the client can start a fresh one.
+
+With --noise-variants, every scan is made without noise and a noisy copy per
+named model of scanner/noise.py is written next to it, e.g. scan1_vlp16.evd.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import traceback
+import bpy
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+# scene_generator/main.py imports its params module without the package name
+scene_generator_path = os.path.join(project_root, 'scene_generator')
+if scene_generator_path not in sys.path:
+    sys.path.append(scene_generator_path)
+
+from scanner.scanner_params import ScannerParams
+from scene_generator.scene_generator_params import SceneGeneratorParams, PrimitiveObjects
+from scene_generator.clutter_params import clutter_params_from_message
+from runtime.main import RuntimeModule
+from runtime.cache import SceneCache
+from postprocessing.pipeline import scan_pipeline
+from runtime.watchdog import MemoryWatchdog
+from runtime.utils import RECYCLE_EXIT_CODE
+from runtime.telemetry import worker_event_log, scene_event, directory_bytes
+from runtime.profiler import SamplingProfiler
+from scanner.noise import noise_models
+
+
+def scene_params_from_message(message):
+    return SceneGeneratorParams(
+        scene_size=message["scene_size"],
+        objects_to_generate={PrimitiveObjects[name] for name in message["objects_to_generate"]},
+        object_count_range=tuple(message["object_count_range"]),
+        object_size_range=tuple(message["object_size_range"]),
+        object_height_distribution=tuple(message["object_height_distribution"]),
+        allow_overlap=message["allow_overlap"]
+    )
+
+
+def scanner_params_from_message(message):
+    message = dict(message)
+    scanner_object = bpy.data.objects[message.pop("scanner_object", "Camera")]
+    return ScannerParams(scanner_object=scanner_object, **message)
+
+
+class WorkerDaemon:
+
+    def __init__(self, socket_path: str, memory_log_filepath: str = None, cache: SceneCache = None, pipeline=None, events_dir: str = None, profile_dir: str = None, noise_models=None, scan_workers: int = 1):
+        self.socket_path = socket_path
+        self.profiler = SamplingProfiler(profile_dir) if profile_dir else None
+        self.scan_workers = scan_workers
+        self.runtime = RuntimeModule(use_object_pool=True, cache=cache, pipeline=pipeline, profiler=self.profiler, noise_models=noise_models)
+        self.events = worker_event_log(events_dir) if events_dir else None
+        self.watchdog = MemoryWatchdog(log_filepath=memory_log_filepath)
+        self.start_time = time.time()
+        self.scene_count = 0
+
+
+    def handle(self, message):
+        """
+        Handles a single message.
+
+        Returns:
+            tuple: The reply and whether the daemon should stop after sending it.
+        """
+        command = message.get("command")
+        if command == "ping":
+            return {"status": "ok", "pid": os.getpid(), "scenes": self.scene_count}, False
+        if command == "shutdown":
+            return {"status": "ok"}, True
+        if command != "scene":
+            raise ValueError(f"Unknown command: {command}")
+
+        n = message["scene"]
+        dir = message["dir"]
+        seed = message.get("seed")
+        if seed is not None:
+            random.seed(seed)
+        os.makedirs(dir, exist_ok=True)
+
+        scene_params = scene_params_from_message(message["scene_params"])
+        # How many processes a scan may use depends on the machine, not the job
+        scanner_params = scanner_params_from_message(dict({"scan_workers": self.scan_workers}, **message["scanner_params"]))
+        clutter_params = None
+        if message.get("clutter_params") is not None:
+            clutter_params = clutter_params_from_message(message["clutter_params"])
+        _, object_params, timings = self.runtime.run_scene(
+            n, dir, scene_params, scanner_params, message["scans"],
+            elapsed=time.time() - self.start_time, seed=seed, clutter_params=clutter_params
+        )
+        self.scene_count += 1
+        if self.events is not None:
+            self.events.emit(scene_event(n, "cached" if object_params is None else "ok", timings, directory_bytes(dir)))
+
+        self.watchdog.sample(n)
+        recycle = self.watchdog.should_recycle()
+        reply = {
+            "status": "ok",
+            "scene": n,
+            "timings": timings,
+            "cached": object_params is None,
+            "object_count": None if object_params is None else len(object_params),
+            "scan_qa": list(self.runtime.qa_log),
+            "recycle": recycle,
+        }
+        return reply, recycle
+
+
+    def serve(self):
+        """
+        Accepts one client at a time and answers its messages until shut down.
+
+        Returns:
+            int: The exit code of the daemon.
+        """
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(1)
+        print(f"Worker {os.getpid()} listening on {self.socket_path}")
+        try:
+            while True:
+                connection, _ = server.accept()
+                with connection, connection.makefile("rw") as stream:
+                    for line in stream:
+                        if not line.strip():
+                            continue
+                        reply, stop = self._reply(line)
+                        stream.write(json.dumps(reply) + "\n")
+                        stream.flush()
+                        if stop:
+                            return RECYCLE_EXIT_CODE if reply.get("recycle") else 0
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            if self.profiler is not None:
+                self.profiler.close()
+
+
+    def _reply(self, line):
+        message = message_id = None
+        try:
+            message = json.loads(line)
+            message_id = message.get("id")
+            reply, stop = self.handle(message)
+        except Exception as error:
+            if self.events is not None and isinstance(message, dict) and message.get("command") == "scene":
+                self.events.emit(scene_event(message.get("scene"), "failed", self.runtime.timings))
+            # A failed job doesn't take the warm worker down
+            reply = {"status": "error", "error": f"{type(error).__name__}: {error}", "traceback": traceback.format_exc()}
+            stop = False
+        reply["id"] = message_id
+        return reply, stop
+
+
+def parse_arguments():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Serve scene jobs from a warm Blender process.")
+    parser.add_argument("--socket", required=True, help="Path of the Unix socket to listen on.")
+    parser.add_argument("--memory-log", default=None, help="CSV file for the memory watchdog samples.")
+    parser.add_argument("--cache", default=None, help="Directory of the scene cache, see runtime/cache.py.")
+    parser.add_argument("--postprocess", nargs="*", default=None, help="Post-processing stages, see postprocessing/pipeline.py.")
+    parser.add_argument("--events", default=None, help="Directory of the telemetry event logs, see runtime/telemetry.py.")
+    parser.add_argument("--profile", default=None, help="Directory for the collapsed stacks of sampled scenes, see runtime/profiler.py.")
+    parser.add_argument("--scan-workers", type=int, default=1, help="Blender processes every scan is split between, unless the job says otherwise.")
+    parser.add_argument("--noise-variants", nargs="*", default=None, help="Noise models of scanner/noise.py to write a noisy copy of every scan with, e.g. gaussian laplace distance_bias dropout.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    cache = SceneCache(args.cache) if args.cache else None
+    pipeline = scan_pipeline(args.postprocess) if args.postprocess else None
+    models = noise_models(args.noise_variants) if args.noise_variants else None
+    exit_code = WorkerDaemon(args.socket, args.memory_log, cache, pipeline, args.events, args.profile, models, args.scan_workers).serve()
+    if pipeline is not None:
+        pipeline.close()
+        pipeline.log_report()
+    sys.exit(exit_code)
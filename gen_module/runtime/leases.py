@@ -0,0 +1,304 @@
+# runtime/leases.py
+"""
+Coordinates several generation nodes through a shared directory, without a server.
+
+Start the same command on every node that mounts the share:
+
+    python runtime/leases.py --root "/media/dawid/blensor data/coordination" \
+        --blender /opt/blensor/blender --blend base.blend --start 0 --end 10000
+
+Layout of the coordination directory:
+    plan.json                   batches of the sweep, written by the first worker
+    leases/batch_<a>_<b>.json   claimed batches, kept fresh by a heartbeat
+    done/batch_<a>_<b>.json     finished batches
+    checkpoints/                per-batch checkpoints, so a reclaimed batch resumes
+
+Leases are created with os.link(), which is atomic on local filesystems and
+on NFS. A lease whose modification time is older than the lease timeout
+belongs to a dead worker. It is first renamed to a unique name (only one
+worker can succeed at that) and the batch is then claimed again. Times are
+compared to the clock of the share itself, so clock skew between nodes
+doesn't matter.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from runtime.sweep import MAIN2_SWEEP
+from runtime.scheduler import CostModel, sweep_jobs
+from runtime.supervisor import supervise
+
+config = SystemConfiguration()
+
+
+class Lease:
+
+    def __init__(self, coordinator, start: int, end: int):
+        self.coordinator = coordinator
+        self.start = start
+        self.end = end
+        self.name = f"batch_{start}_{end}"
+
+
+    @property
+    def filepath(self):
+        return os.path.join(self.coordinator.root, "leases", f"{self.name}.json")
+
+
+    def __repr__(self):
+        return f"Lease({self.start}, {self.end})"
+
+
+class LeaseCoordinator:
+    """
+    Hands out batches of a sweep to the workers sharing a directory.
+    """
+
+    def __init__(self, root: str, worker_id: str = None, lease_timeout: float = None, heartbeat_interval: float = None):
+        if lease_timeout is None:
+            lease_timeout = config.get("lease_timeout_seconds", 600)
+        if heartbeat_interval is None:
+            heartbeat_interval = config.get("lease_heartbeat_seconds", 30)
+        if heartbeat_interval >= lease_timeout:
+            raise ValueError("The heartbeat interval must be shorter than the lease timeout.")
+        self.root = root
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval
+        for subdir in ("leases", "done", "checkpoints", "tmp"):
+            os.makedirs(os.path.join(root, subdir), exist_ok=True)
+
+
+    def create_plan(self, batches):
+        """
+        Stores the list of (start, end) batches, unless another worker already did.
+
+        Returns:
+            list: The batches of the plan that is in place, in claiming order.
+        """
+        plan_filepath = os.path.join(self.root, "plan.json")
+        self._link_new(plan_filepath, {"batches": [list(batch) for batch in batches]})
+        with open(plan_filepath, "r") as file:
+            return [tuple(batch) for batch in json.load(file)["batches"]]
+
+
+    def claim(self, batches, skip=()):
+        """
+        Claims the first batch that is neither done nor held by a live worker.
+
+        Parameters:
+            batches (list): (start, end) pairs in claiming order.
+            skip (collection): Batches this worker should not claim, e.g. ones that kept failing on it.
+
+        Returns:
+            Lease or None: The claimed lease, or None if no batch is left.
+        """
+        for start, end in batches:
+            lease = Lease(self, start, end)
+            if (start, end) in skip or self.is_done(lease):
+                continue
+            if self._link_new(lease.filepath, self._lease_content()):
+                return lease
+            if self._is_expired(lease.filepath) and self._break(lease.filepath):
+                if self._link_new(lease.filepath, self._lease_content()):
+                    print(f"Reclaimed expired {lease}")
+                    return lease
+        return None
+
+
+    def heartbeat(self, lease: Lease):
+        """
+        Refreshes the lease. Returns False if the lease was lost to another worker.
+        """
+        if not self.owns(lease):
+            return False
+        os.utime(lease.filepath, None)
+        return True
+
+
+    def owns(self, lease: Lease):
+        try:
+            with open(lease.filepath, "r") as file:
+                return json.load(file)["worker"] == self.worker_id
+        except (OSError, ValueError, KeyError):
+            return False
+
+
+    def complete(self, lease: Lease):
+        """
+        Marks the batch as done and drops the lease.
+        """
+        self._link_new(os.path.join(self.root, "done", f"{lease.name}.json"), self._lease_content())
+        self.release(lease)
+
+
+    def release(self, lease: Lease):
+        if self.owns(lease):
+            os.remove(lease.filepath)
+
+
+    def is_done(self, lease: Lease):
+        return os.path.exists(os.path.join(self.root, "done", f"{lease.name}.json"))
+
+
+    def remaining(self, batches, skip=()):
+        """
+        Returns the batches that are neither done nor in 'skip', whether or not a worker holds them.
+        """
+        return [(start, end) for start, end in batches if (start, end) not in skip and not self.is_done(Lease(self, start, end))]
+
+
+    def checkpoint_filepath(self, lease: Lease):
+        return os.path.join(self.root, "checkpoints", f"{lease.name}.txt")
+
+
+    def keep_alive(self, lease: Lease):
+        """
+        Starts a daemon thread that refreshes the lease until the returned 'stop' event is set.
+
+        Returns:
+            tuple: The 'stop' event, and a 'lost' event that is set when the
+                   lease was lost to another worker, which must then stop
+                   working on the batch.
+        """
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat_interval):
+                if not self.heartbeat(lease):
+                    print(f"Lost {lease} to another worker")
+                    lost.set()
+                    return
+
+        threading.Thread(target=beat, daemon=True).start()
+        return stop, lost
+
+
+    def _lease_content(self):
+        return {"worker": self.worker_id, "host": socket.gethostname(), "pid": os.getpid(), "time": time.time()}
+
+
+    def _link_new(self, filepath, content):
+        """
+        Atomically creates 'filepath' with the given JSON content.
+        Returns False if the file already exists.
+        """
+        tmp_filepath = os.path.join(self.root, "tmp", f"{self.worker_id}-{uuid.uuid4().hex}.json")
+        with open(tmp_filepath, "w") as file:
+            json.dump(content, file)
+        try:
+            os.link(tmp_filepath, filepath)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_filepath)
+
+
+    def _share_now(self):
+        probe = os.path.join(self.root, "tmp", f"clock-{self.worker_id}")
+        with open(probe, "w"):
+            pass
+        now = os.path.getmtime(probe)
+        os.remove(probe)
+        return now
+
+
+    def _is_expired(self, filepath):
+        try:
+            return self._share_now() - os.path.getmtime(filepath) > self.lease_timeout
+        except FileNotFoundError:
+            return False
+
+
+    def _break(self, filepath):
+        stale_filepath = os.path.join(self.root, "tmp", f"stale-{self.worker_id}-{uuid.uuid4().hex}.json")
+        try:
+            os.rename(filepath, stale_filepath)
+        except FileNotFoundError:
+            # Another worker broke the lease first
+            return False
+        if self._share_now() - os.path.getmtime(stale_filepath) <= self.lease_timeout:
+            # Another worker broke the stale lease and claimed the batch in between,
+            # so this moved its fresh lease away. Put it back.
+            try:
+                os.link(stale_filepath, filepath)
+            except FileExistsError:
+                pass
+            os.remove(stale_filepath)
+            return False
+        os.remove(stale_filepath)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate sweep batches on this node, coordinated through a shared directory.")
+    parser.add_argument("--root", required=True, help="Shared coordination directory.")
+    parser.add_argument("--blender", default="blender", help="Path to the Blender (BlenSor) binary.")
+    parser.add_argument("--blend", default="", help="The .blend file to open, e.g. one with the scanner camera.")
+    parser.add_argument("--script", default=os.path.join(project_root, "main.py"))
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=MAIN2_SWEEP.count)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+
+    coordinator = LeaseCoordinator(args.root)
+    # Most expensive batches first, so the run doesn't end on one long batch
+    cost_model = CostModel()
+    jobs = sorted(sweep_jobs(MAIN2_SWEEP, args.start, args.end, args.batch_size), key=cost_model.estimate, reverse=True)
+    batches = coordinator.create_plan([(job.start, job.end) for job in jobs])
+    print(f"Worker {coordinator.worker_id} joined, {len(batches)} batches in the plan")
+
+    failures = {}
+    maximum_attempts = config.get("maximum_attempts", 3)
+    while True:
+        given_up = {batch for batch, count in failures.items() if count >= maximum_attempts}
+        lease = coordinator.claim(batches, skip=given_up)
+        if lease is None:
+            remaining = coordinator.remaining(batches, skip=given_up)
+            if not remaining:
+                unfinished = coordinator.remaining(sorted(given_up))
+                print("No batches left" + (f", gave up on {unfinished}" if unfinished else ""))
+                return 1 if unfinished else 0
+            # Held by other workers, which may still die and leave them to expire
+            time.sleep(coordinator.heartbeat_interval)
+            continue
+
+        stop, lost = coordinator.keep_alive(lease)
+        worker_args = [
+            "--sweep", "--seed-per-scene",
+            "--start", str(lease.start),
+            "--end", str(lease.end),
+            "--checkpoint", coordinator.checkpoint_filepath(lease),
+        ]
+        try:
+            # Terminates the worker as soon as the lease is lost, so two workers never write the same batch
+            exit_code = supervise(args.blender, args.blend, args.script, worker_args, stop=lost)
+        finally:
+            stop.set()
+
+        if lost.is_set():
+            print(f"Stopped working on {lease}")
+        elif exit_code == 0:
+            coordinator.complete(lease)
+        else:
+            print(f"{lease} failed with exit code {exit_code}, releasing it")
+            failures[(lease.start, lease.end)] = failures.get((lease.start, lease.end), 0) + 1
+            coordinator.release(lease)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,306 @@
-# runtime/main.py
\ No newline at end of file
+# runtime/main.py
+import bpy
+import time
+import zlib
+from contextlib import contextmanager
+from scanner.main import ScannerModule
+from scanner.scanner_params import ScannerParams
+from scene_generator.main import SceneGeneratorModule
+from scene_generator.scene_generator_params import SceneGeneratorParams
+from scene_generator.clutter_params import ClutterParams
+from scene_generator.pool import ObjectPool
+from system_parameters import SystemConfiguration
+from scanner.noise import variant_filename
+from runtime.cache import SceneCache, scene_spec, scene_output_files, clutter_params_spec, unlink_outputs
+from runtime.specs import scene_spec_filepath, camera_spec, write_scene_spec, read_scene_spec
+from postprocessing.pipeline import Pipeline
+from postprocessing.qa import check_scan
+from runtime.profiler import SamplingProfiler
+
+config = SystemConfiguration()
+
+
+class RuntimeModule:
+    """
+    Runs the stages of a single scene: generating, saving, writing the
+    metadata, scanning and writing the scene spec. The stages are timed, the
+    timings of the last scene are kept in 'timings'.
+
+    Every scene gets a compact scene.json (see runtime/specs.py), a full
+    scene.blend is only saved for every 'blend_save_interval'-th scene.
+    The others can be rebuilt on demand with runtime/rebuild.py.
+
+    Every scan is checked right after scanning (see postprocessing/qa.py).
+    A failed scan is repeated from a new viewpoint, up to 'max_rescans'
+    times, and every decision is logged in the scene metadata.
+
+    Holds on to the scene generator and scanner between scenes, so a
+    long-lived worker (main2() or runtime/daemon.py) only sets them up once.
+
+    With a SceneCache, scenes whose specification was generated before are
+    linked from the cache instead (see runtime/cache.py). With a Pipeline,
+    every scan is handed to it right after scanning (or after restoring it
+    from the cache, which doesn't keep post-processing outputs), and is post-processed
+    while the next scene is generated (see postprocessing/pipeline.py).
+    With a SamplingProfiler, the stacks of sampled scenes are tagged with
+    the current stage (see runtime/profiler.py).
+
+    With noise_models, every scan is made without noise and a noisy variant
+    per model is written next to it (see scanner/noise.py). The variants are
+    cached and post-processed like the scans themselves.
+    """
+
+    def __init__(self, use_object_pool: bool = True, cache: SceneCache = None, pipeline: Pipeline = None, blend_save_interval: int = None, scan_qa: bool = True, max_rescans: int = None, profiler: SamplingProfiler = None, noise_models=None):
+        """
+        Parameters:
+            blend_save_interval (int or None): Save the scene.blend of every
+                n-th scene, 1 saves all of them and 0 none.
+            scan_qa (bool): Check every scan right after scanning it.
+            max_rescans (int or None): How often a failed scan is repeated.
+            noise_models (list of NoiseModel or None): Noisy variants written of every scan.
+        """
+        if blend_save_interval is None:
+            blend_save_interval = config.get("blend_save_interval", 100)
+        if max_rescans is None:
+            max_rescans = config.get("qa_max_rescans", 2)
+        if blend_save_interval < 0:
+            raise ValueError(f"'blend_save_interval' {blend_save_interval} must not be negative.")
+        if max_rescans < 0:
+            raise ValueError(f"'max_rescans' {max_rescans} must not be negative.")
+        self.scene_generator = SceneGeneratorModule(object_pool=ObjectPool() if use_object_pool else None)
+        self.scanner = ScannerModule()
+        self.cache = cache
+        self.pipeline = pipeline
+        self.blend_save_interval = blend_save_interval
+        self.scan_qa = scan_qa
+        self.max_rescans = max_rescans
+        self.profiler = profiler
+        self.noise_models = list(noise_models or [])
+        self.scene = None
+        self.timings = {}
+        self.scan_plans = {}
+        self.scan_locations = {}
+        self.qa_log = []
+
+
+    def saves_blend(self, n: int):
+        """
+        Returns True if the scene.blend of scene 'n' is saved.
+        """
+        return self.blend_save_interval > 0 and n % self.blend_save_interval == 0
+
+
+    def scan_outputs(self, filenames):
+        """
+        Returns the names of the scans and of their noisy variants.
+        """
+        return [output for filename in filenames for output in [filename] + [variant_filename(filename, model) for model in self.noise_models]]
+
+
+    def noise_seed(self, filename: str):
+        """
+        Returns the seed of the noisy variants of a scan of the current scene.
+        It follows from the scene index and not from the random module, so
+        the scenes after it come out the same with or without variants.
+        """
+        if self.scene is None:
+            return None
+        return zlib.crc32(f"{self.scene}/{filename}".encode("utf-8"))
+
+
+    def begin_scene(self, n: int = None):
+        self.scene = n
+        self.timings = {}
+        self.scan_plans = {}
+        self.scan_locations = {}
+        self.qa_log = []
+        if self.profiler is not None and n is not None:
+            self.profiler.begin_scene(n)
+
+
+    def end_scene(self):
+        """
+        Stops profiling the current scene, so the time until the next one,
+        e.g. a daemon waiting for its next job, isn't sampled.
+        """
+        if self.profiler is not None:
+            self.profiler.end_scene()
+
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block as the given stage of the current scene.
+        """
+        start_time = time.time()
+        if self.profiler is not None:
+            outer_stage, self.profiler.stage = self.profiler.stage, name
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.time() - start_time
+            if self.profiler is not None:
+                self.profiler.stage = outer_stage
+
+
+    def restore_cached_scene(self, n: int, dir: str, seed, scene_params: SceneGeneratorParams, scanner_params: ScannerParams, filenames, clutter_params: ClutterParams = None):
+        """
+        Links the outputs of the scene from the cache into 'dir'. On a miss,
+        the outputs of an earlier run are unlinked, as they may be links into
+        the cache that generating the scene again would overwrite.
+
+        Returns:
+            bool: True on a cache hit. Always False without a cache or a seed,
+                  as an unseeded scene can't be identified.
+        """
+        with self.stage("cache"):
+            hit = False
+            if self.cache is not None and seed is not None:
+                key = self.cache.key(scene_spec(n, seed, scene_params, scanner_params, self.scan_outputs(filenames), clutter_params))
+                hit = self.cache.lookup(key, dir, scene_output_files(n, self.scan_outputs(filenames), blend=self.saves_blend(n)))
+            if not hit:
+                unlink_outputs(dir, scene_output_files(n, self.scan_outputs(filenames), blend=True))
+        if hit:
+            # Post-processing outputs aren't cached, so restored scans go through the pipeline too
+            if self.pipeline is not None:
+                spec = read_scene_spec(scene_spec_filepath(dir))
+                self.submit_scans(dir, self.scan_outputs(filenames), scanner_params.scene_size, spec.get("scan_locations"))
+        return hit
+
+
+    def store_cached_scene(self, n: int, dir: str, seed, scene_params: SceneGeneratorParams, scanner_params: ScannerParams, filenames, clutter_params: ClutterParams = None):
+        if self.cache is None or seed is None:
+            return
+        with self.stage("cache"):
+            key = self.cache.key(scene_spec(n, seed, scene_params, scanner_params, self.scan_outputs(filenames), clutter_params))
+            self.cache.store(key, dir, scene_output_files(n, self.scan_outputs(filenames), blend=self.saves_blend(n)))
+
+
+    def generate_scene(self, scene_params: SceneGeneratorParams, clutter_params: ClutterParams = None):
+        with self.stage("generate"):
+            self.scene_generator.clean_scene()
+            if clutter_params is not None:
+                return self.scene_generator.generate_cluttered_scene(scene_params, clutter_params)
+            return self.scene_generator.generate_scene(scene_params)
+
+
+    def save_scene(self, dir: str):
+        with self.stage("save"):
+            # Idle pooled objects have fake users, which would be saved with the scene
+            if self.scene_generator.object_pool is not None:
+                self.scene_generator.object_pool.drop_idle()
+            bpy.ops.wm.save_as_mainfile(filepath=f"{dir}/scene.blend")
+
+
+    def write_scene_metadata(self, n: int, dir: str, elapsed: float, scene_params: SceneGeneratorParams, object_params):
+        """
+        Writes the test_{n}.txt file describing the scene, with the scan QA
+        decisions of scan_scene(), so it should follow the scans.
+        """
+        with self.stage("metadata"):
+            min_size, max_size = scene_params.object_size_range
+            mean, std = scene_params.object_height_distribution
+            with open(f"{dir}/test_{n}.txt", "w+") as f:
+                f.write(f"Scene: {n} at {elapsed:.2f}s\n")
+                f.write(f"scene_size: {scene_params.scene_size:.3f}\n")
+                f.write(f"object_count_range: ({scene_params.object_count_range[0]}, {scene_params.object_count_range[1]})\n")
+                f.write(f"object_size_range: ({min_size:.3f}, {max_size:.3f})\n")
+                f.write(f"object_height_distribution: ({mean}, {std:.3f})\n")
+                for decision in self.qa_log:
+                    f.write(f"scan_qa: {decision}\n")
+                f.write(f"========================================================\n")
+                f.write(f"Objects generated:\n")
+                for obj in object_params:
+                    f.write(str(obj) + "\n")
+
+
+    def write_scene_spec(self, n: int, dir: str, seed, object_params, scanner_params: ScannerParams, clutter_params: ClutterParams = None):
+        """
+        Writes the scene.json file of the scene. Must follow scan_scene(), which
+        places the camera and chooses the frame ranges of adaptive scans.
+        """
+        with self.stage("spec"):
+            camera = camera_spec(scanner_params)
+            if self.scan_plans:
+                # The camera is left where the last scan put it
+                camera["frame_end"] = list(self.scan_plans.values())[-1]["frame_end"]
+            write_scene_spec(
+                scene_spec_filepath(dir), n, seed, object_params, camera,
+                clutter_params_spec(clutter_params) if clutter_params is not None else None,
+                scan_plans=self.scan_plans or None,
+                scan_locations=self.scan_locations or None
+            )
+
+
+    def scan_scene(self, scanner_params: ScannerParams, aabbs, dir: str, filenames):
+        for filename in filenames:
+            for attempt in range(self.max_rescans + 1):
+                # Every attempt places the scanner at a new random location
+                with self.stage("scan"):
+                    if self.noise_models:
+                        plan, _ = self.scanner.scan_scene_noise_variants(scanner_params, aabbs, dir, filename, self.noise_models, seed=self.noise_seed(filename))
+                    else:
+                        plan = self.scanner.scan_scene(scanner_params, aabbs, dir=dir, filename=filename)
+                if plan is not None:
+                    self.scan_plans[filename] = plan.as_dict()
+                for output in self.scan_outputs([filename]):
+                    self.scan_locations[output] = [float(v) for v in scanner_params.scanner_object.location]
+                if not self.scan_qa or self.check_scan(scanner_params, aabbs, dir, filename, attempt):
+                    break
+        self.submit_scans(dir, self.scan_outputs(filenames), scanner_params.scene_size, self.scan_locations)
+
+
+    def submit_scans(self, dir: str, filenames, scene_size: float, scan_locations=None):
+        """
+        Hands the scans to the pipeline, which reads them in its own processes.
+        The scanner location of a scan, if known, is passed on as its "viewpoint".
+        """
+        if self.pipeline is None:
+            return
+        scan_locations = scan_locations or {}
+        with self.stage("submit"):
+            for filename in filenames:
+                self.pipeline.submit({"filepath": f"{dir}/{filename}", "scene_size": scene_size, "viewpoint": scan_locations.get(filename)})
+
+
+    def check_scan(self, scanner_params: ScannerParams, aabbs, dir: str, filename: str, attempt: int = 0):
+        """
+        Checks a scan and logs the decision.
+
+        Returns:
+            bool: True if the scan passed, or failed without any rescans left.
+        """
+        with self.stage("qa"):
+            report = check_scan(f"{dir}/{filename}", aabbs, scanner_params.scene_size)
+        rescan = not report.passed and attempt < self.max_rescans
+        decision = {"scan": filename, "attempt": attempt, **report.as_dict(), "rescan": rescan,
+                    "location": [round(float(v), 6) for v in scanner_params.scanner_object.location]}
+        self.qa_log.append(decision)
+        if not report.passed:
+            action = "rescanning from a new viewpoint" if rescan else "keeping it, no rescans left"
+            print(f"Scan QA of {dir}/{filename} {report}, {action}")
+        return not rescan
+
+
+    def run_scene(self, n: int, dir: str, scene_params: SceneGeneratorParams, scanner_params: ScannerParams, filenames, elapsed: float = 0.0, seed=None, clutter_params: ClutterParams = None):
+        """
+        Runs all stages of a scene. The seed, if given, is only used to look the scene up in the cache.
+
+        Returns:
+            tuple: The AABBs and object params of the scene, and the stage timings
+                   in seconds. AABBs and object params are None on a cache hit.
+        """
+        self.begin_scene(n)
+        try:
+            if self.restore_cached_scene(n, dir, seed, scene_params, scanner_params, filenames, clutter_params):
+                return None, None, dict(self.timings)
+            aabbs, object_params = self.generate_scene(scene_params, clutter_params)
+            if self.saves_blend(n):
+                self.save_scene(dir)
+            self.scan_scene(scanner_params, aabbs, dir, filenames)
+            self.write_scene_metadata(n, dir, elapsed, scene_params, object_params)
+            self.write_scene_spec(n, dir, seed, object_params, scanner_params, clutter_params)
+            self.store_cached_scene(n, dir, seed, scene_params, scanner_params, filenames, clutter_params)
+            return aabbs, object_params, dict(self.timings)
+        finally:
+            self.end_scene()
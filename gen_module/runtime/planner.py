@@ -0,0 +1,267 @@
+# runtime/planner.py
+"""
+Predicts the scenes, points, disk usage and wall time of a sweep before it is started.
+
+Runs with a regular Python interpreter, outside of Blender. The model is
+calibrated on the output directory of a small sample run, e.g. 50 scenes
+spread over the sweep, and on its telemetry events for the timings:
+
+    python runtime/planner.py --sample "/media/dawid/blensor data/sample" \
+        --events "/media/dawid/blensor data/sample/telemetry" --workers 1 8 16 32
+
+Without events, the timings of an earlier scheduler run (--timings, see
+runtime/scheduler.py) or the prior of the cost model are used.
+
+The model:
+    - wall time: the CostModel of runtime/scheduler.py, fitted on the seconds
+      of every sample scene, and the sweep split into batches that are
+      assigned longest first to the workers, as the scheduler does
+    - points: points per scanned frame of the sample, times the frames of the
+      sweep. Scenes of a sweep are scaled copies of each other, so the points
+      per frame hardly change with the object size
+    - disk: per output type (scan.evd, scan.pcq, scene.json, ...), bytes
+      linear in the points of the file's scan or scene, times the share of
+      sample scenes that have it. scene.blend is only saved for every
+      'blend_save_interval'-th scene, which a small sample can't tell
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import heapq
+import shutil
+import argparse
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scanner.evd import EVD_DTYPE
+from postprocessing.codec import PointCloudDecoder
+from runtime.sweep import SweepDefinition, MAIN2_SWEEP
+from runtime.scheduler import Job, CostModel, sweep_jobs
+from runtime.telemetry import EventTail
+
+config = SystemConfiguration()
+
+SCAN_PATTERN = re.compile(r"^scan\d+")
+
+
+def output_kind(filename):
+    """
+    Output type of a file in a scene directory, e.g. scan2.range.npz -> scan.range.npz, test_17.txt -> test_n.txt.
+    """
+    if SCAN_PATTERN.match(filename):
+        return SCAN_PATTERN.sub("scan", filename)
+    return re.sub(r"^test_\d+\.txt$", "test_n.txt", filename)
+
+
+def scan_point_count(filepath):
+    """
+    Points of a .evd or .pcq scan, without reading the points.
+    """
+    if filepath.endswith(".pcq"):
+        return len(PointCloudDecoder(filepath))
+    return os.path.getsize(filepath) // EVD_DTYPE.itemsize
+
+
+def measure_scene(scene_dir):
+    """
+    Returns:
+        dict: "points" of the scene and "files", a list of (kind, points, bytes)
+              where points are those of the file's scan, or of the scene.
+    """
+    scan_points = {}
+    for filepath in glob.glob(os.path.join(scene_dir, "scan*.evd")) + glob.glob(os.path.join(scene_dir, "scan*.pcq")):
+        name = os.path.basename(filepath).split(".")[0]
+        # A scan kept as .evd and .pcq is counted once
+        scan_points.setdefault(name, scan_point_count(filepath))
+    points = sum(scan_points.values())
+
+    files = []
+    for entry in os.scandir(scene_dir):
+        if entry.is_file() and not entry.name.endswith(".tmp"):
+            name = entry.name.split(".")[0]
+            files.append((output_kind(entry.name), scan_points.get(name, points), entry.stat().st_size))
+    return {"points": points, "files": files}
+
+
+def read_sample(root, events=None):
+    """
+    Measures the scanning{n} directories of a sample run.
+
+    Parameters:
+        events (str or None): Directory or glob pattern of its telemetry event logs.
+
+    Returns:
+        dict: {n: {"points", "files", "seconds"}}, seconds being None for
+              scenes without an event (or only cached ones).
+    """
+    samples = {}
+    for scene_dir in glob.glob(os.path.join(root, "scanning*")):
+        suffix = os.path.basename(scene_dir)[len("scanning"):]
+        if os.path.isdir(scene_dir) and suffix.isdigit():
+            samples[int(suffix)] = dict(measure_scene(scene_dir), seconds=None)
+    if events is not None:
+        pattern = os.path.join(events, "*.jsonl") if os.path.isdir(events) else events
+        for event in EventTail(pattern).read():
+            if event.get("type") == "scene" and event["status"] == "ok" and event["scene"] in samples:
+                samples[event["scene"]]["seconds"] = sum(event["timings"].values())
+    return samples
+
+
+def makespan(costs, workers: int):
+    """
+    Wall time of jobs with the given costs, started longest first on 'workers' workers.
+    """
+    finish_times = [0.0] * workers
+    for cost in sorted(costs, reverse=True):
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
+
+
+class CapacityModel:
+    """
+    Points, bytes per output type and wall time of a sweep, calibrated on a sample run.
+    """
+
+    def __init__(self, cost_model: CostModel = None):
+        self.cost_model = cost_model if cost_model is not None else CostModel()
+        self.points_per_frame = None
+        # kind: (fixed bytes, bytes per point, files per scene or scan)
+        self.outputs = {}
+
+
+    def fit(self, sweep: SweepDefinition, samples):
+        """
+        Calibrates the model on read_sample() of a run of 'sweep'.
+        """
+        if not samples:
+            raise ValueError("The sample run has no scenes.")
+        for n, sample in sorted(samples.items()):
+            if sample["seconds"] is not None:
+                self.cost_model.observe(Job.from_sweep(sweep, n, n + 1), sample["seconds"])
+        self.points_per_frame = sum(s["points"] for s in samples.values()) / (len(samples) * sweep.frames_per_scene)
+
+        observations = {}
+        for sample in samples.values():
+            for kind, points, size in sample["files"]:
+                observations.setdefault(kind, []).append((points, size))
+        self.outputs = {}
+        for kind, values in sorted(observations.items()):
+            points, sizes = np.array(values, dtype=np.float64).T
+            files = len(values) / (len(samples) * (sweep.scans_per_scene if kind.startswith("scan.") else 1))
+            self.outputs[kind] = self._fit_bytes(points, sizes) + (files,)
+        return self
+
+
+    @staticmethod
+    def _fit_bytes(points, sizes):
+        if np.ptp(points) == 0:
+            return float(sizes.mean()), 0.0
+        x = np.column_stack((np.ones_like(points), points))
+        fixed, per_point = np.linalg.lstsq(x, sizes, rcond=None)[0]
+        # Noisy samples can give negative coefficients, fall back to a constant or a proportional size
+        if per_point < 0:
+            return float(sizes.mean()), 0.0
+        if fixed < 0:
+            return 0.0, float(sizes.sum() / points.sum())
+        return float(fixed), float(per_point)
+
+
+    def predict(self, sweep: SweepDefinition, workers=(1,), batch_size: int = 20, blend_save_interval: int = None):
+        """
+        Returns:
+            dict: "scenes", "points", "points_per_scene", "bytes" ({kind: bytes}),
+                  "total_bytes", "cpu_seconds" and "wall_seconds" ({workers: seconds}).
+        """
+        if self.points_per_frame is None:
+            raise ValueError("The model must be fitted before predicting.")
+        if blend_save_interval is None:
+            blend_save_interval = config.get("blend_save_interval", 100)
+        points_per_scene = self.points_per_frame * sweep.frames_per_scene
+        points_per_scan = points_per_scene / max(sweep.scans_per_scene, 1)
+
+        output_bytes = {}
+        for kind, (fixed, per_point, files) in self.outputs.items():
+            if kind == "scene.blend":
+                files = 1 / blend_save_interval if blend_save_interval else 0.0
+            if kind.startswith("scan."):
+                output_bytes[kind] = sweep.count * sweep.scans_per_scene * files * (fixed + per_point * points_per_scan)
+            else:
+                output_bytes[kind] = sweep.count * files * (fixed + per_point * points_per_scene)
+
+        costs = [self.cost_model.estimate(job) for job in sweep_jobs(sweep, 0, sweep.count, batch_size)]
+        return {
+            "scenes": sweep.count,
+            "points": points_per_scene * sweep.count,
+            "points_per_scene": points_per_scene,
+            "bytes": output_bytes,
+            "total_bytes": sum(output_bytes.values()),
+            "cpu_seconds": sum(costs),
+            "wall_seconds": {w: makespan(costs, w) for w in workers},
+        }
+
+
+def format_duration(seconds):
+    days, rest = divmod(int(round(seconds)), 86400)
+    hours, rest = divmod(rest, 3600)
+    return f"{days}d {hours:02d}h {rest // 60:02d}m" if days else f"{hours}h {rest // 60:02d}m"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict the scenes, points, disk usage and wall time of a sweep.")
+    parser.add_argument("--sample", required=True, help="Output directory of a sample run of the same sweep.")
+    parser.add_argument("--events", default=None, help="Telemetry event logs of the sample run, see runtime/telemetry.py.")
+    parser.add_argument("--timings", default=None, help="Cost model of an earlier scheduler run, see runtime/scheduler.py.")
+    parser.add_argument("--count", type=int, default=MAIN2_SWEEP.count)
+    parser.add_argument("--min-object-size", type=float, default=MAIN2_SWEEP.min_object_size)
+    parser.add_argument("--max-object-size", type=float, default=MAIN2_SWEEP.max_object_size)
+    parser.add_argument("--object-count-range", type=int, nargs=2, default=MAIN2_SWEEP.object_count_range)
+    parser.add_argument("--primitives", nargs="+", default=MAIN2_SWEEP.primitives)
+    parser.add_argument("--frames", type=int, default=MAIN2_SWEEP.frame_end - MAIN2_SWEEP.frame_start, help="Frames per scan.")
+    parser.add_argument("--scans-per-scene", type=int, default=MAIN2_SWEEP.scans_per_scene)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 16, 32])
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--output-dir", default=None, help="Volume the sweep writes to, checked for free space.")
+    parser.add_argument("--json", action="store_true", help="Print the prediction as JSON.")
+    args = parser.parse_args()
+
+    sweep = SweepDefinition(
+        count=args.count,
+        min_object_size=args.min_object_size,
+        max_object_size=args.max_object_size,
+        object_count_range=args.object_count_range,
+        primitives=args.primitives,
+        frame_end=args.frames,
+        scans_per_scene=args.scans_per_scene,
+    )
+    cost_model = CostModel.load(args.timings) if args.timings else CostModel()
+    model = CapacityModel(cost_model).fit(sweep, read_sample(args.sample, args.events))
+    prediction = model.predict(sweep, args.workers, args.batch_size)
+    if args.json:
+        print(json.dumps(prediction, indent=2))
+        return 0
+
+    print(f"{prediction['scenes']} scenes, {prediction['points']:.3g} points ({prediction['points_per_scene']:.3g} per scene)")
+    for kind, size in sorted(prediction["bytes"].items(), key=lambda item: -item[1]):
+        print(f"  {kind:<24} {size / 1e9:10.2f} GB")
+    print(f"  {'total':<24} {prediction['total_bytes'] / 1e9:10.2f} GB")
+    for workers, seconds in prediction["wall_seconds"].items():
+        print(f"{workers:4d} workers: {format_duration(seconds)}")
+
+    if args.output_dir is not None:
+        free = shutil.disk_usage(args.output_dir).free
+        if prediction["total_bytes"] > free:
+            print(f"The sweep needs {prediction['total_bytes'] / 1e9:.1f} GB, {args.output_dir} has {free / 1e9:.1f} GB free")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# runtime/profiler.py
+"""
+Sampling profiler for the Python stacks of a Blender worker, tagged with the stage of the scene.
+
+Enabled with --profile <dir> of main2() and runtime/daemon.py. For one in
+every 'scene_interval' scenes, a background thread samples the stack of the
+main thread every 'interval' seconds and counts it under the current stage
+of RuntimeModule (generate, scan, qa, ...). Every worker writes its counts
+to <dir>/<host>_<pid>.collapsed in the collapsed stack format:
+
+    scan;main.py:main2;main.py:scan_scene;scanner/main.py:scan_scene;ops.py:__call__ 5230
+
+with the stage as the root frame and the sampled milliseconds as the count.
+The files of all workers can be merged, optionally for one stage only, and
+drawn with flamegraph.pl or speedscope:
+
+    python runtime/profiler.py merged.collapsed "/media/dawid/blensor data/profile" --stage scan
+    flamegraph.pl merged.collapsed > scan.svg
+
+Only Python frames are seen, so a call into Blender (an operator, BlenSor's
+scan_range, scene.update()) shows up as the Python line that made it. Such
+calls usually hold the GIL, which delays the next sample until they return.
+Every sample is therefore weighted by the time since the previous one, which
+attributes the whole call to the stack that made it.
+
+The sampler sleeps between profiled scenes. While profiling, a sample costs
+a few microseconds per frame of the stack, well under 1% at 100 samples per
+second.
+"""
+
+import os
+import sys
+import glob
+import time
+import socket
+import argparse
+import threading
+import collections
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+
+config = SystemConfiguration()
+
+# Stage of samples taken outside of any RuntimeModule stage
+NO_STAGE = "other"
+
+
+def frame_label(code):
+    directory, filename = os.path.split(code.co_filename)
+    return f"{os.path.basename(directory)}/{filename}:{code.co_name}" if directory else f"{filename}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the thread that creates it, in a background thread.
+    """
+
+    def __init__(self, dir: str, interval: float = None, scene_interval: int = None):
+        if interval is None:
+            interval = config.get("profiler_interval", 0.01)
+        if scene_interval is None:
+            scene_interval = config.get("profiler_scene_interval", 20)
+        if not interval > 0:
+            raise ValueError(f"'interval' {interval} must be a positive number.")
+        if scene_interval < 0:
+            raise ValueError(f"'scene_interval' {scene_interval} must not be negative.")
+        os.makedirs(dir, exist_ok=True)
+        self.filepath = os.path.join(dir, f"{socket.gethostname()}_{os.getpid()}.collapsed")
+        self.interval = interval
+        self.scene_interval = scene_interval
+        self.stage = None
+        # (stage, code objects from the innermost frame out): sampled seconds
+        self.counts = collections.Counter()
+        self._thread_id = threading.get_ident()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._scene = 0     # Counts profiled scenes, so no sample spans two of them
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+
+    def profiles(self, n: int):
+        """
+        Returns True if scene 'n' is profiled, 0 profiles none.
+        """
+        return self.scene_interval > 0 and n % self.scene_interval == 0
+
+
+    def begin_scene(self, n: int):
+        self.end_scene()
+        if self.profiles(n):
+            self._scene += 1
+            self._active.set()
+
+
+    def end_scene(self):
+        if self._active.is_set():
+            self._active.clear()
+            self.flush()
+
+
+    def close(self):
+        self._stopped = True
+        self._active.set()
+        self._thread.join()
+        if self.counts:
+            self.flush()
+
+
+    def collapsed(self):
+        """
+        Returns:
+            Counter: Sampled milliseconds per collapsed stack, "stage;outermost frame;...;innermost frame".
+        """
+        with self._lock:
+            counts = list(self.counts.items())
+        stacks = collections.Counter()
+        for (stage, codes), seconds in counts:
+            stacks[";".join([stage or NO_STAGE] + [frame_label(code) for code in reversed(codes)])] += seconds * 1000
+        return collections.Counter({stack: round(ms) for stack, ms in stacks.items() if round(ms) > 0})
+
+
+    def flush(self):
+        write_collapsed(self.filepath, self.collapsed())
+
+
+    def _run(self):
+        scene = last_time = None
+        while True:
+            self._active.wait()
+            if self._stopped:
+                return
+            now = time.perf_counter()
+            if scene == self._scene and last_time is not None:
+                self._sample(now - last_time)
+            scene, last_time = self._scene, now
+            time.sleep(self.interval)
+
+
+    def _sample(self, seconds):
+        frame = sys._current_frames().get(self._thread_id)
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        with self._lock:
+            self.counts[(self.stage, tuple(codes))] += seconds
+
+
+def read_collapsed(filepath):
+    counts = collections.Counter()
+    with open(filepath, "r") as file:
+        for line in file:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                counts[stack] += int(count)
+    return counts
+
+
+def write_collapsed(filepath, counts):
+    """
+    Replaces the file atomically, so a merge never reads a partial file.
+    """
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, "w") as file:
+        for stack, count in sorted(counts.items()):
+            file.write(f"{stack} {count}\n")
+    os.replace(tmp_filepath, filepath)
+
+
+def merge_collapsed(filepaths, stage: str = None):
+    """
+    Sums the counts of collapsed stack files, keeping only the stacks of 'stage' if given.
+    """
+    merged = collections.Counter()
+    for filepath in filepaths:
+        for stack, count in read_collapsed(filepath).items():
+            if stage is None or stack.split(";", 1)[0] == stage:
+                merged[stack] += count
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the collapsed stack files of several workers.")
+    parser.add_argument("output", help="Merged collapsed stack file to write.")
+    parser.add_argument("inputs", nargs="+", help="Collapsed stack files, or directories holding them.")
+    parser.add_argument("--stage", default=None, help="Keep only the samples of this stage.")
+    args = parser.parse_args()
+
+    filepaths = []
+    for path in args.inputs:
+        filepaths += sorted(glob.glob(os.path.join(path, "*.collapsed"))) if os.path.isdir(path) else [path]
+    merged = merge_collapsed(filepaths, args.stage)
+    write_collapsed(args.output, merged)
+    total = sum(merged.values())
+    print(f"{len(filepaths)} files, {len(merged)} stacks, {total / 1000:.1f}s sampled")
+    by_stage = collections.Counter()
+    for stack, count in merged.items():
+        by_stage[stack.split(";", 1)[0]] += count
+    for stage, count in by_stage.most_common():
+        print(f"  {stage:<12} {count / 1000:8.1f}s {count / max(total, 1):6.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
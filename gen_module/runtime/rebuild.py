@@ -0,0 +1,87 @@
+# runtime/rebuild.py
+"""
+Recreates the scene.blend of generated scenes from their scene.json (see runtime/specs.py).
+
+    blender -b base.blend -P runtime/rebuild.py -- "/media/dawid/blensor data/jan20252/scanning42"
+
+Several scene directories can be given at once. The .blend file opened by
+Blender must hold the scanner camera the scenes were scanned with. Objects
+are created through the object pool and clutter objects through the
+ClutterGenerator, like during generation, and the camera gets the location
+and keyframes it was scanned with.
+"""
+
+import os
+import sys
+import argparse
+import bpy
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+# scene_generator/main.py imports its params module without the package name
+scene_generator_path = os.path.join(project_root, 'scene_generator')
+if scene_generator_path not in sys.path:
+    sys.path.append(scene_generator_path)
+
+from scene_generator.main import SceneGeneratorModule
+from scene_generator.pool import ObjectPool
+from scene_generator.utils import create_object
+from scanner.utils import keyframe_setup
+from runtime.specs import read_scene_spec, scene_spec_filepath, split_clutter
+from scene_generator.clutter_params import clutter_params_from_message
+
+
+def rebuild_scene(scene_generator: SceneGeneratorModule, spec):
+    """
+    Replaces the objects of the current scene with the ones of the spec and poses the camera.
+    """
+    scene_generator.clean_scene()
+    objects, clutter = split_clutter(spec["objects"])
+    for params in objects:
+        create_object(params, pool=scene_generator.object_pool)
+    if clutter:
+        clutter_params = clutter_params_from_message(spec["clutter_params"])
+        scene_generator.clutter_generator.create(clutter, clutter_params)
+
+    camera = spec["camera"]
+    scanner_object = bpy.data.objects[camera["name"]]
+    scanner_object.location = camera["location"]
+    # Same argument order as ScannerModule.scan_scene()
+    keyframe_setup(scanner_object, camera["frame_start"], camera["frame_end"], camera["max_angle"], camera["min_angle"])
+
+
+def rebuild_blend(scene_generator: SceneGeneratorModule, dir: str, filepath: str = None):
+    """
+    Rebuilds the scene of 'dir' and saves it, by default as '{dir}/scene.blend'.
+
+    Returns:
+        str: Path of the saved .blend file.
+    """
+    spec = read_scene_spec(scene_spec_filepath(dir))
+    rebuild_scene(scene_generator, spec)
+    if scene_generator.object_pool is not None:
+        # Otherwise the idle objects of the pool would be saved with the scene
+        scene_generator.object_pool.drop_idle()
+    filepath = filepath or os.path.join(dir, "scene.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=filepath, copy=True)
+    return filepath
+
+
+def parse_arguments():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Rebuild the scene.blend files of generated scenes from their scene.json.")
+    parser.add_argument("dirs", nargs="+", help="Scene directories holding a scene.json.")
+    parser.add_argument("--output", default=None, help="Path of the .blend file, only with a single directory.")
+    args = parser.parse_args(argv)
+    if args.output is not None and len(args.dirs) > 1:
+        parser.error("--output needs a single scene directory.")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    scene_generator = SceneGeneratorModule(object_pool=ObjectPool())
+    for dir in args.dirs:
+        print(f"Rebuilt {rebuild_blend(scene_generator, dir, args.output)}")
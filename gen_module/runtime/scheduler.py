@@ -0,0 +1,259 @@
+# runtime/scheduler.py
+"""
+Runs a sweep as batches of scenes on several Blender workers, longest job first.
+
+Runs with a regular Python interpreter, outside of Blender, e.g.:
+
+    python runtime/scheduler.py --blender /opt/blensor/blender --blend base.blend \
+        --start 0 --end 10000 --batch-size 20 --workers 8 --timings timings.json
+
+Object sizes grow over the index range of the sweep, and so do scan times,
+so the cost of every batch is estimated from its parameters and the most
+expensive batches are started first. The estimates are refined from the
+measured wall time of every finished batch.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from runtime.sweep import SweepDefinition, MAIN2_SWEEP
+from runtime.supervisor import supervise
+
+config = SystemConfiguration()
+
+
+class Job:
+    """
+    A batch of scenes [start, end) of a sweep, with the features its cost is estimated from.
+    """
+
+    def __init__(self, start: int, end: int, features):
+        self.start = start
+        self.end = end
+        self.features = np.asarray(features, dtype=np.float64)
+        self.estimate = None    # estimated seconds, set when the job is dispatched
+
+
+    @classmethod
+    def from_sweep(cls, sweep: SweepDefinition, start: int, end: int):
+        scene_sizes = np.array([sweep.scene_size(n) for n in range(start, end)])
+        return cls(start, end, CostModel.sweep_features(sweep, scene_sizes))
+
+
+    def __repr__(self):
+        return f"Job({self.start}, {self.end})"
+
+
+class CostModel:
+    """
+    Linear model of the wall time of a job.
+
+    Features, summed over the scenes of a job:
+        - scenes: fixed cost per scene (generation, saving, writing metadata)
+        - triangles: expected object count times the mean triangle count of the primitive mix
+        - frames: scanned frames (frame range times scans per scene)
+        - frames_x_size: scanned frames times scene_size, as scans of larger
+          scenes have been measured to take longer
+
+    The coefficients start at a prior and are refitted with ridge regression
+    towards the prior after every observation, so a handful of timings is
+    enough to adapt the model to the machine it runs on.
+    """
+
+    FEATURES = ("scenes", "triangles", "frames", "frames_x_size")
+
+
+    def __init__(self, prior=None, ridge=None):
+        if prior is None:
+            prior = config.get("scheduler_prior_coefficients", [2.0, 0.0001, 0.02, 0.02])
+        if ridge is None:
+            ridge = config.get("scheduler_ridge", 1.0)
+        self.prior = np.asarray(prior, dtype=np.float64)
+        self.coefficients = self.prior.copy()
+        self.ridge = ridge
+        self.observations = []
+
+
+    @staticmethod
+    def sweep_features(sweep: SweepDefinition, scene_sizes):
+        scene_sizes = np.asarray(scene_sizes, dtype=np.float64)
+        n = len(scene_sizes)
+        return np.array([
+            n,
+            n * sweep.mean_object_count * sweep.mean_triangles_per_object,
+            n * sweep.frames_per_scene,
+            sweep.frames_per_scene * scene_sizes.sum(),
+        ])
+
+
+    def estimate(self, job: Job):
+        # A job can't take less than its fixed per-scene cost would suggest
+        return max(float(job.features @ self.coefficients), 1e-3 * float(job.features[0]))
+
+
+    def observe(self, job: Job, seconds: float):
+        self.observations.append((job.features, seconds))
+        self._refit()
+
+
+    def _refit(self):
+        x = np.array([features for features, _ in self.observations])
+        y = np.array([seconds for _, seconds in self.observations])
+        # Scale the features, so the ridge term treats all of them alike
+        scale = np.maximum(np.abs(x).max(axis=0), 1e-12)
+        xs = x / scale
+        prior = self.prior * scale
+        a = xs.T @ xs + self.ridge * np.eye(len(self.FEATURES))
+        b = xs.T @ y + self.ridge * prior
+        self.coefficients = np.maximum(np.linalg.solve(a, b), 0) / scale
+
+
+    def save(self, filepath):
+        with open(filepath, "w") as file:
+            json.dump({
+                "features": list(self.FEATURES),
+                "coefficients": self.coefficients.tolist(),
+                "observations": [[features.tolist(), seconds] for features, seconds in self.observations],
+            }, file, indent=2)
+
+
+    @classmethod
+    def load(cls, filepath, prior=None, ridge=None):
+        """
+        Creates a model from a file written by save(). If the file does not exist, the prior is used.
+        """
+        model = cls(prior, ridge)
+        if os.path.exists(filepath):
+            with open(filepath, "r") as file:
+                data = json.load(file)
+            model.observations = [(np.asarray(features), seconds) for features, seconds in data["observations"]]
+            if model.observations:
+                model._refit()
+        return model
+
+
+class JobScheduler:
+    """
+    Dispatches jobs to a fixed number of workers, always starting the job with
+    the largest estimated cost next (longest processing time first).
+    """
+
+    def __init__(self, jobs, workers: int, cost_model: CostModel = None):
+        if workers < 1:
+            raise ValueError(f"'workers' {workers} must be at least 1.")
+        self.jobs = list(jobs)
+        self.workers = workers
+        self.cost_model = cost_model if cost_model is not None else CostModel()
+
+
+    def run(self, run_job, on_finished=None):
+        """
+        Runs all jobs.
+
+        Parameters:
+            run_job (callable): Called with a Job in a worker thread. Usually
+                starts a Blender process and waits for it. An exception marks
+                the job as failed.
+            on_finished (callable or None): Called with (job, seconds, error)
+                after every job, in the scheduling thread.
+
+        Returns:
+            list: Jobs that failed.
+        """
+        pending = list(self.jobs)
+        running = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    # Estimates change after every observation, so pick the longest job each time
+                    longest = max(range(len(pending)), key=lambda i: self.cost_model.estimate(pending[i]))
+                    job = pending.pop(longest)
+                    job.estimate = self.cost_model.estimate(job)
+                    running[executor.submit(self._timed, run_job, job)] = job
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    seconds, error = future.result()
+                    if error is None:
+                        self.cost_model.observe(job, seconds)
+                    else:
+                        failed.append(job)
+                    if on_finished is not None:
+                        on_finished(job, seconds, error)
+        return failed
+
+
+    @staticmethod
+    def _timed(run_job, job):
+        start_time = time.time()
+        try:
+            run_job(job)
+        except Exception as error:
+            return time.time() - start_time, error
+        return time.time() - start_time, None
+
+
+def sweep_jobs(sweep: SweepDefinition, start: int, end: int, batch_size: int):
+    """
+    Splits the scenes [start, end) of a sweep into jobs of 'batch_size' scenes.
+    """
+    return [Job.from_sweep(sweep, i, min(i + batch_size, end)) for i in range(start, end, batch_size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the main2() sweep on several Blender workers, longest batches first.")
+    parser.add_argument("--blender", default="blender", help="Path to the Blender (BlenSor) binary.")
+    parser.add_argument("--blend", default="", help="The .blend file to open, e.g. one with the scanner camera.")
+    parser.add_argument("--script", default=os.path.join(project_root, "main.py"))
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=MAIN2_SWEEP.count)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timings", default=None, help="JSON file the cost model is loaded from and saved to.")
+    parser.add_argument("--checkpoints", default=None, help="Directory for the per-batch checkpoint files, by default a temporary directory.")
+    args = parser.parse_args()
+
+    cost_model = CostModel.load(args.timings) if args.timings else CostModel()
+    jobs = sweep_jobs(MAIN2_SWEEP, args.start, args.end, args.batch_size)
+    scheduler = JobScheduler(jobs, args.workers, cost_model)
+
+    # Every batch needs a checkpoint, so a recycled worker resumes instead of starting over
+    checkpoints = args.checkpoints or tempfile.mkdtemp(prefix="checkpoints_")
+    os.makedirs(checkpoints, exist_ok=True)
+
+    def run_job(job):
+        worker_args = ["--sweep", "--seed-per-scene", "--start", str(job.start), "--end", str(job.end),
+                       "--checkpoint", os.path.join(checkpoints, f"batch_{job.start}_{job.end}.txt")]
+        exit_code = supervise(args.blender, args.blend, args.script, worker_args)
+        if exit_code != 0:
+            raise RuntimeError(f"Worker for {job} exited with {exit_code}")
+
+    def on_finished(job, seconds, error):
+        status = "failed" if error else "done"
+        print(f"{job} {status} in {seconds:.1f}s, estimated {job.estimate:.1f}s")
+        if args.timings:
+            cost_model.save(args.timings)
+
+    failed = scheduler.run(run_job, on_finished)
+    if failed:
+        print(f"Failed batches: {failed}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
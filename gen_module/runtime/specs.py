@@ -0,0 +1,114 @@
+# runtime/specs.py
+"""
+Compact scene specifications (scene.json), written instead of a full scene.blend.
+
+Everything in a generated scene follows from its object params, the pose
+of the scanner camera and the seed, so a scene is stored as those, a few
+hundred bytes in total. runtime/rebuild.py recreates the scene.blend of a
+scene from its specification when it is needed.
+
+Floats are written with repr(), which reads back to the exact same value,
+so a rebuilt scene places every object exactly where it was scanned.
+
+Layout of scene.json:
+    {"version": 1, "scene": n, "seed": "2025-n",
+     "objects": [object params in the format of generate_scene(), ...],
+     "camera": {"name": "Camera", "location": [x, y, z],
+                "frame_start": 0, "frame_end": 200, "min_angle": 0, "max_angle": 180},
+     "clutter_params": {...} (only for cluttered scenes),
+     "scan_plans": {"scan1.evd": {...}, ...} (only for adaptive scans, see scanner/density.py),
+     "scan_locations": {"scan1.evd": [x, y, z], ...} (where the scanner was during each scan)}
+
+Clutter objects are the objects whose params have "clutter": true.
+"""
+
+import os
+import json
+
+SPEC_VERSION = 1
+SPEC_FILENAME = "scene.json"
+
+
+def scene_spec_filepath(dir):
+    return os.path.join(dir, SPEC_FILENAME)
+
+
+def camera_spec(scanner_params):
+    """
+    Returns the pose of the scanner camera after ScannerModule.scan_scene() placed it.
+    """
+    scanner_object = scanner_params.scanner_object
+    return {
+        "name": scanner_object.name,
+        "location": [float(v) for v in scanner_object.location],
+        "frame_start": scanner_params.frame_start,
+        "frame_end": scanner_params.frame_end,
+        "min_angle": scanner_params.min_angle,
+        "max_angle": scanner_params.max_angle,
+    }
+
+
+def write_scene_spec(filepath, n, seed, object_params, camera, clutter_params=None, scan_plans=None, scan_locations=None):
+    """
+    Writes the specification of a generated scene.
+
+    Parameters:
+        n (int): Index of the scene.
+        seed: The seed the scene was generated with, or None.
+        object_params (list): Params of all objects, clutter objects included.
+        camera (dict): Pose of the scanner camera, see camera_spec().
+        clutter_params (dict or None): The clutter params in the format of runtime/cache.py.
+        scan_plans (dict or None): ScanPlan.as_dict() of every adaptive scan by file name.
+        scan_locations (dict or None): Location of the scanner during every scan by file name.
+    """
+    spec = {
+        "version": SPEC_VERSION,
+        "scene": n,
+        "seed": seed,
+        "objects": [_plain(params) for params in object_params],
+        "camera": camera,
+    }
+    if clutter_params is not None:
+        spec["clutter_params"] = clutter_params
+    if scan_plans is not None:
+        spec["scan_plans"] = _plain(scan_plans)
+    if scan_locations is not None:
+        spec["scan_locations"] = _plain(scan_locations)
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, "w") as file:
+        json.dump(spec, file, separators=(",", ":"))
+    os.replace(tmp_filepath, filepath)
+
+
+def read_scene_spec(filepath):
+    """
+    Reads a scene.json file.
+
+    Raises:
+        ValueError: If the file was written by an unknown version of the format.
+    """
+    with open(filepath, "r") as file:
+        spec = json.load(file)
+    if spec.get("version") != SPEC_VERSION:
+        raise ValueError(f"{filepath} has unsupported scene spec version {spec.get('version')}.")
+    return spec
+
+
+def split_clutter(object_params):
+    """
+    Returns the regular objects and the clutter objects of a scene spec.
+    """
+    objects = [params for params in object_params if not params.get("clutter")]
+    clutter = [params for params in object_params if params.get("clutter")]
+    return objects, clutter
+
+
+def _plain(value):
+    # Object params may hold numpy scalars or tuples
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
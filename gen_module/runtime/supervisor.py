@@ -0,0 +1,90 @@
+# runtime/supervisor.py
+"""
+Keeps restarting the Blender worker until the sweep is finished.
+
+Runs with a regular Python interpreter, outside of Blender, e.g.:
+
+    python runtime/supervisor.py --blender /opt/blensor/blender --blend base.blend \
+        -- --sweep --start 0 --end 10000 --checkpoint /data/run/checkpoint.txt
+
+Everything after '--' is passed on to main.py. When the worker exits with
+RECYCLE_EXIT_CODE (its memory watchdog asked for a restart), a new worker is
+started and continues from the checkpoint. Any other exit code ends the loop.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.append(project_root)
+
+from runtime.utils import RECYCLE_EXIT_CODE
+
+
+def run_worker(blender, blend, script, worker_args, stop=None):
+    """
+    Runs a worker and returns its exit code. If the 'stop' event is set, the worker is terminated.
+    """
+    command = [blender, "-b"]
+    if blend:
+        command.append(blend)
+    command += ["-P", script, "--"] + worker_args
+    process = subprocess.Popen(command)
+    if stop is None:
+        return process.wait()
+    while True:
+        try:
+            return process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        if stop.is_set():
+            process.terminate()
+            try:
+                return process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                return process.wait()
+
+
+def supervise(blender, blend, script, worker_args, max_restarts=1000, stop=None):
+    """
+    Runs a worker, restarting it as long as it exits with RECYCLE_EXIT_CODE.
+    Setting the 'stop' event terminates the worker and ends the loop.
+
+    Returns:
+        int: Exit code of the last worker.
+    """
+    restarts = 0
+    while True:
+        exit_code = run_worker(blender, blend, script, worker_args, stop)
+        if exit_code != RECYCLE_EXIT_CODE or (stop is not None and stop.is_set()):
+            return exit_code
+        restarts += 1
+        if restarts > max_restarts:
+            print(f"Giving up after {restarts - 1} restarts")
+            return exit_code
+        print(f"Worker recycled, starting worker #{restarts + 1}")
+
+
+def main():
+    argv = sys.argv[1:]
+    worker_args = []
+    if "--" in argv:
+        worker_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Restart the Blender worker whenever it asks to be recycled.")
+    parser.add_argument("--blender", default="blender", help="Path to the Blender (BlenSor) binary.")
+    parser.add_argument("--blend", default="", help="The .blend file to open, e.g. one with the scanner camera.")
+    parser.add_argument("--script", default=os.path.join(project_root, "main.py"))
+    parser.add_argument("--max-restarts", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    return supervise(args.blender, args.blend, args.script, worker_args, args.max_restarts)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# runtime/sweep.py
+
+import numpy as np
+
+# Triangle counts of the meshes generate_scene() creates, used to weight the primitive mix
+PRIMITIVE_TRIANGLES = {
+    "plane": 2,
+    "box": 12,
+    "sphere": 8064,             # 64 segments, 64 rings
+    "cylinder": 124,            # 32 vertices
+    "cone": 62,                 # 32 vertices
+    "triangular_pyramid": 4,
+    "rectangular_pyramid": 6,
+}
+
+
+class SweepDefinition:
+    """
+    Describes a size sweep like the one of main2(), without needing Blender.
+
+    Object sizes grow linearly from 'min_object_size' to 'max_object_size'
+    over 'count' scenes, and every scene is 'scene_size_factor' times larger
+    than its object size.
+    """
+
+    def __init__(
+            self,
+            count: int = 10_000,
+            min_object_size: float = 0.8/100,
+            max_object_size: float = 1.0,
+            scene_size_factor: float = 2.5,
+            object_count_range=(5, 8),
+            primitives=("box", "cone", "rectangular_pyramid", "cylinder"),
+            frame_start: int = 0,
+            frame_end: int = 200,
+            scans_per_scene: int = 3
+    ):
+        if count < 1:
+            raise ValueError(f"'count' {count} must be at least 1.")
+        unknown = set(primitives) - set(PRIMITIVE_TRIANGLES)
+        if unknown:
+            raise ValueError(f"Unknown primitives: {sorted(unknown)}")
+        self.count = count
+        self.min_object_size = min_object_size
+        self.max_object_size = max_object_size
+        self.scene_size_factor = scene_size_factor
+        self.object_count_range = tuple(object_count_range)
+        self.primitives = tuple(primitives)
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.scans_per_scene = scans_per_scene
+
+
+    def object_sizes(self):
+        return np.linspace(self.min_object_size, self.max_object_size, self.count)
+
+
+    def object_size(self, n):
+        return float(self.object_sizes()[n])
+
+
+    def scene_size(self, n):
+        return self.object_size(n) * self.scene_size_factor
+
+
+    @property
+    def mean_object_count(self):
+        return sum(self.object_count_range) / 2.0
+
+
+    @property
+    def mean_triangles_per_object(self):
+        return sum(PRIMITIVE_TRIANGLES[p] for p in self.primitives) / len(self.primitives)
+
+
+    @property
+    def frames_per_scene(self):
+        return (self.frame_end - self.frame_start) * self.scans_per_scene
+
+
+# The sweep generated by main2()
+MAIN2_SWEEP = SweepDefinition()
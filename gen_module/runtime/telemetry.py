@@ -0,0 +1,258 @@
+# runtime/telemetry.py
+"""
+Progress, throughput and ETA of long runs, aggregated from the events of all workers.
+
+Workers (main2() and runtime/daemon.py, both with --events <dir>) append
+one JSON line per scene to their own event log in that directory, which
+costs a single small write per scene. The aggregator follows all event logs
+and rewrites a metrics file every few seconds:
+
+    python runtime/telemetry.py "/media/dawid/blensor data/jan20252/telemetry" \
+        --metrics /var/lib/node_exporter/sweep.prom --total 10000
+
+The metrics file uses the Prometheus text format, so it can be read by the
+node_exporter textfile collector, or simply with cat or watch.
+
+Events:
+    {"time": ..., "pid": ..., "type": "scene", "scene": n, "status": "ok" | "cached" | "failed",
+     "timings": {"generate": ..., "scan": ..., ...}, "bytes": ...}
+
+Throughput and latency percentiles are computed over the events of the
+last 'window_seconds', counters and the ETA over the whole run.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import socket
+import argparse
+import collections
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+
+config = SystemConfiguration()
+
+QUANTILES = (0.5, 0.95)
+
+
+def directory_bytes(dir):
+    """
+    Total size of the files directly in 'dir', e.g. the outputs of a scene.
+    """
+    return sum(entry.stat().st_size for entry in os.scandir(dir) if entry.is_file())
+
+
+def scene_event(n, status, timings=None, bytes_written=0):
+    return {"type": "scene", "scene": n, "status": status, "timings": dict(timings or {}), "bytes": int(bytes_written)}
+
+
+class EventLog:
+    """
+    Appends events of one worker to a JSON lines file.
+    """
+
+    def __init__(self, filepath: str):
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        self.filepath = filepath
+        self._file = open(filepath, "a", buffering=1)
+
+
+    def emit(self, event):
+        event = dict(event, time=time.time(), pid=os.getpid())
+        # A single write of a whole line, so a reader never sees half an event
+        self._file.write(json.dumps(event) + "\n")
+
+
+    def close(self):
+        self._file.close()
+
+
+def worker_event_log(dir: str):
+    """
+    Opens the event log of this process in the directory the aggregator follows.
+    """
+    return EventLog(os.path.join(dir, f"{socket.gethostname()}_{os.getpid()}.jsonl"))
+
+
+class EventTail:
+    """
+    Follows the event logs matching a glob pattern, returning only events that weren't read yet.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self._offsets = {}
+
+
+    def read(self):
+        events = []
+        for filepath in sorted(glob.glob(self.pattern)):
+            offset = self._offsets.get(filepath, 0)
+            with open(filepath, "rb") as file:
+                file.seek(offset)
+                data = file.read()
+            # A line that is still being written is read on the next call
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                if line.strip():
+                    events.append(json.loads(line))
+            self._offsets[filepath] = offset + end
+        return events
+
+
+class Telemetry:
+    """
+    Aggregates scene events into counters, rolling throughput, stage latency percentiles and an ETA.
+    """
+
+    def __init__(self, total: int = None, window_seconds: float = None):
+        if window_seconds is None:
+            window_seconds = config.get("telemetry_window_seconds", 3600)
+        if not window_seconds > 0:
+            raise ValueError(f"'window_seconds' {window_seconds} must be a positive number.")
+        self.total = total
+        self.window_seconds = window_seconds
+        self.counts = collections.Counter()
+        self.bytes_written = 0
+        self.first_time = None
+        self._window = collections.deque()
+
+
+    def add(self, event):
+        if event.get("type") != "scene":
+            return
+        self.counts[event["status"]] += 1
+        self.bytes_written += event.get("bytes", 0)
+        if self.first_time is None or event["time"] < self.first_time:
+            self.first_time = event["time"]
+        self._window.append(event)
+
+
+    @property
+    def done(self):
+        return self.counts["ok"] + self.counts["cached"]
+
+
+    def snapshot(self, now: float = None):
+        """
+        Returns:
+            dict: "scenes" (by status), "failures", "scenes_per_hour",
+                  "write_bytes_per_second", "stage_seconds" ({stage: {quantile: seconds}}),
+                  "progress" and "eta_seconds" (None without a total or throughput).
+        """
+        now = time.time() if now is None else now
+        while self._window and self._window[0]["time"] < now - self.window_seconds:
+            self._window.popleft()
+
+        # Over a run shorter than the window, the rates are taken over the run so far
+        span = min(self.window_seconds, now - self.first_time) if self.first_time is not None else 0.0
+        finished = [event for event in self._window if event["status"] != "failed"]
+        scenes_per_second = len(finished) / span if span > 0 else 0.0
+        write_rate = sum(event.get("bytes", 0) for event in self._window) / span if span > 0 else 0.0
+
+        stage_timings = collections.defaultdict(list)
+        for event in finished:
+            for stage, seconds in event.get("timings", {}).items():
+                stage_timings[stage].append(seconds)
+        stage_seconds = {
+            stage: {q: float(np.quantile(values, q)) for q in QUANTILES}
+            for stage, values in sorted(stage_timings.items())
+        }
+
+        progress = eta = None
+        if self.total:
+            progress = min(self.done / self.total, 1.0)
+            if scenes_per_second > 0:
+                eta = max(self.total - self.done, 0) / scenes_per_second
+        return {
+            "scenes": dict(self.counts),
+            "failures": self.counts["failed"],
+            "scenes_per_hour": scenes_per_second * 3600,
+            "write_bytes_per_second": write_rate,
+            "stage_seconds": stage_seconds,
+            "progress": progress,
+            "eta_seconds": eta,
+        }
+
+
+    def prometheus_text(self, now: float = None):
+        snapshot = self.snapshot(now)
+        lines = [
+            "# HELP sweep_scenes_total Scenes handled, by status.",
+            "# TYPE sweep_scenes_total counter",
+        ]
+        for status in ("ok", "cached", "failed"):
+            lines.append(f'sweep_scenes_total{{status="{status}"}} {self.counts[status]}')
+        lines += [
+            "# HELP sweep_written_bytes_total Bytes written to the scene directories.",
+            "# TYPE sweep_written_bytes_total counter",
+            f"sweep_written_bytes_total {self.bytes_written}",
+            "# HELP sweep_scenes_per_hour Rolling throughput.",
+            "# TYPE sweep_scenes_per_hour gauge",
+            f"sweep_scenes_per_hour {snapshot['scenes_per_hour']:.3f}",
+            "# HELP sweep_write_bytes_per_second Rolling disk write rate.",
+            "# TYPE sweep_write_bytes_per_second gauge",
+            f"sweep_write_bytes_per_second {snapshot['write_bytes_per_second']:.1f}",
+            "# HELP sweep_stage_seconds Rolling stage latency quantiles.",
+            "# TYPE sweep_stage_seconds summary",
+        ]
+        for stage, quantiles in snapshot["stage_seconds"].items():
+            for q, seconds in quantiles.items():
+                lines.append(f'sweep_stage_seconds{{stage="{stage}",quantile="{q}"}} {seconds:.4f}')
+        if snapshot["progress"] is not None:
+            lines += [
+                "# HELP sweep_progress_ratio Share of the scenes of the run that are done.",
+                "# TYPE sweep_progress_ratio gauge",
+                f"sweep_progress_ratio {snapshot['progress']:.5f}",
+            ]
+        if snapshot["eta_seconds"] is not None:
+            lines += [
+                "# HELP sweep_eta_seconds Estimated time until the run is done.",
+                "# TYPE sweep_eta_seconds gauge",
+                f"sweep_eta_seconds {snapshot['eta_seconds']:.0f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def write_metrics(filepath, text):
+    """
+    Replaces the metrics file atomically, so readers never see a partial file.
+    """
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, "w") as file:
+        file.write(text)
+    os.replace(tmp_filepath, filepath)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate worker events into a metrics file.")
+    parser.add_argument("events", help="Directory of the event logs, or a glob pattern matching them.")
+    parser.add_argument("--metrics", required=True, help="Metrics file to write.")
+    parser.add_argument("--total", type=int, default=None, help="Number of scenes of the run, for the ETA.")
+    parser.add_argument("--interval", type=float, default=config.get("telemetry_export_seconds", 5), help="Seconds between updates.")
+    parser.add_argument("--once", action="store_true", help="Write the metrics once and exit.")
+    args = parser.parse_args()
+
+    pattern = os.path.join(args.events, "*.jsonl") if os.path.isdir(args.events) else args.events
+    tail = EventTail(pattern)
+    telemetry = Telemetry(total=args.total)
+    while True:
+        # Workers write their own files, so new events are only ordered per worker
+        for event in sorted(tail.read(), key=lambda event: event["time"]):
+            telemetry.add(event)
+        write_metrics(args.metrics, telemetry.prometheus_text())
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# runtime/tests/test_cache.py
+
+import os
+import time
+import unittest
+import shutil
+import tempfile
+from unittest import mock
+from runtime import cache
+from runtime.cache import SceneCache, unlink_outputs
+
+
+class TestSceneCache(unittest.TestCase):
+
+    FILES = ["scene.blend", "scan1.evd"]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = SceneCache(os.path.join(self.tmpdir.name, "cache"), max_size_gb=1, version="v1")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_scene(self, name, size=10):
+        dir = os.path.join(self.tmpdir.name, name)
+        os.makedirs(dir)
+        for filename in self.FILES:
+            with open(os.path.join(dir, filename), "wb") as file:
+                file.write(name.encode("utf-8") * size)
+        return dir
+
+    def test_key_depends_on_spec_and_version(self):
+        spec = {"scene": 1, "seed": "2025-1"}
+        other_version = SceneCache(self.cache.root, max_size_gb=1, version="v2")
+        self.assertEqual(self.cache.key(spec), self.cache.key(dict(spec)))
+        self.assertNotEqual(self.cache.key(spec), self.cache.key({"scene": 1, "seed": "2025-2"}))
+        self.assertNotEqual(self.cache.key(spec), other_version.key(spec))
+
+    def test_lookup_links_stored_files(self):
+        key = self.cache.key({"scene": 1})
+        dir = os.path.join(self.tmpdir.name, "rerun")
+        self.assertFalse(self.cache.lookup(key, dir, self.FILES))
+
+        self.cache.store(key, self.write_scene("a"), self.FILES)
+        self.assertTrue(self.cache.lookup(key, dir, self.FILES))
+        with open(os.path.join(dir, "scan1.evd"), "rb") as file:
+            self.assertEqual(file.read(), b"a" * 10)
+        self.assertGreater(os.stat(os.path.join(dir, "scan1.evd")).st_nlink, 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        keys = [self.cache.key({"scene": n}) for n in range(3)]
+        for key, name in zip(keys, "abc"):
+            self.cache.store(key, self.write_scene(name), self.FILES)
+            time.sleep(0.01)
+        self.cache.lookup(keys[0], os.path.join(self.tmpdir.name, "hit"), self.FILES)
+
+        # Room for two entries of 2 x 10 bytes
+        self.cache.max_bytes = 40
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertTrue(os.path.isdir(self.cache.entry_path(keys[0])))
+        self.assertFalse(os.path.isdir(self.cache.entry_path(keys[1])))
+        self.assertTrue(os.path.isdir(self.cache.entry_path(keys[2])))
+
+    def test_regenerating_a_linked_scene_keeps_the_cache(self):
+        key = self.cache.key({"scene": 1})
+        self.cache.store(key, self.write_scene("a"), self.FILES)
+        dir = os.path.join(self.tmpdir.name, "rerun")
+        self.cache.lookup(key, dir, self.FILES)
+
+        unlink_outputs(dir, self.FILES)
+        with open(os.path.join(dir, "scan1.evd"), "wb") as file:
+            file.write(b"new")
+        with open(os.path.join(self.cache.entry_path(key), "scan1.evd"), "rb") as file:
+            self.assertEqual(file.read(), b"a" * 10)
+
+    def test_size_is_kept_as_a_running_total(self):
+        self.cache.store(self.cache.key({"scene": 0}), self.write_scene("a"), self.FILES)
+        self.assertEqual(self.cache.total_bytes, 20)
+        self.cache.store(self.cache.key({"scene": 1}), self.write_scene("b"), self.FILES)
+        self.assertEqual(self.cache.total_bytes, 40)
+
+        self.cache.max_bytes = 30
+        self.cache.store(self.cache.key({"scene": 2}), self.write_scene("c"), self.FILES)
+        self.assertEqual(self.cache.total_bytes, 20)
+        self.assertFalse(os.path.isdir(self.cache.entry_path(self.cache.key({"scene": 0}))))
+
+    def test_entry_evicted_during_lookup_is_a_miss(self):
+        key = self.cache.key({"scene": 1})
+        self.cache.store(key, self.write_scene("a"), self.FILES)
+        with mock.patch.object(cache, "_link_or_copy", side_effect=FileNotFoundError):
+            self.assertFalse(self.cache.lookup(key, os.path.join(self.tmpdir.name, "rerun"), self.FILES))
+
+    def test_entry_evicted_during_evict_is_skipped(self):
+        keys = [self.cache.key({"scene": n}) for n in range(2)]
+        for key, name in zip(keys, "ab"):
+            self.cache.store(key, self.write_scene(name), self.FILES)
+        listdir = os.listdir
+
+        def evicted_by_another_worker(path):
+            if path == self.cache.entry_path(keys[0]):
+                shutil.rmtree(path)
+            return listdir(path)
+
+        with mock.patch.object(cache.os, "listdir", side_effect=evicted_by_another_worker):
+            self.assertEqual(self.cache.evict(), 0)
+        self.assertEqual(self.cache.total_bytes, 20)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,70 @@
+# runtime/tests/test_leases.py
+
+import os
+import time
+import unittest
+import tempfile
+from runtime.leases import LeaseCoordinator
+
+
+class TestLeaseCoordinator(unittest.TestCase):
+
+    BATCHES = [(0, 10), (10, 20)]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.node_1 = LeaseCoordinator(self.tmpdir.name, worker_id="node-1", lease_timeout=60, heartbeat_interval=1)
+        self.node_2 = LeaseCoordinator(self.tmpdir.name, worker_id="node-2", lease_timeout=60, heartbeat_interval=1)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_first_plan_wins(self):
+        self.assertEqual(self.node_1.create_plan(self.BATCHES), self.BATCHES)
+        self.assertEqual(self.node_2.create_plan([(0, 20)]), self.BATCHES)
+
+    def test_batches_are_claimed_once(self):
+        lease_1 = self.node_1.claim(self.BATCHES)
+        lease_2 = self.node_2.claim(self.BATCHES)
+        self.assertEqual((lease_1.start, lease_2.start), (0, 10))
+        self.assertIsNone(self.node_2.claim(self.BATCHES))
+
+    def test_done_batches_are_skipped(self):
+        self.node_1.complete(self.node_1.claim(self.BATCHES))
+        self.node_1.release(self.node_1.claim(self.BATCHES))
+        self.assertEqual(self.node_2.claim(self.BATCHES).start, 10)
+        self.assertIsNone(self.node_1.claim(self.BATCHES))
+
+    def test_expired_lease_is_reclaimed(self):
+        lease = self.node_1.claim(self.BATCHES[:1])
+        self.assertIsNone(self.node_2.claim(self.BATCHES[:1]))
+
+        old = time.time() - 3600
+        os.utime(lease.filepath, (old, old))
+        reclaimed = self.node_2.claim(self.BATCHES[:1])
+        self.assertEqual(reclaimed.start, 0)
+        self.assertTrue(self.node_2.owns(reclaimed))
+        self.assertFalse(self.node_1.heartbeat(lease))
+
+    def test_remaining_batches(self):
+        lease = self.node_1.claim(self.BATCHES)
+        self.assertIsNone(self.node_2.claim(self.BATCHES[:1]))
+        # A batch held by a live worker is still remaining, it may expire
+        self.assertEqual(self.node_2.remaining(self.BATCHES), self.BATCHES)
+        self.node_1.complete(lease)
+        self.assertEqual(self.node_2.remaining(self.BATCHES), [(10, 20)])
+        self.assertEqual(self.node_2.remaining(self.BATCHES, skip={(10, 20)}), [])
+
+    def test_lost_lease_is_signalled(self):
+        node = LeaseCoordinator(self.tmpdir.name, worker_id="node-3", lease_timeout=1, heartbeat_interval=0.05)
+        lease = node.claim(self.BATCHES[:1])
+        stop, lost = node.keep_alive(lease)
+        try:
+            os.remove(lease.filepath)
+            self.assertTrue(lost.wait(2))
+        finally:
+            stop.set()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,73 @@
+# runtime/tests/test_planner.py
+
+import os
+import json
+import unittest
+import tempfile
+import numpy as np
+from scanner import evd
+from runtime.sweep import SweepDefinition
+from runtime.scheduler import CostModel
+from runtime.planner import CapacityModel, makespan, output_kind, read_sample
+
+
+def write_sample(root, scenes, points_per_scan):
+    os.makedirs(os.path.join(root, "events"))
+    with open(os.path.join(root, "events", "host_1.jsonl"), "w") as events:
+        for n, points in zip(scenes, points_per_scan):
+            scene_dir = os.path.join(root, f"scanning{n}")
+            os.makedirs(scene_dir)
+            for i in range(1, 4):
+                evd.write_evd(os.path.join(scene_dir, f"scan{i}.evd"), np.zeros(points, dtype=evd.EVD_DTYPE))
+            with open(os.path.join(scene_dir, f"test_{n}.txt"), "w") as file:
+                file.write("x" * 500)
+            if n == scenes[0]:
+                with open(os.path.join(scene_dir, "scene.blend"), "wb") as file:
+                    file.write(b"BLENDER" + b"\0" * 10000)
+            event = {"time": n, "pid": 1, "type": "scene", "scene": n, "status": "ok",
+                     "timings": {"generate": 1.0, "scan": 10.0 + n / 100}, "bytes": 0}
+            events.write(json.dumps(event) + "\n")
+
+
+class TestPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+        self.sweep = SweepDefinition(count=1000, frame_end=100)
+        write_sample(self.root, [0, 250, 500, 750, 999], [1000, 1100, 900, 1000, 1000])
+        self.samples = read_sample(self.root, os.path.join(self.root, "events"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_output_kinds(self):
+        self.assertEqual(output_kind("scan2.range.npz"), "scan.range.npz")
+        self.assertEqual(output_kind("test_17.txt"), "test_n.txt")
+        self.assertEqual(output_kind("scene.json"), "scene.json")
+
+    def test_sample_is_measured(self):
+        self.assertEqual(sorted(self.samples), [0, 250, 500, 750, 999])
+        self.assertEqual(self.samples[250]["points"], 3300)
+        self.assertAlmostEqual(self.samples[250]["seconds"], 13.5)
+
+    def test_prediction(self):
+        model = CapacityModel(CostModel(ridge=1e-6)).fit(self.sweep, self.samples)
+        prediction = model.predict(self.sweep, workers=(1, 4), batch_size=10, blend_save_interval=100)
+        self.assertAlmostEqual(prediction["points_per_scene"], 3000)
+        self.assertAlmostEqual(prediction["bytes"]["scan.evd"], 3000 * 1000 * evd.EVD_DTYPE.itemsize, delta=1e5)
+        self.assertAlmostEqual(prediction["bytes"]["test_n.txt"], 500 * 1000)
+        self.assertAlmostEqual(prediction["bytes"]["scene.blend"], 10 * 10007)
+        # About 11 to 21 seconds per scene
+        self.assertAlmostEqual(prediction["cpu_seconds"], 1000 * 16, delta=1000)
+        self.assertLess(prediction["wall_seconds"][4], prediction["wall_seconds"][1] / 3.5)
+
+    def test_makespan(self):
+        # Longest first, as the scheduler does, not the optimum of 9
+        self.assertEqual(makespan([5, 4, 3, 3, 3], 2), 10)
+        self.assertEqual(makespan([5, 4, 3], 1), 12)
+        self.assertEqual(makespan([5, 1], 4), 5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
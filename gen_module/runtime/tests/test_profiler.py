@@ -0,0 +1,71 @@
+# runtime/tests/test_profiler.py
+
+import os
+import time
+import unittest
+import tempfile
+from runtime.profiler import SamplingProfiler, merge_collapsed, read_collapsed, write_collapsed
+
+
+def busy(seconds):
+    end_time = time.perf_counter() + seconds
+    while time.perf_counter() < end_time:
+        pass
+
+
+def sleepy(seconds):
+    # Stands in for a long call into Blender, which blocks the sampler
+    time.sleep(seconds)
+
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_samples_are_tagged_with_the_stage(self):
+        profiler = SamplingProfiler(self.dir, interval=0.002, scene_interval=2)
+        try:
+            profiler.begin_scene(0)
+            profiler.stage = "generate"
+            busy(0.2)
+            profiler.stage = "scan"
+            sleepy(0.3)
+            profiler.stage = None
+            profiler.begin_scene(1)
+            busy(0.2)
+            profiler.end_scene()
+        finally:
+            profiler.close()
+
+        counts = read_collapsed(profiler.filepath)
+        by_stage = {}
+        for stack, ms in counts.items():
+            by_stage[stack.split(";")[0]] = by_stage.get(stack.split(";")[0], 0) + ms
+        # Scene 1 isn't profiled
+        self.assertEqual(set(by_stage), {"generate", "scan"})
+        self.assertAlmostEqual(by_stage["generate"], 200, delta=60)
+        self.assertAlmostEqual(by_stage["scan"], 300, delta=60)
+        self.assertTrue(any(stack.startswith("scan;") and stack.endswith("test_profiler.py:sleepy") for stack in counts))
+        self.assertTrue(any("test_profiler.py:test_samples_are_tagged_with_the_stage;" in stack for stack in counts))
+
+    def test_merge(self):
+        first, second = os.path.join(self.dir, "a.collapsed"), os.path.join(self.dir, "b.collapsed")
+        write_collapsed(first, {"scan;main.py:main2;ops.py:__call__": 10, "generate;main.py:main2": 5})
+        write_collapsed(second, {"scan;main.py:main2;ops.py:__call__": 7, "qa;main.py:main2": 1})
+        self.assertEqual(merge_collapsed([first, second]), {
+            "scan;main.py:main2;ops.py:__call__": 17, "generate;main.py:main2": 5, "qa;main.py:main2": 1,
+        })
+        self.assertEqual(merge_collapsed([first, second], stage="scan"), {"scan;main.py:main2;ops.py:__call__": 17})
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            SamplingProfiler(self.dir, interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
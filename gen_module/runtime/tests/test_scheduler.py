@@ -0,0 +1,65 @@
+# runtime/tests/test_scheduler.py
+
+import os
+import unittest
+import tempfile
+import threading
+import numpy as np
+from runtime.sweep import SweepDefinition
+from runtime.scheduler import Job, CostModel, JobScheduler, sweep_jobs
+
+
+class TestCostModel(unittest.TestCase):
+
+    def test_refit_converges_to_measured_costs(self):
+        true_coefficients = np.array([5.0, 0.0, 0.1, 0.5])
+        model = CostModel(prior=[1.0, 0.0, 0.0, 0.0], ridge=1e-3)
+        random_state = np.random.RandomState(0)
+        for _ in range(50):
+            features = np.array([1, 0, 600, 600 * random_state.uniform(0, 2.5)])
+            model.observe(Job(0, 1, features), float(features @ true_coefficients))
+
+        job = Job(0, 1, [1, 0, 600, 600 * 1.7])
+        self.assertAlmostEqual(model.estimate(job), float(job.features @ true_coefficients), delta=1.0)
+
+    def test_save_and_load(self):
+        model = CostModel()
+        model.observe(Job(0, 1, [1, 10, 600, 300]), 42.0)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "timings.json")
+            model.save(path)
+            np.testing.assert_allclose(CostModel.load(path).coefficients, model.coefficients)
+
+
+class TestJobScheduler(unittest.TestCase):
+
+    def test_longest_job_first(self):
+        sweep = SweepDefinition(count=100)
+        jobs = sweep_jobs(sweep, 0, 100, batch_size=10)
+        self.assertEqual([(job.start, job.end) for job in jobs][-1], (90, 100))
+
+        started = []
+        lock = threading.Lock()
+
+        def run_job(job):
+            with lock:
+                started.append(job.start)
+
+        failed = JobScheduler(jobs, workers=1).run(run_job)
+        self.assertEqual(failed, [])
+        # Scenes get larger over the sweep, so later batches are estimated to take longer
+        self.assertEqual(started, list(range(90, -1, -10)))
+
+    def test_failed_jobs_are_reported(self):
+        jobs = [Job(i, i + 1, [1, 0, 0, 0]) for i in range(4)]
+
+        def run_job(job):
+            if job.start == 2:
+                raise RuntimeError("worker crashed")
+
+        failed = JobScheduler(jobs, workers=2).run(run_job)
+        self.assertEqual([job.start for job in failed], [2])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
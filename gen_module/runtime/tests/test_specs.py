@@ -0,0 +1,82 @@
+# runtime/tests/test_specs.py
+
+import os
+import json
+import random
+import unittest
+import tempfile
+import numpy as np
+from scene_generator.scene_generator_params import SceneGeneratorParams, PrimitiveObjects
+from scene_generator.placement import PlacementEngine
+from runtime.specs import write_scene_spec, read_scene_spec, scene_spec_filepath, split_clutter
+
+
+class TestSceneSpecs(unittest.TestCase):
+
+    CAMERA = {"name": "Camera", "location": [0.1, -0.2, 0.30000001192092896],
+              "frame_start": 0, "frame_end": 200, "min_angle": 0, "max_angle": 180}
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filepath = scene_spec_filepath(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def object_params(self, count=8):
+        scene_params = SceneGeneratorParams(
+            scene_size=2.5,
+            objects_to_generate={PrimitiveObjects.BOX, PrimitiveObjects.CYLINDER, PrimitiveObjects.CONE},
+            object_count_range=(count, count),
+            object_size_range=(0.5, 1.5),
+            object_height_distribution=(0, 1.25),
+            allow_overlap=False
+        )
+        return PlacementEngine(scene_params, rng=random.Random(0)).place_objects()
+
+    def test_round_trip_is_exact(self):
+        object_params = self.object_params()
+        write_scene_spec(self.filepath, 42, "2025-42", object_params, self.CAMERA)
+        spec = read_scene_spec(self.filepath)
+        self.assertEqual(spec["scene"], 42)
+        self.assertEqual(spec["seed"], "2025-42")
+        self.assertEqual(spec["objects"], json.loads(json.dumps(object_params)))
+        self.assertEqual(spec["camera"], self.CAMERA)
+        self.assertNotIn("clutter_params", spec)
+
+    def test_scan_locations(self):
+        scan_locations = {"scan1.evd": [0.5, -0.25, np.float32(1.5)], "scan2.evd": [0.0, 0.0, 0.1]}
+        write_scene_spec(self.filepath, 42, "2025-42", self.object_params(3), self.CAMERA, scan_locations=scan_locations)
+        self.assertEqual(read_scene_spec(self.filepath)["scan_locations"], {"scan1.evd": [0.5, -0.25, 1.5], "scan2.evd": [0.0, 0.0, 0.1]})
+
+    def test_spec_is_compact(self):
+        write_scene_spec(self.filepath, 42, "2025-42", self.object_params(8), self.CAMERA)
+        self.assertLess(os.path.getsize(self.filepath), 2500)
+
+    def test_numpy_values_are_written_as_numbers(self):
+        params = {"type": "box", "location": np.array([0.5, 1.0, 2.0]).tolist(), "rotation": (np.float64(0.25), 0, 0), "size": [np.float32(1.5)] * 3}
+        write_scene_spec(self.filepath, 0, None, [params], self.CAMERA)
+        objects = read_scene_spec(self.filepath)["objects"]
+        self.assertEqual(objects[0]["rotation"], [0.25, 0, 0])
+        self.assertEqual(objects[0]["size"], [1.5] * 3)
+
+    def test_split_clutter(self):
+        object_params = self.object_params(3)
+        clutter = [dict(params, clutter=True) for params in self.object_params(2)]
+        clutter_params = {"objects_to_generate": ["BOX"], "object_count_range": [2, 2], "object_size_range": [0.1, 0.2], "allow_overlap": True, "vertices": 8}
+        write_scene_spec(self.filepath, 1, "2025-1", object_params + clutter, self.CAMERA, clutter_params)
+        spec = read_scene_spec(self.filepath)
+        objects, clutter_objects = split_clutter(spec["objects"])
+        self.assertEqual(len(objects), 3)
+        self.assertEqual(len(clutter_objects), 2)
+        self.assertEqual(spec["clutter_params"], clutter_params)
+
+    def test_unknown_version_is_rejected(self):
+        with open(self.filepath, "w") as file:
+            json.dump({"version": 99}, file)
+        with self.assertRaises(ValueError):
+            read_scene_spec(self.filepath)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,82 @@
+# runtime/tests/test_supervisor.py
+
+import os
+import sys
+import time
+import stat
+import unittest
+import tempfile
+import threading
+from runtime.supervisor import run_worker, supervise
+from runtime.utils import RECYCLE_EXIT_CODE, read_checkpoint, write_checkpoint
+
+# Stands in for Blender: logs its arguments after '--', then exits with the
+# recycle code 'recycles' times, sleeps if asked to, and exits with 'exit_code'
+STUB = f"""#!{sys.executable}
+import sys, time
+log, recycles, exit_code, sleep = sys.argv[sys.argv.index("--") + 1:]
+with open(log, "a") as file:
+    file.write(" ".join(sys.argv[1:]) + "\\n")
+with open(log) as file:
+    runs = len(file.readlines())
+time.sleep(float(sleep))
+sys.exit({RECYCLE_EXIT_CODE} if runs <= int(recycles) else int(exit_code))
+"""
+
+
+class TestSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.blender = os.path.join(self.tmpdir.name, "blender")
+        with open(self.blender, "w") as file:
+            file.write(STUB)
+        os.chmod(self.blender, os.stat(self.blender).st_mode | stat.S_IEXEC)
+        self.log = os.path.join(self.tmpdir.name, "runs.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def runs(self):
+        with open(self.log) as file:
+            return file.read().splitlines()
+
+    def test_run_worker(self):
+        exit_code = run_worker(self.blender, "base.blend", "main.py", [self.log, "0", "3", "0"])
+        self.assertEqual(exit_code, 3)
+        self.assertEqual(self.runs(), [f"-b base.blend -P main.py -- {self.log} 0 3 0"])
+
+    def test_recycled_workers_are_restarted(self):
+        self.assertEqual(supervise(self.blender, "", "main.py", [self.log, "2", "0", "0"]), 0)
+        self.assertEqual(len(self.runs()), 3)
+
+    def test_other_exit_codes_end_the_loop(self):
+        self.assertEqual(supervise(self.blender, "", "main.py", [self.log, "0", "1", "0"]), 1)
+        self.assertEqual(len(self.runs()), 1)
+
+    def test_restarts_are_limited(self):
+        self.assertEqual(supervise(self.blender, "", "main.py", [self.log, "100", "0", "0"], max_restarts=2), RECYCLE_EXIT_CODE)
+        self.assertEqual(len(self.runs()), 3)
+
+    def test_stop_terminates_the_worker(self):
+        stop = threading.Event()
+        threading.Timer(0.5, stop.set).start()
+        start_time = time.time()
+        exit_code = supervise(self.blender, "", "main.py", [self.log, "100", "0", "60"], stop=stop)
+        self.assertNotEqual(exit_code, 0)
+        self.assertLess(time.time() - start_time, 10)
+        self.assertEqual(len(self.runs()), 1)
+
+    def test_checkpoint(self):
+        filepath = os.path.join(self.tmpdir.name, "checkpoint.txt")
+        self.assertIsNone(read_checkpoint(filepath))
+        self.assertEqual(read_checkpoint(filepath, default=7), 7)
+        self.assertIsNone(read_checkpoint(None))
+        write_checkpoint(filepath, 42)
+        write_checkpoint(filepath, 43)
+        self.assertEqual(read_checkpoint(filepath), 43)
+        self.assertFalse(os.path.exists(f"{filepath}.tmp"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
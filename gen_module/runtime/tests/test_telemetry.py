@@ -0,0 +1,72 @@
+# runtime/tests/test_telemetry.py
+
+import os
+import unittest
+import tempfile
+from runtime.telemetry import EventLog, EventTail, Telemetry, scene_event, write_metrics
+
+
+def event(n, time, status="ok", scan=1.0, bytes_written=1000):
+    return dict(scene_event(n, status, {"generate": 0.1, "scan": scan}, bytes_written), time=time, pid=1)
+
+
+class TestTelemetry(unittest.TestCase):
+
+    def test_throughput_latency_and_eta(self):
+        telemetry = Telemetry(total=100, window_seconds=3600)
+        for n in range(20):
+            telemetry.add(event(n, 1000 + 36 * n, scan=float(n)))
+        telemetry.add(event(20, 1000 + 36 * 20, status="failed"))
+        snapshot = telemetry.snapshot(now=1000 + 36 * 20)
+        self.assertEqual(snapshot["scenes"], {"ok": 20, "failed": 1})
+        self.assertEqual(snapshot["failures"], 1)
+        self.assertAlmostEqual(snapshot["scenes_per_hour"], 20 / 720 * 3600)
+        self.assertAlmostEqual(snapshot["stage_seconds"]["scan"][0.5], 9.5)
+        self.assertAlmostEqual(snapshot["stage_seconds"]["scan"][0.95], 18.05)
+        self.assertAlmostEqual(snapshot["progress"], 0.2)
+        self.assertAlmostEqual(snapshot["eta_seconds"], 80 / (20 / 720))
+
+    def test_window_drops_old_events(self):
+        telemetry = Telemetry(total=10, window_seconds=100)
+        telemetry.add(event(0, 0, scan=100.0))
+        for n in range(1, 5):
+            telemetry.add(event(n, 1000 + n))
+        snapshot = telemetry.snapshot(now=1010)
+        self.assertEqual(snapshot["stage_seconds"]["scan"][0.95], 1.0)
+        self.assertAlmostEqual(snapshot["scenes_per_hour"], 4 / 100 * 3600)
+        # Counters keep the whole run
+        self.assertEqual(snapshot["scenes"]["ok"], 5)
+
+    def test_metrics_text(self):
+        telemetry = Telemetry(total=10)
+        telemetry.add(event(0, 100))
+        telemetry.add(event(1, 110, status="cached"))
+        text = telemetry.prometheus_text(now=120)
+        self.assertIn('sweep_scenes_total{status="cached"} 1', text)
+        self.assertIn('sweep_stage_seconds{stage="scan",quantile="0.95"}', text)
+        self.assertIn("sweep_eta_seconds", text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_tail_reads_only_new_complete_lines(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logs = [EventLog(os.path.join(tmpdir, f"worker{i}.jsonl")) for i in range(2)]
+            tail = EventTail(os.path.join(tmpdir, "*.jsonl"))
+            logs[0].emit(scene_event(0, "ok"))
+            logs[1].emit(scene_event(1, "ok"))
+            self.assertEqual(sorted(e["scene"] for e in tail.read()), [0, 1])
+            with open(logs[0].filepath, "a") as file:
+                file.write('{"type": "scene", "sce')
+            self.assertEqual(tail.read(), [])
+            with open(logs[0].filepath, "a") as file:
+                file.write('ne": 2, "status": "ok", "time": 1}\n')
+            self.assertEqual([e["scene"] for e in tail.read()], [2])
+            for log in logs:
+                log.close()
+
+            metrics_filepath = os.path.join(tmpdir, "sweep.prom")
+            write_metrics(metrics_filepath, "sweep_scenes_per_hour 1\n")
+            self.assertEqual(os.listdir(tmpdir).count("sweep.prom.tmp"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
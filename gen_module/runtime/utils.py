@@ -1 +1,36 @@
-# runtime/utils.py
\ No newline at end of file
+# runtime/utils.py
+
+import os
+
+# Exit code used by a Blender worker to ask the supervisor for a restart
+RECYCLE_EXIT_CODE = 75
+
+
+def write_checkpoint(filepath, next_index):
+    """
+    Stores the index of the next scene to generate.
+
+    The file is written next to the target and then renamed over it, so a
+    worker that gets killed while writing never leaves a broken checkpoint.
+
+    Parameters:
+        filepath (str): Path of the checkpoint file.
+        next_index (int): Index of the first scene that has not been completed.
+    """
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, "w") as file:
+        file.write(f"{next_index}\n")
+    os.replace(tmp_filepath, filepath)
+
+
+def read_checkpoint(filepath, default=None):
+    """
+    Reads the index stored by write_checkpoint().
+
+    Returns:
+        int: The stored index, or 'default' if there is no checkpoint yet.
+    """
+    if filepath is None or not os.path.exists(filepath):
+        return default
+    with open(filepath, "r") as file:
+        return int(file.read().strip())
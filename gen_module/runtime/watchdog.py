@@ -0,0 +1,117 @@
+# runtime/watchdog.py
+
+import os
+import time
+import resource
+import bpy
+from system_parameters import SystemConfiguration
+
+config = SystemConfiguration()
+
+
+def get_rss_mb():
+    """
+    Returns the current resident set size of this process in megabytes.
+
+    Reads /proc/self/statm where available. Elsewhere the peak RSS reported by
+    getrusage() is used, which still shows steady growth over a long run.
+    """
+    try:
+        with open("/proc/self/statm", "r") as file:
+            resident_pages = int(file.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is given in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def count_datablocks(collections):
+    """
+    Returns the number of datablocks in each of the given bpy.data collections.
+    """
+    return {name: len(getattr(bpy.data, name)) for name in collections}
+
+
+class MemoryWatchdog:
+    """
+    Samples the memory usage and the bpy.data collection sizes after every
+    scene and reports their growth since the first sample.
+
+    Once the growth crosses one of the thresholds, should_recycle() returns
+    True, and the driver is expected to write a checkpoint and exit with
+    RECYCLE_EXIT_CODE, so that runtime/supervisor.py can start a fresh
+    Blender worker that continues from the checkpoint.
+    """
+
+    COLLECTIONS = ("objects", "meshes", "materials", "actions", "cameras", "images")
+
+
+    def __init__(self, log_filepath: str = None, max_rss_growth_mb: float = None, max_datablock_growth: int = None):
+        if max_rss_growth_mb is None:
+            max_rss_growth_mb = config.get("watchdog_max_rss_growth_mb", 2048)
+        if max_datablock_growth is None:
+            max_datablock_growth = config.get("watchdog_max_datablock_growth", 10000)
+        self.log_filepath = log_filepath
+        self.max_rss_growth_mb = max_rss_growth_mb
+        self.max_datablock_growth = max_datablock_growth
+        self._baseline = None
+        self._last = None
+        self._last_time = None
+
+
+    def sample(self, scene_index: int):
+        """
+        Takes a sample and appends it to the log file, if one is given.
+
+        Returns:
+            dict: RSS in megabytes, the datablock counts, the seconds since the
+                  previous sample and the growth of each value since the first sample.
+        """
+        now = time.time()
+        current = {"rss_mb": get_rss_mb()}
+        current.update(count_datablocks(self.COLLECTIONS))
+        if self._baseline is None:
+            self._baseline = current
+
+        growth = {key: current[key] - self._baseline[key] for key in current}
+        scene_seconds = now - self._last_time if self._last_time is not None else 0.0
+        self._last = {
+            "scene": scene_index,
+            "scene_seconds": scene_seconds,
+            "values": current,
+            "growth": growth,
+        }
+        self._last_time = now
+
+        if self.log_filepath is not None:
+            self._write_log_row(self._last)
+        return self._last
+
+
+    def should_recycle(self):
+        """
+        Returns True if the last sample crossed one of the growth thresholds.
+        """
+        if self._last is None:
+            return False
+        growth = self._last["growth"]
+        if growth["rss_mb"] > self.max_rss_growth_mb:
+            print(f"Watchdog: RSS grew by {growth['rss_mb']:.1f} MB, recycling worker")
+            return True
+        datablock_growth = sum(growth[name] for name in self.COLLECTIONS)
+        if datablock_growth > self.max_datablock_growth:
+            print(f"Watchdog: {datablock_growth} new datablocks, recycling worker")
+            return True
+        return False
+
+
+    def _write_log_row(self, sample):
+        columns = ["rss_mb"] + list(self.COLLECTIONS)
+        is_new = not os.path.exists(self.log_filepath)
+        with open(self.log_filepath, "a") as file:
+            if is_new:
+                file.write(",".join(["scene", "scene_seconds"] + columns + [f"{c}_growth" for c in columns]) + "\n")
+            row = [str(sample["scene"]), f"{sample['scene_seconds']:.3f}"]
+            row += [f"{sample['values'][c]:.1f}" if c == "rss_mb" else str(sample["values"][c]) for c in columns]
+            row += [f"{sample['growth'][c]:.1f}" if c == "rss_mb" else str(sample["growth"][c]) for c in columns]
+            file.write(",".join(row) + "\n")
@@ -0,0 +1,180 @@
+# scanner/density.py
+"""
+Chooses the frame count and angular resolution of a scan from a target point density.
+
+Model of a BlenSor VLP-16 scan:
+    - 16 lasers spin around the scanner's axis at 'rotation_speed' Hz, one
+      ray per laser every 'angle_resolution' degrees of azimuth, and every
+      frame lasts 'frame_time' seconds, so a frame casts
+      16 * 360 * rotation_speed * frame_time / angle_resolution rays.
+    - keyframe_setup() tilts the scanner from min_angle to max_angle over the
+      frame range, which spreads the rays over the swept solid angle. At
+      180 degrees of tilt plus the 30 degree field of view of the lasers that
+      is the whole sphere.
+    - Surfaces at distance d from the scanner get rays / (solid angle * d^2)
+      points per square metre. d is the mean distance to the AABB centers.
+    - The share of rays that return a point is the solid angle of the
+      bounding spheres of the AABBs over the swept solid angle.
+
+The model is rough, but it scales the right way with scene_size and camera
+distance, which is what keeps the point counts of a size sweep in a band.
+"""
+
+import math
+import numpy as np
+
+from system_parameters import SystemConfiguration
+
+config = SystemConfiguration()
+
+LASERS = 16
+VERTICAL_FOV = 30.0         # degrees, -15 to +15
+ROTATION_SPEED = 5.0        # Hz, as passed to BlenSor by scan_range()
+FRAME_TIME = 1.0 / 24.0     # seconds, BlenSor's default
+
+
+def rays_per_frame(angle_resolution, rotation_speed=ROTATION_SPEED, frame_time=FRAME_TIME):
+    return LASERS * 360.0 * rotation_speed * frame_time / angle_resolution
+
+
+def swept_solid_angle(min_angle, max_angle):
+    """
+    Approximate solid angle in steradians the rays are spread over, when the scanner is tilted from min_angle to max_angle.
+    """
+    return 4 * math.pi * min(1.0, (max_angle - min_angle + VERTICAL_FOV) / 180.0)
+
+
+def mean_distance(location, aabbs):
+    """
+    Mean distance from the scanner to the centers of the AABBs.
+    """
+    centers = np.array([(np.asarray(low) + np.asarray(high)) / 2.0 for low, high in aabbs], dtype=np.float64)
+    return float(np.linalg.norm(centers - np.asarray(location, dtype=np.float64), axis=1).mean())
+
+
+def hit_fraction(location, aabbs, solid_angle):
+    """
+    Share of the rays that hit an object, from the solid angles of the bounding spheres of the AABBs.
+    """
+    covered = 0.0
+    for low, high in aabbs:
+        low, high = np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64)
+        radius = float(np.linalg.norm(high - low)) / 2.0
+        distance = float(np.linalg.norm((low + high) / 2.0 - np.asarray(location, dtype=np.float64)))
+        if distance <= radius:
+            # Every ray from inside the sphere hits it
+            covered += 4 * math.pi
+        else:
+            covered += 2 * math.pi * (1 - math.sqrt(1 - (radius / distance) ** 2))
+    return min(covered, solid_angle) / solid_angle
+
+
+class ScanPlan:
+    """
+    The frame range and angular resolution chosen for a scan, with the expectations they were chosen by.
+    """
+
+    def __init__(self, frame_start, frame_end, angle_resolution, rays, expected_points, expected_seconds, distance, target_density):
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.angle_resolution = angle_resolution
+        self.rays = rays
+        self.expected_points = expected_points
+        self.expected_seconds = expected_seconds
+        self.distance = distance
+        self.target_density = target_density
+
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+    def __repr__(self):
+        return f"ScanPlan(frames {self.frame_start}-{self.frame_end}, {self.angle_resolution:.3f} deg, {self.expected_points:.0f} points)"
+
+
+def plan_scan(
+        location,
+        aabbs,
+        target_density: float,
+        min_angle: float,
+        max_angle: float,
+        frame_start: int = 0,
+        time_budget: float = None,
+        seconds_per_ray: float = None,
+        point_band=None,
+        frame_range=None,
+        angle_resolution_range=None
+):
+    """
+    Chooses the frames and angular resolution of a scan.
+
+    The ray count follows from the target density at the mean object distance,
+    and is then clamped so the expected point count stays within 'point_band'
+    and the expected scan time within 'time_budget'. The finest angular
+    resolution is kept and the frame count adapted, until the frame count
+    reaches the bounds of 'frame_range'. Below it the resolution is coarsened,
+    and if even the coarsest resolution would exceed the band or the budget,
+    the frame count goes below 'frame_range' instead.
+
+    Parameters:
+        location (sequence): Location of the scanner.
+        aabbs (list): AABBs of the objects in the scene.
+        target_density (float): Points per square metre of object surface.
+        time_budget (float or None): Seconds a scan may take.
+
+    Returns:
+        ScanPlan: The chosen frame range and resolution.
+    """
+    if seconds_per_ray is None:
+        seconds_per_ray = config.get("scan_seconds_per_ray", 4e-6)
+    if point_band is None:
+        point_band = config.get("scan_point_band", [100000, 1000000])
+    if frame_range is None:
+        frame_range = config.get("scan_frame_range", [24, 2000])
+    if angle_resolution_range is None:
+        angle_resolution_range = config.get("scan_angle_resolution_range", [0.1, 0.4])
+    if not target_density > 0:
+        raise ValueError(f"'target_density' {target_density} must be a positive number.")
+    if not aabbs:
+        raise ValueError("A scan can't be planned for a scene without objects.")
+
+    solid_angle = swept_solid_angle(min_angle, max_angle)
+    distance = mean_distance(location, aabbs)
+    hits = hit_fraction(location, aabbs, solid_angle)
+
+    rays = target_density * distance ** 2 * solid_angle
+    # Most rays the point band and the time budget allow
+    limit = point_band[1] / hits if hits > 0 else math.inf
+    if time_budget is not None:
+        limit = min(limit, time_budget / seconds_per_ray)
+    if hits > 0:
+        rays = max(rays, point_band[0] / hits)
+    rays = min(rays, limit)
+
+    finest, coarsest = angle_resolution_range
+    min_frames, max_frames = frame_range
+    # Rounded down, so neither the point band nor the time budget is exceeded
+    frames = int(rays // rays_per_frame(finest))
+    angle_resolution = finest
+    if frames < min_frames:
+        frames = min_frames
+        angle_resolution = min(max(rays_per_frame(1.0) * frames / max(rays, 1.0), finest), coarsest)
+    frames = min(frames, max_frames)
+    if frames * rays_per_frame(angle_resolution) > limit * (1 + 1e-9):
+        # Even the coarsest resolution casts too many rays in min_frames, a scan still needs one frame
+        clamped = max(1, int(limit // rays_per_frame(angle_resolution)))
+        print(f"Scan plan: {frames} frames at {angle_resolution:.3f} deg exceed the point band or time budget, using {clamped} frames")
+        frames = clamped
+
+    rays = frames * rays_per_frame(angle_resolution)
+    return ScanPlan(
+        frame_start=frame_start,
+        frame_end=frame_start + frames,
+        angle_resolution=angle_resolution,
+        rays=rays,
+        expected_points=rays * hits,
+        expected_seconds=rays * seconds_per_ray,
+        distance=distance,
+        target_density=target_density
+    )
@@ -0,0 +1,117 @@
+# scanner/evd.py
+
+import os
+import numpy as np
+
+"""
+Layout of the .evd files written by BlenSor: one record per laser return,
+14 doubles followed by an unsigned 64 bit object id, in native byte order.
+The file is terminated by a single int32 with the value -1.
+
+The plain columns (distance, x, y, z) hold the exact ray cast result, the
+*_noise columns hold the same return with the configured noise applied.
+Coordinates are in world space, as scan_range() passes the scanner's
+matrix_world as world_transformation.
+"""
+
+EVD_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("yaw", "f8"),
+    ("pitch", "f8"),
+    ("distance", "f8"),
+    ("distance_noise", "f8"),
+    ("x", "f8"),
+    ("y", "f8"),
+    ("z", "f8"),
+    ("x_noise", "f8"),
+    ("y_noise", "f8"),
+    ("z_noise", "f8"),
+    ("r", "f8"),
+    ("g", "f8"),
+    ("b", "f8"),
+    ("object_id", "u8"),
+])
+
+EVD_TERMINATOR = np.array([-1], dtype="i4").tobytes()
+
+
+def count_evd_records(filepath):
+    """
+    Returns the number of records in an .evd file, using only its size.
+    """
+    return os.path.getsize(filepath) // EVD_DTYPE.itemsize
+
+
+def read_evd(filepath):
+    """
+    Reads all records of an .evd file.
+
+    Returns:
+        np.ndarray: Structured array with the fields of EVD_DTYPE.
+
+    Raises:
+        ValueError: If the file size does not match a whole number of records.
+    """
+    with open(filepath, "rb") as file:
+        data = file.read()
+    return _parse_records(data, filepath)
+
+
+def iter_evd(filepath, chunk_records=1 << 16):
+    """
+    Reads an .evd file in chunks, so large scans can be processed with bounded memory.
+
+    Yields:
+        np.ndarray: Structured arrays of at most 'chunk_records' records.
+    """
+    record_size = EVD_DTYPE.itemsize
+    total = count_evd_records(filepath)
+    with open(filepath, "rb") as file:
+        remaining = total
+        while remaining > 0:
+            n = min(chunk_records, remaining)
+            data = file.read(n * record_size)
+            if len(data) != n * record_size:
+                raise ValueError(f"Unexpected end of file in {filepath}")
+            remaining -= n
+            yield np.frombuffer(data, dtype=EVD_DTYPE)
+
+
+def write_evd(filepath, records):
+    """
+    Writes records to an .evd file in the same layout BlenSor uses.
+
+    Parameters:
+        filepath (str): Output path.
+        records (np.ndarray): Structured array with the fields of EVD_DTYPE.
+    """
+    records = np.asarray(records).astype(EVD_DTYPE, copy=False)
+    with open(filepath, "wb") as file:
+        file.write(records.tobytes())
+        file.write(EVD_TERMINATOR)
+
+
+def merge_evd(part_filepaths, filepath):
+    """
+    Concatenates several .evd files, in the given order, into a single file.
+
+    Returns:
+        int: Number of records written.
+    """
+    count = 0
+    with open(filepath, "wb") as out:
+        for part in part_filepaths:
+            for records in iter_evd(part):
+                out.write(records.tobytes())
+                count += len(records)
+        out.write(EVD_TERMINATOR)
+    return count
+
+
+def _parse_records(data, filepath):
+    record_size = EVD_DTYPE.itemsize
+    n = len(data) // record_size
+    rest = len(data) - n * record_size
+    if rest not in (0, len(EVD_TERMINATOR)):
+        raise ValueError(f"{filepath} is not a valid .evd file ({len(data)} bytes)")
+    return np.frombuffer(data, dtype=EVD_DTYPE, count=n)
@@ -1,30 +1,98 @@
 # scanner/main.py
 import bpy
-from scanner.utils import keyframe_setup, camera_setup, scan_range
+from scanner.utils import keyframe_setup, camera_setup, scan_range, scan_range_chunked
 from scanner.scanner_params import ScannerParams
+from scanner.noise import write_noise_variants
+from scanner.density import plan_scan
 
 
 class ScannerModule:
 
     def scan_scene(self, scanner_params: ScannerParams, aabbs, dir: str, filename: str, numer_of_scans: int = 1):
+        """
+        Places the scanner and scans the scene.
+
+        Returns:
+            ScanPlan or None: With a target_density, the frame range and
+                              angular resolution chosen for this scan.
+        """
         camera_setup(
             scanner_params.scanner_object, 
             scanner_params.scene_size,
             aabbs
             )
+
+        frame_end = scanner_params.frame_end
+        angle_resolution = 0.1
+        plan = None
+        if scanner_params.target_density is not None:
+            plan = plan_scan(
+                scanner_params.scanner_object.location,
+                aabbs,
+                scanner_params.target_density,
+                scanner_params.min_angle,
+                scanner_params.max_angle,
+                frame_start=scanner_params.frame_start,
+                time_budget=scanner_params.time_budget
+                )
+            frame_end = plan.frame_end
+            angle_resolution = plan.angle_resolution
+            print(f"Scanning {filename} with {plan}")
+
         keyframe_setup(
             scanner_params.scanner_object, 
             scanner_params.frame_start, 
-            scanner_params.frame_end, 
+            frame_end, 
             scanner_params.max_angle, 
             scanner_params.min_angle
             )
+        if scanner_params.scan_workers > 1:
+            scan_range_chunked(
+                scanner_params.scanner_object,
+                scanner_params.frame_start,
+                frame_end,
+                dir,
+                filename,
+                workers=scanner_params.scan_workers,
+                noise_sigma=scanner_params.noise_sigma,
+                angle_resolution=angle_resolution,
+                )
+            return plan
+
         scan_range(
             scanner_params.scanner_object, 
             scanner_params.frame_start, 
-            scanner_params.frame_end,
+            frame_end,
             dir,
             filename,
             add_noisy_blender_mesh=scanner_params.add_noisy_blender_mesh,
+            noise_sigma=scanner_params.noise_sigma,
+            angle_resolution=angle_resolution,
             )
-        
\ No newline at end of file
+        return plan
+
+
+    def scan_scene_noise_variants(self, scanner_params: ScannerParams, aabbs, dir: str, filename: str, noise_models, seed=None):
+        """
+        Scans the scene once without noise and writes one noisy variant per noise model.
+
+        The noise-free scan keeps the exact returns in '{dir}/{filename}', the
+        variants are written next to it as '<name>_<model name>.evd', see
+        scanner/noise.py. The noise_sigma and add_noisy_blender_mesh of
+        'scanner_params' are ignored.
+
+        Returns:
+            tuple: The ScanPlan of the scan (None without a target_density,
+                   see scan_scene()) and the paths of the written variants.
+        """
+        noise_sigma, add_noisy_blender_mesh = scanner_params.noise_sigma, scanner_params.add_noisy_blender_mesh
+        scanner_params.noise_sigma = 0.0
+        scanner_params.add_noisy_blender_mesh = False
+        try:
+            plan = self.scan_scene(scanner_params, aabbs, dir, filename)
+        finally:
+            scanner_params.noise_sigma = noise_sigma
+            scanner_params.add_noisy_blender_mesh = add_noisy_blender_mesh
+
+        origin = tuple(scanner_params.scanner_object.location)
+        return plan, write_noise_variants(f"{dir}/{filename}", origin, noise_models, seed=seed)
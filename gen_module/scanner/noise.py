@@ -0,0 +1,157 @@
+# scanner/noise.py
+
+import os
+import numpy as np
+from scanner.evd import read_evd, write_evd
+
+
+class NoiseModel:
+    """
+    A noise realization applied to a noise-free scan.
+
+    All range noise is applied along the ray, i.e. a return keeps its ray
+    direction and only its distance changes, like BlenSor's own noise.
+
+    Parameters:
+        name (str): Used as suffix of the output file, e.g. scan1_<name>.evd.
+        gaussian_mu (float): Mean of the gaussian range noise.
+        gaussian_sigma (float): Standard deviation of the gaussian range noise.
+        laplace_b (float): Scale of the laplace range noise.
+        distance_bias_mu (float): Mean of the per-laser distance bias.
+        distance_bias_sigma (float): Standard deviation of the per-laser distance
+            bias. The bias is drawn once per laser and scan, and is shared by all
+            returns of that laser.
+        dropout (float): Probability of a return being dropped.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            gaussian_mu: float = 0.0,
+            gaussian_sigma: float = 0.0,
+            laplace_b: float = 0.0,
+            distance_bias_mu: float = 0.0,
+            distance_bias_sigma: float = 0.0,
+            dropout: float = 0.0
+    ):
+        if not isinstance(name, str) or not name:
+            raise TypeError("name must be a non-empty str.")
+        for key, value in (("gaussian_sigma", gaussian_sigma), ("laplace_b", laplace_b), ("distance_bias_sigma", distance_bias_sigma)):
+            if value < 0:
+                raise ValueError(f"Provided {key} ({value}) can't be negative.")
+        if not 0 <= dropout < 1:
+            raise ValueError(f"Provided dropout ({dropout}) must be in [0, 1).")
+        self.name = name
+        self.gaussian_mu = gaussian_mu
+        self.gaussian_sigma = gaussian_sigma
+        self.laplace_b = laplace_b
+        self.distance_bias_mu = distance_bias_mu
+        self.distance_bias_sigma = distance_bias_sigma
+        self.dropout = dropout
+
+
+# Noise of the VLP-16 as listed in the vlp16_parameters of scanner/utils.py
+VLP16_NOISE = NoiseModel("vlp16", gaussian_sigma=0.01, distance_bias_sigma=0.014)
+
+# Noise models that can be chosen by name, e.g. on the command line of main.py.
+# Besides the VLP-16, one model per kind of noise, at the scale of its noise.
+NOISE_MODELS = {model.name: model for model in (
+    VLP16_NOISE,
+    NoiseModel("gaussian", gaussian_sigma=0.01),
+    NoiseModel("laplace", laplace_b=0.01),
+    NoiseModel("distance_bias", distance_bias_sigma=0.014),
+    NoiseModel("dropout", dropout=0.1),
+)}
+
+
+def noise_models(names):
+    """
+    Returns the NOISE_MODELS with the given names, in order.
+    """
+    unknown = [name for name in names if name not in NOISE_MODELS]
+    if unknown:
+        raise ValueError(f"Unknown noise models: {unknown}. Known noise models: {sorted(NOISE_MODELS)}")
+    return [NOISE_MODELS[name] for name in names]
+
+
+def variant_filename(filename, model: NoiseModel):
+    """
+    Returns the file name of the variant of a scan with the given noise, <name>_<model name>.evd.
+    """
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}_{model.name}{extension}"
+
+
+def laser_indices(pitch, decimals=4):
+    """
+    Maps the pitch of every return to the index of the laser that produced it.
+
+    Returns:
+        np.ndarray: Laser index per return, 0 for the lowest pitch.
+    """
+    _, indices = np.unique(np.round(pitch, decimals), return_inverse=True)
+    return indices
+
+
+def apply_noise(records, origin, model: NoiseModel, random_state):
+    """
+    Applies a noise model to the returns of a noise-free scan.
+
+    Parameters:
+        records (np.ndarray): Records of a noise-free scan, see scanner/evd.py.
+        origin (sequence): World location of the scanner during the scan.
+        model (NoiseModel): The noise to apply.
+        random_state (np.random.RandomState): Source of randomness.
+
+    Returns:
+        np.ndarray: A copy of the kept records, where the *_noise columns hold
+                    the noisy returns and the plain columns the exact ones.
+    """
+    n = len(records)
+    points = np.column_stack((records["x"], records["y"], records["z"]))
+    offsets = points - np.asarray(origin, dtype=np.float64)
+    distances = np.linalg.norm(offsets, axis=1)
+    directions = offsets / np.maximum(distances, 1e-12)[:, None]
+
+    noise = np.zeros(n)
+    if model.gaussian_sigma > 0 or model.gaussian_mu != 0:
+        noise += random_state.normal(model.gaussian_mu, model.gaussian_sigma, n)
+    if model.laplace_b > 0:
+        noise += random_state.laplace(0.0, model.laplace_b, n)
+    if model.distance_bias_sigma > 0 or model.distance_bias_mu != 0:
+        lasers = laser_indices(records["pitch"])
+        bias = random_state.normal(model.distance_bias_mu, model.distance_bias_sigma, lasers.max() + 1 if n else 0)
+        noise += bias[lasers]
+
+    keep = np.ones(n, dtype=bool)
+    if model.dropout > 0:
+        keep = random_state.random_sample(n) >= model.dropout
+
+    noisy = records[keep].copy()
+    noisy_distances = distances[keep] + noise[keep]
+    noisy_points = np.asarray(origin, dtype=np.float64) + directions[keep] * noisy_distances[:, None]
+    noisy["distance_noise"] = noisy_distances
+    noisy["x_noise"] = noisy_points[:, 0]
+    noisy["y_noise"] = noisy_points[:, 1]
+    noisy["z_noise"] = noisy_points[:, 2]
+    return noisy
+
+
+def write_noise_variants(filepath, origin, models, seed=None):
+    """
+    Writes one noisy copy of a noise-free scan per noise model.
+
+    The variants are written next to the scan as <name>_<model name>.evd.
+
+    Returns:
+        list: Paths of the written files, in the order of 'models'.
+    """
+    records = read_evd(filepath)
+    random_state = np.random.RandomState(seed)
+
+    filepaths = []
+    for model in models:
+        variant_filepath = variant_filename(filepath, model)
+        write_evd(variant_filepath, apply_noise(records, origin, model, random_state))
+        filepaths.append(variant_filepath)
+    return filepaths
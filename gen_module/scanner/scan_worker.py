@@ -0,0 +1,45 @@
+# scanner/scan_worker.py
+"""
+Scans one chunk of a frame range, started by scan_range_chunked() as:
+
+    blender -b scene.blend -P scan_worker.py -- --scanner Camera \
+        --frame-start 0 --frame-end 50 --dir /tmp --file-name part0.evd
+"""
+
+import os
+import sys
+import argparse
+import bpy
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.append(project_root)
+
+from scanner.utils import scan_range
+
+
+def parse_arguments():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Scan a chunk of the frame range of the opened scene.")
+    parser.add_argument("--scanner", required=True, help="Name of the scanner object.")
+    parser.add_argument("--frame-start", type=int, required=True)
+    parser.add_argument("--frame-end", type=int, required=True)
+    parser.add_argument("--dir", required=True)
+    parser.add_argument("--file-name", required=True)
+    parser.add_argument("--noise-sigma", type=float, default=0.03)
+    parser.add_argument("--angle-resolution", type=float, default=0.1)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    scan_range(
+        bpy.data.objects[args.scanner],
+        args.frame_start,
+        args.frame_end,
+        args.dir,
+        args.file_name,
+        noise_sigma=args.noise_sigma,
+        angle_resolution=args.angle_resolution,
+    )
+    sys.exit(0)
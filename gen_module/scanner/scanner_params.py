@@ -17,7 +17,11 @@ class ScannerParams:
             add_noisy_blender_mesh: bool = False,
             render_filepath: str = "",
             render_fileformat: str = "",
-            render_engine: str = "CYCLES"
+            render_engine: str = "CYCLES",
+            scan_workers: int = 1,
+            noise_sigma: float = 0.03,
+            target_density: float = None,
+            time_budget: float = None
     ):
         self.scanner_object = scanner_object
         self.scene_size = scene_size
@@ -30,6 +34,10 @@ class ScannerParams:
         self.render_filepath = render_filepath
         self.render_fileformat = render_fileformat
         self.render_engine = render_engine
+        self.scan_workers = scan_workers
+        self.noise_sigma = noise_sigma
+        self.target_density = target_density
+        self.time_budget = time_budget
 
 
     @property
@@ -180,3 +188,75 @@ class ScannerParams:
             raise TypeError("render_engine must be a str.")
         self._render_engine = value
 
+
+    @property
+    def scan_workers(self):
+        """
+        Number of Blender processes a scan is split across. With more than one
+        worker, the frame range is split into chunks that are scanned in parallel.
+        """
+        return self._scan_workers
+
+
+    @scan_workers.setter
+    def scan_workers(self, value):
+        if not isinstance(value, int):
+            raise TypeError("scan_workers must be an integer.")
+        if value < 1:
+            raise ValueError(f"Provided scan_workers ({value}) must be at least 1.")
+        self._scan_workers = value
+
+
+    @property
+    def noise_sigma(self):
+        """
+        Standard deviation of the gaussian range noise added by BlenSor.
+        """
+        return self._noise_sigma
+
+
+    @noise_sigma.setter
+    def noise_sigma(self, value):
+        if not isinstance(value, (int, float)):
+            raise TypeError("noise_sigma must be a number.")
+        if value < 0:
+            raise ValueError(f"Provided noise_sigma ({value}) can't be negative.")
+        self._noise_sigma = value
+
+
+    @property
+    def target_density(self):
+        """
+        Points per square metre of object surface. If set, the frame range and
+        angular resolution of every scan are chosen by scanner/density.py and
+        frame_end is only used as the default for keyframe_setup().
+        """
+        return self._target_density
+
+
+    @target_density.setter
+    def target_density(self, value):
+        if value is not None:
+            if not isinstance(value, (int, float)):
+                raise TypeError("target_density must be a number or None.")
+            if not value > 0:
+                raise ValueError(f"Provided target_density ({value}) must be a positive number.")
+        self._target_density = value
+
+
+    @property
+    def time_budget(self):
+        """
+        Seconds a single adaptive scan may take, None for no limit.
+        """
+        return self._time_budget
+
+
+    @time_budget.setter
+    def time_budget(self, value):
+        if value is not None:
+            if not isinstance(value, (int, float)):
+                raise TypeError("time_budget must be a number or None.")
+            if not value > 0:
+                raise ValueError(f"Provided time_budget ({value}) must be a positive number.")
+        self._time_budget = value
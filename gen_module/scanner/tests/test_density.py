@@ -0,0 +1,98 @@
+# scanner/tests/test_density.py
+
+import unittest
+import numpy as np
+from scanner import density
+
+
+class TestPlanScan(unittest.TestCase):
+
+    BAND = (100000, 1000000)
+
+    def scene(self, object_size, random_state):
+        scene_size = object_size * 2.5
+        aabbs = []
+        for _ in range(random_state.randint(5, 9)):
+            center = random_state.uniform(-scene_size / 2, scene_size / 2, 3)
+            half = random_state.uniform(0.25, 0.75, 3) * object_size
+            aabbs.append((center - half, center + half))
+        location = random_state.uniform(-scene_size / 2, scene_size / 2, 3)
+        return location, aabbs
+
+    def plan(self, location, aabbs, target_density, **kwargs):
+        kwargs.setdefault("point_band", self.BAND)
+        kwargs.setdefault("frame_range", (24, 2000))
+        kwargs.setdefault("angle_resolution_range", (0.1, 0.4))
+        kwargs.setdefault("seconds_per_ray", 4e-6)
+        return density.plan_scan(location, aabbs, target_density, 0, 180, **kwargs)
+
+    def cast_hit_fraction(self, location, aabbs, count=20000):
+        # Share of rays in uniform directions that hit an AABB (slab test), independent of the bounding spheres of the model
+        directions = np.random.RandomState(5).normal(size=(count, 3))
+        directions /= np.linalg.norm(directions, axis=1)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse = 1.0 / directions
+            hit = np.zeros(count, dtype=bool)
+            for low, high in aabbs:
+                t1, t2 = (low - location) * inverse, (high - location) * inverse
+                near = np.nanmax(np.minimum(t1, t2), axis=1)
+                far = np.nanmin(np.maximum(t1, t2), axis=1)
+                hit |= (near <= far) & (far >= 0)
+        return hit.mean()
+
+    def test_points_stay_in_band_across_the_size_sweep(self):
+        random_state = np.random.RandomState(0)
+        for object_size in np.linspace(0.008, 1, 25):
+            location, aabbs = self.scene(object_size, random_state)
+            plan = self.plan(location, aabbs, 1e6)
+            frames = plan.frame_end - plan.frame_start
+            self.assertAlmostEqual(plan.rays, frames * density.rays_per_frame(plan.angle_resolution))
+            # The bounding spheres overestimate the hits, so the band only holds from above
+            points = plan.rays * self.cast_hit_fraction(location, aabbs)
+            self.assertLessEqual(points, self.BAND[1])
+            self.assertGreaterEqual(points, 0.1 * self.BAND[0])
+            self.assertEqual(plan.frame_start, 0)
+            self.assertGreater(plan.frame_end, plan.frame_start)
+
+    def test_small_scenes_are_not_oversampled(self):
+        location, aabbs = self.scene(0.008, np.random.RandomState(1))
+        plan = self.plan(location, aabbs, 1e6)
+        # The fixed scan casts 200 frames at 0.1 degrees
+        self.assertLess(plan.rays, 200 * density.rays_per_frame(0.1))
+        self.assertGreaterEqual(plan.angle_resolution, 0.1)
+
+    def test_denser_target_casts_more_rays(self):
+        location, aabbs = self.scene(0.5, np.random.RandomState(2))
+        wide_band = dict(point_band=(1, 1e12))
+        sparse = self.plan(location, aabbs, 1e4, **wide_band)
+        dense = self.plan(location, aabbs, 1e6, **wide_band)
+        self.assertGreater(dense.rays, sparse.rays)
+
+    def test_time_budget_caps_the_scan(self):
+        location, aabbs = self.scene(1.0, np.random.RandomState(3))
+        plan = self.plan(location, aabbs, 1e9, point_band=(1, 1e12), time_budget=2.0)
+        self.assertLessEqual(plan.expected_seconds, 2.0)
+
+    def test_frames_go_below_the_range_at_the_coarsest_resolution(self):
+        location, aabbs = self.scene(1.0, np.random.RandomState(3))
+        # 24 frames at 0.4 degrees take 0.29s
+        plan = self.plan(location, aabbs, 1e6, point_band=(1, 1e12), time_budget=0.1)
+        self.assertEqual(plan.angle_resolution, 0.4)
+        self.assertLess(plan.frame_end - plan.frame_start, 24)
+        self.assertGreater(plan.frame_end, plan.frame_start)
+        self.assertLessEqual(plan.expected_seconds, 0.1)
+
+        plan = self.plan(location, aabbs, 1e6, point_band=(1, 20000))
+        self.assertLess(plan.frame_end - plan.frame_start, 24)
+        self.assertLessEqual(plan.expected_points, 20000)
+
+    def test_invalid_arguments(self):
+        location, aabbs = self.scene(0.5, np.random.RandomState(4))
+        with self.assertRaises(ValueError):
+            self.plan(location, aabbs, 0)
+        with self.assertRaises(ValueError):
+            self.plan(location, [], 1e6)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,63 @@
+# scanner/tests/test_evd.py
+
+import os
+import unittest
+import tempfile
+import numpy as np
+from scanner import evd
+
+
+def make_records(n, offset=0):
+    records = np.zeros(n, dtype=evd.EVD_DTYPE)
+    records["timestamp"] = np.arange(offset, offset + n) * 0.01
+    records["x"] = np.arange(offset, offset + n)
+    records["object_id"] = np.arange(offset, offset + n) % 7
+    return records
+
+
+class TestEvdFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_write_read_round_trip(self):
+        path = os.path.join(self.tmpdir.name, "scan.evd")
+        records = make_records(1000)
+        evd.write_evd(path, records)
+
+        self.assertEqual(evd.count_evd_records(path), 1000)
+        np.testing.assert_array_equal(evd.read_evd(path), records)
+
+    def test_iter_evd_chunks(self):
+        path = os.path.join(self.tmpdir.name, "scan.evd")
+        records = make_records(1000)
+        evd.write_evd(path, records)
+
+        chunks = list(evd.iter_evd(path, chunk_records=300))
+        self.assertEqual([len(c) for c in chunks], [300, 300, 300, 100])
+        np.testing.assert_array_equal(np.concatenate(chunks), records)
+
+    def test_merge_keeps_part_order(self):
+        parts = []
+        for i in range(3):
+            path = os.path.join(self.tmpdir.name, f"part{i}.evd")
+            evd.write_evd(path, make_records(10, offset=10 * i))
+            parts.append(path)
+        merged = os.path.join(self.tmpdir.name, "merged.evd")
+
+        self.assertEqual(evd.merge_evd(parts, merged), 30)
+        np.testing.assert_array_equal(evd.read_evd(merged), make_records(30))
+
+    def test_invalid_size(self):
+        path = os.path.join(self.tmpdir.name, "broken.evd")
+        with open(path, "wb") as file:
+            file.write(b"\x00" * 13)
+        with self.assertRaises(ValueError):
+            evd.read_evd(path)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
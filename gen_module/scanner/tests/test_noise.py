@@ -0,0 +1,83 @@
+# scanner/tests/test_noise.py
+
+import os
+import unittest
+import tempfile
+import numpy as np
+from scanner import evd, noise
+
+
+def make_scan(n, origin):
+    random_state = np.random.RandomState(0)
+    directions = random_state.normal(size=(n, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    distances = random_state.uniform(1, 10, n)
+    points = np.asarray(origin) + directions * distances[:, None]
+
+    records = np.zeros(n, dtype=evd.EVD_DTYPE)
+    records["pitch"] = np.repeat(np.linspace(-0.26, 0.26, 16), n // 16)
+    records["distance"] = records["distance_noise"] = distances
+    for i, axis in enumerate("xyz"):
+        records[axis] = records[f"{axis}_noise"] = points[:, i]
+    return records
+
+
+class TestApplyNoise(unittest.TestCase):
+
+    ORIGIN = (1.0, -2.0, 0.5)
+
+    def test_noise_is_applied_along_the_ray(self):
+        records = make_scan(1600, self.ORIGIN)
+        model = noise.NoiseModel("g", gaussian_sigma=0.05, distance_bias_sigma=0.01)
+        noisy = noise.apply_noise(records, self.ORIGIN, model, np.random.RandomState(1))
+
+        clean = np.column_stack((noisy["x"], noisy["y"], noisy["z"])) - self.ORIGIN
+        moved = np.column_stack((noisy["x_noise"], noisy["y_noise"], noisy["z_noise"])) - self.ORIGIN
+        cross = np.cross(clean, moved)
+        np.testing.assert_allclose(cross, 0, atol=1e-9)
+        np.testing.assert_allclose(np.linalg.norm(moved, axis=1), noisy["distance_noise"])
+        self.assertAlmostEqual(np.std(noisy["distance_noise"] - noisy["distance"]), 0.05, delta=0.01)
+
+    def test_zero_noise_keeps_returns(self):
+        records = make_scan(160, self.ORIGIN)
+        noisy = noise.apply_noise(records, self.ORIGIN, noise.NoiseModel("none"), np.random.RandomState(1))
+        for field in ("distance_noise", "x_noise", "y_noise", "z_noise"):
+            np.testing.assert_allclose(noisy[field], records[field])
+
+    def test_dropout(self):
+        records = make_scan(16000, self.ORIGIN)
+        model = noise.NoiseModel("d", dropout=0.25)
+        noisy = noise.apply_noise(records, self.ORIGIN, model, np.random.RandomState(1))
+        self.assertAlmostEqual(len(noisy) / len(records), 0.75, delta=0.02)
+
+
+class TestNoiseVariants(unittest.TestCase):
+
+    def test_models_by_name(self):
+        self.assertEqual(noise.noise_models(["vlp16"]), [noise.VLP16_NOISE])
+        with self.assertRaises(ValueError):
+            noise.noise_models(["vlp16", "hdl64"])
+
+    def test_variants_are_written_next_to_the_scan(self):
+        origin = (1.0, -2.0, 0.5)
+        names = ["gaussian", "laplace", "distance_bias", "dropout"]
+        with tempfile.TemporaryDirectory() as dir:
+            filepath = os.path.join(dir, "scan1.evd")
+            records = make_scan(1600, origin)
+            evd.write_evd(filepath, records)
+            filepaths = noise.write_noise_variants(filepath, origin, noise.noise_models(names), seed=3)
+            self.assertEqual([os.path.basename(filepath) for filepath in filepaths], [f"scan1_{name}.evd" for name in names])
+
+            variants = [evd.read_evd(filepath) for filepath in filepaths]
+            for variant in variants[:3]:
+                self.assertEqual(len(variant), len(records))
+                self.assertGreater(np.abs(variant["distance_noise"] - records["distance"]).mean(), 1e-3)
+            # The per-laser bias is the same for every return of a laser
+            bias = variants[2]["distance_noise"] - records["distance"]
+            self.assertEqual(len(np.unique(np.round(bias, 9))), 16)
+            self.assertLess(len(variants[3]), len(records))
+            np.testing.assert_allclose(variants[3]["distance_noise"], variants[3]["distance"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
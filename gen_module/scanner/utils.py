@@ -1,9 +1,12 @@
 # scanner/utils.py
 
+import os
 import bpy
 import blensor
 import random
+import subprocess
 from math import pi
+from scanner.evd import merge_evd
 
 
 def keyframe_setup(scanner_object, frame_start, frame_end, min_angle, max_angle):
@@ -79,7 +82,7 @@ vlp16_parameters = {
 """
 
 
-def scan_range(scanner_object, frame_start, frame_end, dir, file_name, add_blender_mesh=False, add_noisy_blender_mesh=False):
+def scan_range(scanner_object, frame_start, frame_end, dir, file_name, add_blender_mesh=False, add_noisy_blender_mesh=False, noise_sigma=0.03, angle_resolution=0.1):
     """
     #TODO: needs to be properly documented
 
@@ -96,11 +99,11 @@ def scan_range(scanner_object, frame_start, frame_end, dir, file_name, add_blend
         add_noisy_blender_mesh=add_noisy_blender_mesh,
         world_transformation=scanner_object.matrix_world,
 
-        angle_resolution=0.1,
+        angle_resolution=angle_resolution,
         rotation_speed=5,
         max_distance=100,
         noise_mu=0.0,
-        noise_sigma=0.03,
+        noise_sigma=noise_sigma,
         depth_map=False,
         filename=f"{dir}/{file_name}"
     ) 
@@ -121,6 +124,70 @@ def scan_range(scanner_object, frame_start, frame_end, dir, file_name, add_blend
     """
 
 
+def split_frame_range(frame_start, frame_end, chunks):
+    """
+    Splits the frames [frame_start, frame_end) into contiguous chunks of nearly equal length.
+
+    Returns:
+        list: (start, end) pairs in frame order, at most 'chunks' of them.
+
+    Example:
+        >>> split_frame_range(0, 200, 3)
+        [(0, 67), (67, 134), (134, 200)]
+    """
+    frame_count = frame_end - frame_start
+    chunks = max(1, min(chunks, frame_count))
+    bounds = [frame_start + (frame_count * i + chunks - 1) // chunks for i in range(chunks + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(chunks)]
+
+
+def scan_range_chunked(scanner_object, frame_start, frame_end, dir, file_name, workers, noise_sigma=0.03, angle_resolution=0.1):
+    """
+    Performs the same scan as scan_range(), split over several Blender processes.
+
+    The scene, including the scanner pose and its rotation keyframes, is saved
+    to a temporary .blend file. Every worker opens that file and scans one
+    chunk of the frame range (see scan_worker.py), and the partial outputs are
+    merged in frame order into '{dir}/{file_name}'.
+
+    Notes:
+        - Each frame only depends on the interpolated scanner pose, so the
+          merged file holds the same returns as a single process scan.
+        - Meshes added by BlenSor would end up in the workers' scenes, so
+          add_blender_mesh and add_noisy_blender_mesh are not supported here.
+    """
+    blend_filepath = f"{dir}/.{file_name}.blend"
+    bpy.ops.wm.save_as_mainfile(filepath=blend_filepath, copy=True)
+
+    worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scan_worker.py")
+    processes = []
+    part_file_names = []
+    for i, (start, end) in enumerate(split_frame_range(frame_start, frame_end, workers)):
+        part_file_name = f".{file_name}.part{i}.evd"
+        command = [
+            bpy.app.binary_path, "-b", blend_filepath, "-P", worker_script, "--",
+            "--scanner", scanner_object.name,
+            "--frame-start", str(start),
+            "--frame-end", str(end),
+            "--dir", dir,
+            "--file-name", part_file_name,
+            "--noise-sigma", str(noise_sigma),
+            "--angle-resolution", repr(angle_resolution),
+        ]
+        processes.append(subprocess.Popen(command, stdout=subprocess.DEVNULL))
+        part_file_names.append(part_file_name)
+
+    try:
+        failed = [i for i, process in enumerate(processes) if process.wait() != 0]
+        if failed:
+            raise RuntimeError(f"Scan workers for chunks {failed} of {dir}/{file_name} failed.")
+        merge_evd([f"{dir}/{name}" for name in part_file_names], f"{dir}/{file_name}")
+    finally:
+        for path in [blend_filepath] + [f"{dir}/{name}" for name in part_file_names]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
 def render_image(filepath, fileformat, engine="CYCLES"):
     """
     #TODO: needs to be properly documented
@@ -0,0 +1,121 @@
+# scene_generator/clutter.py
+"""
+Fills scenes with thousands of small clutter objects.
+
+Clutter objects are linked duplicates: all objects of one shape share a
+single unit mesh and get their size through their scale, so memory grows
+with the number of shapes, not with the number of objects. The objects are
+created with bpy.data.objects.new() and linked to the scene directly. No
+bpy.ops operator is called per object, as every operator call updates the
+whole scene, which makes creating n objects take O(n^2) time.
+
+Round clutter objects get few vertices (ClutterParams.vertices), which keeps
+the triangle count BlenSor casts its rays against small.
+"""
+
+import bpy
+import numpy as np
+from scene_generator.surface_sampling import local_triangles
+from scene_generator.clutter_params import ClutterParams
+
+
+def _uv_sphere_triangles(segments, rings):
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.arange(segments) * 2 * np.pi / segments
+    grid = np.stack((
+        np.outer(np.sin(theta), np.cos(phi)),
+        np.outer(np.sin(theta), np.sin(phi)),
+        np.repeat(np.cos(theta)[:, None], segments, axis=1),
+    ), axis=-1)
+    triangles = []
+    for i in range(rings):
+        for j in range(segments):
+            k = (j + 1) % segments
+            if i > 0:
+                triangles.append(grid[[i, i + 1, i], [j, j, k]])
+            if i < rings - 1:
+                triangles.append(grid[[i, i + 1, i + 1], [k, j, k]])
+    return np.array(triangles)
+
+
+def unit_triangles(object_type, vertices):
+    """
+    Returns the triangles of the unit primitive the clutter objects of a shape are scaled from.
+    The units are the ones of the object pool: radius 1, depth 2 and boxes of size 2.
+    """
+    if object_type == "sphere":
+        return _uv_sphere_triangles(vertices, max(vertices // 2, 3))
+    if object_type == "box":
+        return local_triangles({"type": "box", "size": [2, 2, 2]})
+    if object_type == "plane":
+        return local_triangles({"type": "plane", "radius": 1})
+    return local_triangles({"type": object_type, "radius": 1, "depth": 2, "vertices": vertices})
+
+
+def object_scale(params):
+    """
+    Returns the scale that turns the unit primitive into the object of the given params.
+    """
+    if params["type"] == "sphere":
+        return (params["size"],) * 3
+    if params["type"] == "box":
+        return tuple(s / 2.0 for s in params["size"])
+    if params["type"] == "plane":
+        return (params["radius"], params["radius"], 1)
+    return (params["radius"], params["radius"], params["depth"] / 2.0)
+
+
+class ClutterGenerator:
+    """
+    Creates clutter objects, keeping one shared unit mesh per shape between scenes.
+    """
+
+    def __init__(self):
+        self._meshes = {}
+
+
+    def mesh(self, object_type, vertices):
+        key = (object_type, vertices)
+        mesh = self._meshes.get(key)
+        if mesh is None:
+            triangles = unit_triangles(object_type, vertices)
+            points, faces = np.unique(triangles.reshape(-1, 3).round(9), axis=0, return_inverse=True)
+            mesh = bpy.data.meshes.new(f"clutter_{object_type}_{vertices}")
+            mesh.from_pydata(points.tolist(), [], faces.reshape(-1, 3).tolist())
+            mesh.update()
+            # Kept when the scene is cleaned, so the next scene reuses it
+            mesh.use_fake_user = True
+            self._meshes[key] = mesh
+        return mesh
+
+
+    def create(self, object_params, clutter_params: ClutterParams):
+        """
+        Creates the clutter objects of the given params as linked duplicates.
+
+        Returns:
+            list: The created objects.
+        """
+        scene = bpy.context.scene
+        objects = []
+        for params in object_params:
+            vertices = params.get("vertices", clutter_params.vertices)
+            obj = bpy.data.objects.new(f"clutter_{params['type']}", self.mesh(params["type"], vertices))
+            obj.location = params["location"]
+            obj.rotation_euler = (0, 0, 0) if params["type"] == "sphere" else params["rotation"]
+            obj.scale = object_scale(params)
+            scene.objects.link(obj)
+            objects.append(obj)
+        # A single update for all objects
+        scene.update()
+        return objects
+
+
+    def clear(self):
+        """
+        Removes the shared meshes. Their objects must have been removed first.
+        """
+        for mesh in self._meshes.values():
+            mesh.use_fake_user = False
+            bpy.data.meshes.remove(mesh)
+        self._meshes = {}
@@ -0,0 +1,127 @@
+# scene_generator/clutter_params.py
+
+from typing import Tuple, Set
+from system_parameters import SystemConfiguration
+from scene_generator.scene_generator_params import PrimitiveObjects
+
+config = SystemConfiguration()
+
+
+class ClutterParams:
+    """
+    Small objects scattered around the objects of a scene, see scene_generator/clutter.py.
+    """
+
+    def __init__(
+            self,
+            objects_to_generate: Set[PrimitiveObjects],
+            object_count_range: Tuple[int, int],
+            object_size_range: Tuple[float, float],
+            allow_overlap: bool = True,
+            vertices: int = None
+    ):
+        if vertices is None:
+            vertices = config.get("clutter_vertices", 8)
+        self.objects_to_generate = objects_to_generate
+        self.object_count_range = object_count_range
+        self.object_size_range = object_size_range
+        self.allow_overlap = allow_overlap
+        self.vertices = vertices
+
+
+    @property
+    def objects_to_generate(self):
+        return self._objects_to_generate
+
+
+    @objects_to_generate.setter
+    def objects_to_generate(self, value):
+        if not isinstance(value, set):
+            raise TypeError(f"'objects_to_generate' expected to be of type set, but got {type(value).__name__}")
+        if not value:
+            raise ValueError(f"'objects_to_generate' cannot be empty")
+        if not all(isinstance(obj, PrimitiveObjects) for obj in value):
+            raise ValueError(f"All elements in 'objects_to_generate' must be instances of PrimitiveObjects. Got {value}")
+        self._objects_to_generate = value
+
+
+    @property
+    def object_count_range(self):
+        return self._object_count_range
+
+
+    @object_count_range.setter
+    def object_count_range(self, value):
+        if not isinstance(value, tuple):
+            raise TypeError(f"'object_count_range' expected to be of type tuple, but got {type(value).__name__}")
+        if len(value) != 2:
+            raise ValueError(f"'object_count_range' must be of length 2. Got length {len(value)}")
+        if not all(isinstance(n, int) for n in value):
+            raise TypeError(f"All elements in 'object_count_range' must be integers. Got {value}")
+        if value[0] > value[1] or value[0] < 0:
+            raise ValueError(f"First element of 'object_count_range' must be non-negative and not greater than the second. Got {value}")
+        self._object_count_range = value
+
+
+    @property
+    def object_size_range(self):
+        return self._object_size_range
+
+
+    @object_size_range.setter
+    def object_size_range(self, value):
+        if not isinstance(value, tuple):
+            raise TypeError(f"'object_size_range' expected to be of type tuple, but got {type(value).__name__}")
+        if len(value) != 2:
+            raise ValueError(f"'object_size_range' must be of length 2. Got length {len(value)}")
+        if not all(isinstance(n, (float, int)) for n in value):
+            raise TypeError(f"All elements in 'object_size_range' must be numbers (float or int). Got {value}")
+        if value[0] > value[1] or not value[0] > 0:
+            raise ValueError(f"First element of 'object_size_range' must be positive and not greater than the second. Got {value}")
+        self._object_size_range = value
+
+
+    @property
+    def allow_overlap(self):
+        """
+        Whether clutter objects may overlap each other. They never overlap the objects of the scene.
+        """
+        return self._allow_overlap
+
+
+    @allow_overlap.setter
+    def allow_overlap(self, value):
+        if not isinstance(value, bool):
+            raise TypeError(f"'allow_overlap' expected to be of type bool, but got {type(value).__name__}")
+        self._allow_overlap = value
+
+
+    @property
+    def vertices(self):
+        """
+        Vertex count of round clutter objects (cylinders, cones and spheres).
+        Kept low, as BlenSor casts its rays against every triangle of the scene.
+        """
+        return self._vertices
+
+
+    @vertices.setter
+    def vertices(self, value):
+        if not isinstance(value, int):
+            raise TypeError(f"'vertices' expected to be of type int, but got {type(value).__name__}")
+        if value < 3:
+            raise ValueError(f"'vertices' must be at least 3. Got {value}")
+        self._vertices = value
+
+
+def clutter_params_from_message(message):
+    """
+    Creates ClutterParams from their JSON form, see runtime/cache.py clutter_params_spec().
+    """
+    return ClutterParams(
+        objects_to_generate={PrimitiveObjects[name] for name in message["objects_to_generate"]},
+        object_count_range=tuple(message["object_count_range"]),
+        object_size_range=tuple(message["object_size_range"]),
+        allow_overlap=message.get("allow_overlap", True),
+        vertices=message.get("vertices")
+    )
@@ -2,7 +2,7 @@
 import bpy
 import random
 import math
-from scene_generator_params import SceneGeneratorParams, PrimitiveObjects
+from scene_generator_params import SceneGeneratorParams, PrimitiveObjects, sorted_primitives
 from scene_generator.utils import (
     generate_random_height,
     create_random_plane,
@@ -10,8 +10,13 @@ from scene_generator.utils import (
     create_random_sphere,
     create_random_cylinder,
     create_random_pyramid,
-    is_aabb_overlapping_with_any_aabb,
+    create_object,
     get_aabb)
+from scene_generator.pool import ObjectPool
+from scene_generator.placement import PlacementEngine, scatter_objects
+from scene_generator.clutter import ClutterGenerator
+from scene_generator.clutter_params import ClutterParams
+from scene_generator.surface_sampling import world_obb
 
 
 class SceneGeneratorModule():
@@ -19,9 +24,23 @@ class SceneGeneratorModule():
     NUMBER_OF_VERTICES = 32  # used by primitive_cylinder_add and primitive_cone_add
 
 
+    def __init__(self, object_pool: ObjectPool = None):
+        """
+        Parameters:
+            object_pool (ObjectPool or None): If given, scene objects are taken from
+                the pool and returned to it by clean_scene(), instead of being
+                created and deleted for every scene.
+        """
+        self.object_pool = object_pool
+        self.clutter_generator = ClutterGenerator()
+
+
     def generate_scene(self, scene_params: SceneGeneratorParams):
+        if not scene_params.allow_overlap:
+            return self.generate_placed_scene(scene_params)
+
         number_of_objs = random.randint(*scene_params.object_count_range)
-        objects = [random.choice(list(scene_params.objects_to_generate)) for _ in range(number_of_objs)]
+        objects = [random.choice(sorted_primitives(scene_params.objects_to_generate)) for _ in range(number_of_objs)]
         object_params = []
 
         aabbs = []
@@ -37,7 +56,7 @@ class SceneGeneratorModule():
             rotation = [random.random()*math.pi*2 for _ in range(3)]
             print(f"===== OBJECT: {obj} =====")
             if obj.value == PrimitiveObjects.PLANE.value:
-                radius = create_random_plane(a, b, location, rotation)
+                radius = create_random_plane(a, b, location, rotation, pool=self.object_pool)
                 object_params.append({
                     "type": "plane",
                     "location": location,
@@ -46,7 +65,7 @@ class SceneGeneratorModule():
                 })
 
             elif obj.value == PrimitiveObjects.BOX.value:
-                size = create_random_box(a, b, location, rotation)
+                size = create_random_box(a, b, location, rotation, pool=self.object_pool)
                 object_params.append({
                     "type": "box",
                     "location": location,
@@ -55,7 +74,7 @@ class SceneGeneratorModule():
                 })
 
             elif obj.value == PrimitiveObjects.SPHERE.value:
-                size = create_random_sphere(a, b, location)
+                size = create_random_sphere(a, b, location, pool=self.object_pool)
                 object_params.append({
                     "type": "sphere",
                     "location": location,
@@ -64,13 +83,14 @@ class SceneGeneratorModule():
                 })
 
             elif obj.value == PrimitiveObjects.CYLINDER.value:
-                radius, depth = create_random_cylinder(a, b, location, rotation, self.NUMBER_OF_VERTICES)
+                radius, depth = create_random_cylinder(a, b, location, rotation, self.NUMBER_OF_VERTICES, pool=self.object_pool)
                 object_params.append({
                     "type": "cylinder",
                     "location": location,
                     "rotation": rotation,
                     "radius": radius,
-                    "depth": depth
+                    "depth": depth,
+                    "vertices": self.NUMBER_OF_VERTICES
                 })
 
             else:
@@ -81,35 +101,59 @@ class SceneGeneratorModule():
                     vertices = 3
                 elif obj.value == PrimitiveObjects.RECTANGULAR_PYRAMID.value:
                     vertices = 4
-                radius, depth = create_random_pyramid(a, b, location, rotation, vertices)
+                radius, depth = create_random_pyramid(a, b, location, rotation, vertices, pool=self.object_pool)
 
                 object_params.append({
                     "type": "pyramid",
                     "location": location,
                     "rotation": rotation,
                     "radius": radius,
-                    "depth": depth
+                    "depth": depth,
+                    "vertices": vertices
                 })
 
             obj = bpy.context.object
-            obj_aabb = get_aabb(obj)
-            if scene_params.allow_overlap: 
-                aabbs.append(obj_aabb)
-                continue
-
-            if is_aabb_overlapping_with_any_aabb(obj_aabb, aabbs):
-                obj.select = True
-                bpy.ops.object.delete()
-            else:
-                aabbs.append(obj_aabb)
+            aabbs.append(get_aabb(obj))
+        return aabbs, object_params
+
+
+    def generate_placed_scene(self, scene_params: SceneGeneratorParams):
+        """
+        Generates a scene without overlapping objects. The objects are placed
+        by the PlacementEngine before any of them is created, so the returned
+        params and AABBs describe exactly the objects in the scene.
+        """
+        engine = PlacementEngine(scene_params, rng=random)
+        object_params = engine.place_objects()
+
+        aabbs = []
+        for params in object_params:
+            print(f"===== OBJECT: {params['type']} =====")
+            create_object(params, pool=self.object_pool)
+            aabbs.append(get_aabb(bpy.context.object))
         return aabbs, object_params
-    
 
 
+    def generate_cluttered_scene(self, scene_params: SceneGeneratorParams, clutter_params: ClutterParams):
+        """
+        Generates a scene and scatters small clutter objects around its objects.
+        The clutter objects follow the objects of the scene in the returned lists.
+        """
+        aabbs, object_params = self.generate_scene(scene_params)
+        obbs = [world_obb(params) for params in object_params]
+        clutter_object_params, clutter_aabbs = scatter_objects(scene_params, clutter_params, occupied=aabbs, occupied_obbs=obbs, rng=random)
+        print(f"===== CLUTTER: {len(clutter_object_params)} objects =====")
+        self.clutter_generator.create(clutter_object_params, clutter_params)
+        return aabbs + clutter_aabbs, object_params + clutter_object_params
+    
+
     def clean_scene(self):
         """
-        Removes all 3D objects.
+        Removes all 3D objects. Objects owned by the object pool are hidden
+        and kept for the next scene instead.
         """
+        if self.object_pool is not None:
+            self.object_pool.recycle()
 
         # objects_to_delete = [obj for obj in bpy.context.scene.objects if obj.type not in {'CAMERA', 'LAMP'}]
         # bpy.ops.object.select_all(action='DESELECT')
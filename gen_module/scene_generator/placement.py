@@ -0,0 +1,255 @@
+# scene_generator/placement.py
+"""
+Places non-overlapping objects without creating any Blender objects.
+
+Objects are drawn with the same distributions as generate_scene() and
+tested against the objects placed so far before anything is built, so only
+objects that end up in the scene are ever created. Every object gets a
+budget of 'maximum_attempts' rounds. In each round a size is drawn and
+'candidates' positions and rotations are tried for it. Overlap tests go
+through an OccupancyGrid, so a test only looks at the objects near the
+candidate and costs about the same no matter how full the scene already is.
+
+World-axis AABBs of rotated objects are far larger than the objects, so
+objects whose AABBs overlap are tested once more with their oriented
+bounding boxes, and only rejected if those overlap as well.
+"""
+
+import math
+import random
+import numpy as np
+from system_parameters import SystemConfiguration
+from scene_generator.scene_generator_params import SceneGeneratorParams, PrimitiveObjects, sorted_primitives
+from scene_generator.clutter_params import ClutterParams
+from scene_generator.surface_sampling import draw_object_shape, world_aabb, world_obb
+
+config = SystemConfiguration()
+
+
+def aabbs_overlap(aabb_1, aabb_2):
+    """
+    Checks if two AABBs overlap. Touching faces do not count as overlap.
+    """
+    return all(aabb_1[0][i] < aabb_2[1][i] and aabb_2[0][i] < aabb_1[1][i] for i in range(3))
+
+
+def obbs_overlap(obb, centers, axes, extents):
+    """
+    Separating axis test of one oriented bounding box against many.
+
+    Parameters:
+        obb (tuple): Center (3,), axes as matrix columns (3, 3) and half extents (3,).
+        centers, axes, extents (np.ndarray): The same for m boxes, of shapes
+            (m, 3), (m, 3, 3) and (m, 3).
+
+    Returns:
+        np.ndarray: Boolean array of shape (m,), True where the boxes overlap.
+                    Touching faces do not count as overlap.
+    """
+    center_a, axes_a, extents_a = obb
+    # Rotation of every box b into the frame of box a, and its center in that frame
+    r = np.einsum("ki,mkj->mij", axes_a, axes)
+    t = (centers - center_a) @ axes_a
+    # The epsilon keeps near-parallel edges from producing a zero cross product axis
+    abs_r = np.abs(r) + 1e-12
+
+    separated = np.zeros(len(centers), dtype=bool)
+    for i in range(3):
+        separated |= np.abs(t[:, i]) >= extents_a[i] + np.einsum("mj,mj->m", extents, abs_r[:, i, :])
+    for j in range(3):
+        separated |= np.abs(np.einsum("mi,mi->m", t, r[:, :, j])) >= abs_r[:, :, j] @ extents_a + extents[:, j]
+    for i in range(3):
+        i1, i2 = (i + 1) % 3, (i + 2) % 3
+        for j in range(3):
+            j1, j2 = (j + 1) % 3, (j + 2) % 3
+            distance = np.abs(t[:, i2] * r[:, i1, j] - t[:, i1] * r[:, i2, j])
+            reach = (extents_a[i1] * abs_r[:, i2, j] + extents_a[i2] * abs_r[:, i1, j]
+                     + extents[:, j1] * abs_r[:, i, j2] + extents[:, j2] * abs_r[:, i, j1])
+            separated |= distance >= reach
+    return ~separated
+
+
+class OccupancyGrid:
+    """
+    Uniform grid over world space, each cell lists the AABBs that reach into it.
+
+    Objects inserted with an oriented bounding box only count as overlapping
+    if both their AABBs and their OBBs overlap.
+    """
+
+    def __init__(self, cell_size: float):
+        if not cell_size > 0:
+            raise ValueError(f"'cell_size' {cell_size} must be a positive number.")
+        self.cell_size = cell_size
+        self.aabbs = []
+        self.obbs = []
+        self._cells = {}
+
+
+    def __len__(self):
+        return len(self.aabbs)
+
+
+    def overlaps(self, aabb, obb=None):
+        checked = set()
+        close = []
+        for cell in self._cells_of(aabb):
+            for i in self._cells.get(cell, ()):
+                if i not in checked:
+                    checked.add(i)
+                    if aabbs_overlap(aabb, self.aabbs[i]):
+                        if obb is None or self.obbs[i] is None:
+                            return True
+                        close.append(i)
+        if not close:
+            return False
+        centers, axes, extents = (np.array(values) for values in zip(*(self.obbs[i] for i in close)))
+        return bool(np.any(obbs_overlap(obb, centers, axes, extents)))
+
+
+    def insert(self, aabb, obb=None):
+        i = len(self.aabbs)
+        self.aabbs.append(aabb)
+        self.obbs.append(obb)
+        for cell in self._cells_of(aabb):
+            self._cells.setdefault(cell, []).append(i)
+
+
+    def _cells_of(self, aabb):
+        low = [math.floor(v / self.cell_size) for v in aabb[0]]
+        high = [math.floor(v / self.cell_size) for v in aabb[1]]
+        for x in range(low[0], high[0] + 1):
+            for y in range(low[1], high[1] + 1):
+                for z in range(low[2], high[2] + 1):
+                    yield (x, y, z)
+
+
+class PlacementEngine:
+    """
+    Draws the objects of a scene so that none of them overlap.
+
+    Example:
+        >>> engine = PlacementEngine(scene_params)
+        >>> object_params = engine.place_objects()
+        >>> len(object_params) == len(engine.grid.aabbs)
+        True
+    """
+
+    def __init__(self, scene_params: SceneGeneratorParams, maximum_attempts: int = None, candidates: int = None, rng=random):
+        if maximum_attempts is None:
+            maximum_attempts = config.get("maximum_attempts", 3)
+        if candidates is None:
+            candidates = config.get("placement_candidates", 32)
+        if maximum_attempts < 1 or candidates < 1:
+            raise ValueError(f"'maximum_attempts' {maximum_attempts} and 'candidates' {candidates} must be at least 1.")
+        self.scene_params = scene_params
+        self.maximum_attempts = maximum_attempts
+        self.candidates = candidates
+        self.rng = rng
+        # Objects are at most object_size_range[1] large, so each one covers only a few cells
+        self.grid = OccupancyGrid(scene_params.object_size_range[1])
+
+
+    def place(self, obj):
+        """
+        Places one object of the given PrimitiveObjects kind.
+
+        Returns:
+            dict or None: The object params, or None if no free spot was found within the budget.
+        """
+        a, b = self.scene_params.object_size_range
+        scene_size = self.scene_params.scene_size
+        mean, std = self.scene_params.object_height_distribution
+        rng = self.rng
+
+        for _ in range(self.maximum_attempts):
+            shape = draw_object_shape(obj, a, b, rng)
+            object_type = shape.pop("type")
+            for _ in range(self.candidates):
+                location = [
+                    rng.random()*scene_size - scene_size/2,
+                    rng.random()*scene_size - scene_size/2,
+                    mean + rng.uniform(-std, std)
+                ]
+                rotation = [rng.random()*math.pi*2 for _ in range(3)]
+                params = dict(type=object_type, location=location, rotation=rotation, **shape)
+                aabb = world_aabb(params)
+                obb = world_obb(params)
+                if not self.grid.overlaps(aabb, obb):
+                    self.grid.insert(aabb, obb)
+                    return params
+        return None
+
+
+    def place_objects(self):
+        """
+        Draws the object count and kinds like generate_scene() and places the objects.
+
+        Returns:
+            list: Params of the placed objects, in the format of generate_scene().
+                  Shorter than the drawn count only if the scene is too full to
+                  fit the remaining objects within their budget.
+        """
+        number_of_objs = self.rng.randint(*self.scene_params.object_count_range)
+        objects = [self.rng.choice(sorted_primitives(self.scene_params.objects_to_generate)) for _ in range(number_of_objs)]
+
+        object_params = []
+        for obj in objects:
+            params = self.place(obj)
+            if params is None:
+                print(f"Could not place {obj} after {self.maximum_attempts * self.candidates} candidates, scene is full")
+                continue
+            object_params.append(params)
+        return object_params
+
+
+def scatter_objects(scene_params: SceneGeneratorParams, clutter_params: ClutterParams, occupied=(), occupied_obbs=None, maximum_attempts: int = None, rng=random):
+    """
+    Draws clutter objects spread over the scene like its regular objects,
+    but never overlapping the 'occupied' AABBs (usually the ones of the
+    objects already in the scene), or their OBBs if 'occupied_obbs' is given.
+
+    Returns:
+        tuple: Object params in the format of generate_scene() and their AABBs.
+    """
+    if maximum_attempts is None:
+        maximum_attempts = config.get("maximum_attempts", 3)
+    a, b = clutter_params.object_size_range
+    scene_size = scene_params.scene_size
+    mean, std = scene_params.object_height_distribution
+
+    # Separate grids, as the scene objects are far larger than the clutter
+    occupied_grid = OccupancyGrid(max(scene_params.object_size_range[1], b))
+    for i, aabb in enumerate(occupied):
+        occupied_grid.insert(aabb, occupied_obbs[i] if occupied_obbs is not None else None)
+    clutter_grid = OccupancyGrid(b)
+
+    number_of_objs = rng.randint(*clutter_params.object_count_range)
+    kinds = sorted_primitives(clutter_params.objects_to_generate)
+    object_params = []
+    aabbs = []
+    for _ in range(number_of_objs):
+        obj = rng.choice(kinds)
+        for _ in range(maximum_attempts):
+            shape = draw_object_shape(obj, a, b, rng)
+            if obj.value in (PrimitiveObjects.CYLINDER.value, PrimitiveObjects.CONE.value):
+                shape["vertices"] = clutter_params.vertices
+            location = [
+                rng.random()*scene_size - scene_size/2,
+                rng.random()*scene_size - scene_size/2,
+                mean + rng.uniform(-std, std)
+            ]
+            rotation = [rng.random()*math.pi*2 for _ in range(3)]
+            params = dict(type=shape.pop("type"), location=location, rotation=rotation, clutter=True, **shape)
+            aabb = world_aabb(params)
+            obb = world_obb(params)
+            if occupied_grid.overlaps(aabb, obb):
+                continue
+            if not clutter_params.allow_overlap:
+                if clutter_grid.overlaps(aabb, obb):
+                    continue
+                clutter_grid.insert(aabb, obb)
+            object_params.append(params)
+            aabbs.append(aabb)
+            break
+    return object_params, aabbs
@@ -0,0 +1,133 @@
+# scene_generator/pool.py
+
+import bpy
+from system_parameters import SystemConfiguration
+from scene_generator.utils import purge_orphan_data
+
+config = SystemConfiguration()
+
+
+class ObjectPool:
+    """
+    Keeps the primitives of previous scenes alive and reuses them for the next
+    scene, instead of deleting every object and creating new ones.
+
+    Pooled objects are unit-sized primitives, the final dimensions are set
+    through their scale. Objects that the current scene does not need are
+    unlinked from the scene, so neither BlenSor nor the renderer can see them,
+    and are kept in bpy.data with a fake user until they are used again.
+    Fake users are saved with a .blend file, so drop_idle() must be called
+    before saving one.
+
+    Pools are kept per primitive kind and vertex count, e.g. ("cone", 4) for
+    rectangular pyramids, as those cannot be turned into each other by scaling.
+    """
+
+    def __init__(self, purge_interval: int = None, max_idle_objects: int = None):
+        if purge_interval is None:
+            purge_interval = config.get("pool_purge_interval", 100)
+        if max_idle_objects is None:
+            max_idle_objects = config.get("pool_max_idle_objects", 16)
+        self.purge_interval = purge_interval
+        self.max_idle_objects = max_idle_objects
+        self._idle = {}     # key -> list of unlinked objects
+        self._in_use = []   # list of (key, object) linked to the scene
+        self._scene_count = 0
+
+
+    def place(self, kind, location, rotation, scale, vertices=None):
+        """
+        Places an object of the given kind in the scene, reusing an idle one if possible.
+
+        Parameters:
+            kind (str): One of "plane", "box", "sphere", "cylinder" or "cone".
+            location (list): World location of the object.
+            rotation (list): Euler rotation (XYZ) of the object in radians.
+            scale (tuple): Scale applied to the unit primitive.
+            vertices (int or None): Vertex count, only used by cylinders and cones.
+
+        Returns:
+            bpy.types.Object: The placed object, which is also made the active object.
+        """
+        key = (kind, vertices)
+        idle = self._idle.setdefault(key, [])
+        if idle:
+            obj = idle.pop()
+            bpy.context.scene.objects.link(obj)
+        else:
+            obj = self._create_unit_primitive(kind, vertices)
+
+        obj.location = location
+        obj.rotation_euler = rotation
+        obj.scale = scale
+        self._in_use.append((key, obj))
+
+        # generate_scene() reads the new object from bpy.context.object
+        bpy.context.scene.objects.active = obj
+        return obj
+
+
+    def recycle(self):
+        """
+        Hides all objects of the current scene and returns them to their pools.
+        Should be called once between two scenes. Every 'purge_interval' scenes
+        the idle pools are trimmed and orphan datablocks are purged.
+        """
+        for key, obj in self._in_use:
+            self._hide(key, obj)
+        self._in_use = []
+
+        self._scene_count += 1
+        if self.purge_interval and self._scene_count % self.purge_interval == 0:
+            self._trim_idle()
+            purge_orphan_data()
+
+
+    def clear(self):
+        """
+        Removes every object owned by the pool.
+        """
+        self.recycle()
+        self.drop_idle()
+
+
+    def drop_idle(self):
+        """
+        Removes the idle objects and their meshes, e.g. so they aren't saved
+        with the .blend file of the current scene.
+        """
+        for objects in self._idle.values():
+            for obj in objects:
+                bpy.data.objects.remove(obj, do_unlink=True)
+        self._idle = {}
+        purge_orphan_data()
+
+
+    def _hide(self, key, obj):
+        bpy.context.scene.objects.unlink(obj)
+        self._idle.setdefault(key, []).append(obj)
+
+
+    def _trim_idle(self):
+        for objects in self._idle.values():
+            while len(objects) > self.max_idle_objects:
+                bpy.data.objects.remove(objects.pop(), do_unlink=True)
+
+
+    def _create_unit_primitive(self, kind, vertices):
+        if kind == "plane":
+            bpy.ops.mesh.primitive_plane_add(radius=1)
+        elif kind == "box":
+            bpy.ops.mesh.primitive_cube_add()
+        elif kind == "sphere":
+            bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=64, size=1)
+        elif kind == "cylinder":
+            bpy.ops.mesh.primitive_cylinder_add(radius=1, depth=2, vertices=vertices)
+        elif kind == "cone":
+            bpy.ops.mesh.primitive_cone_add(radius1=1, depth=2, vertices=vertices)
+        else:
+            raise ValueError(f"Unknown primitive kind: {kind}")
+
+        obj = bpy.context.object
+        obj.use_fake_user = True
+        return obj
@@ -8,6 +8,15 @@ config = SystemConfiguration()
 PrimitiveObjects = Enum('PrimitiveObjects', config.get("primitive_objects"))
 
 
+def sorted_primitives(primitives):
+    """
+    Returns the primitives of a set by name. A set of enum members iterates in
+    an order that depends on PYTHONHASHSEED, so choosing from it directly
+    gives a seeded scene different objects in every process.
+    """
+    return sorted(primitives, key=lambda primitive: primitive.name)
+
+
 class SceneGeneratorParams:
     
     def __init__(
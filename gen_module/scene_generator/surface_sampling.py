@@ -0,0 +1,361 @@
+# scene_generator/surface_sampling.py
+"""
+Samples ideal point clouds directly on the surfaces of the primitives that
+generate_scene() creates, without Blender or ray casting.
+
+Runs outside of Blender, e.g. for the same size sweep as main2():
+
+    python scene_generator/surface_sampling.py --output /data/sampled --start 0 --end 10000
+"""
+
+import os
+import sys
+import math
+import json
+import random
+import argparse
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from system_parameters import SystemConfiguration
+from scene_generator.scene_generator_params import SceneGeneratorParams, PrimitiveObjects, sorted_primitives
+
+config = SystemConfiguration()
+NUMBER_OF_VERTICES = config.get("vertices_for_round_objects", 32)
+
+
+def euler_to_matrix(rotation):
+    """
+    Returns the rotation matrix of a Blender XYZ euler rotation (radians).
+    """
+    x, y, z = rotation
+    cx, sx = math.cos(x), math.sin(x)
+    cy, sy = math.cos(y), math.sin(y)
+    cz, sz = math.cos(z), math.sin(z)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+
+def object_vertex_count(params):
+    """
+    Returns the number of base vertices of a cylinder, cone or pyramid.
+    Object params written before the "vertices" key existed are treated as round.
+    """
+    return params.get("vertices", NUMBER_OF_VERTICES)
+
+
+def _ring(radius, z, vertices):
+    # Blender places the first vertex of a circle on the +Y axis
+    phi = np.arange(vertices) * 2 * np.pi / vertices
+    return np.column_stack((radius * np.sin(phi), radius * np.cos(phi), np.full(vertices, z)))
+
+
+def local_triangles(params):
+    """
+    Returns the surface of a flat-faced primitive as triangles in local coordinates.
+
+    Parameters:
+        params (dict): Object params as returned by generate_scene().
+
+    Returns:
+        np.ndarray: Array of shape (T, 3, 3), with outward facing winding.
+    """
+    objtype = params["type"]
+    if objtype == "plane":
+        r = params["radius"]
+        quad = np.array([[-r, -r, 0], [r, -r, 0], [r, r, 0], [-r, r, 0]], dtype=np.float64)
+        return np.stack((quad[[0, 1, 2]], quad[[0, 2, 3]]))
+
+    if objtype == "box":
+        hx, hy, hz = [s / 2.0 for s in params["size"]]
+        corners = np.array([[sx * hx, sy * hy, sz * hz] for sx in (-1, 1) for sy in (-1, 1) for sz in (-1, 1)])
+        faces = [
+            (0, 1, 3, 2), (4, 6, 7, 5),  # -x, +x
+            (0, 4, 5, 1), (2, 3, 7, 6),  # -y, +y
+            (0, 2, 6, 4), (1, 5, 7, 3),  # -z, +z
+        ]
+        triangles = []
+        for a, b, c, d in faces:
+            triangles.append(corners[[a, b, c]])
+            triangles.append(corners[[a, c, d]])
+        return np.stack(triangles)
+
+    r = params["radius"]
+    h = params["depth"] / 2.0
+    n = object_vertex_count(params)
+    triangles = _round_triangles(objtype, r, h, n)
+
+    # The local origin lies inside every closed primitive, so outward facing
+    # triangles are the ones whose normal points away from it
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    inward = np.einsum("ij,ij->i", normals, triangles.mean(axis=1)) < 0
+    triangles[inward] = triangles[inward][:, [0, 2, 1]]
+    return triangles
+
+
+def _round_triangles(objtype, r, h, n):
+    bottom = _ring(r, -h, n)
+    nxt = np.roll(np.arange(n), -1)
+    bottom_center = np.tile([0.0, 0.0, -h], (n, 1))
+    base = np.stack((bottom_center, bottom[nxt], bottom), axis=1)
+
+    if objtype == "cylinder":
+        top = _ring(r, h, n)
+        top_center = np.tile([0.0, 0.0, h], (n, 1))
+        cap = np.stack((top_center, top, top[nxt]), axis=1)
+        side_1 = np.stack((bottom, bottom[nxt], top[nxt]), axis=1)
+        side_2 = np.stack((bottom, top[nxt], top), axis=1)
+        return np.concatenate((base, cap, side_1, side_2))
+
+    if objtype == "pyramid":
+        apex = np.tile([0.0, 0.0, h], (n, 1))
+        side = np.stack((bottom, bottom[nxt], apex), axis=1)
+        return np.concatenate((base, side))
+
+    raise ValueError(f"Unknown object type: {objtype}")
+
+
+def object_area(params):
+    """
+    Returns the surface area of a primitive.
+    """
+    if params["type"] == "sphere":
+        return 4 * np.pi * params["size"] ** 2
+    triangles = local_triangles(params)
+    return 0.5 * np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1).sum()
+
+
+def sample_object_surface(params, n, random_state):
+    """
+    Samples 'n' points uniformly (area weighted) on the surface of one primitive.
+
+    Returns:
+        tuple: Points and unit outward normals in world coordinates, both of shape (n, 3).
+    """
+    if params["type"] == "sphere":
+        normals = random_state.normal(size=(n, 3))
+        normals /= np.linalg.norm(normals, axis=1)[:, None]
+        points = normals * params["size"]
+    else:
+        triangles = local_triangles(params)
+        edges_1 = triangles[:, 1] - triangles[:, 0]
+        edges_2 = triangles[:, 2] - triangles[:, 0]
+        crosses = np.cross(edges_1, edges_2)
+        areas = 0.5 * np.linalg.norm(crosses, axis=1)
+        face_normals = crosses / np.maximum(2 * areas, 1e-300)[:, None]
+
+        faces = random_state.choice(len(triangles), size=n, p=areas / areas.sum())
+        u = random_state.random_sample(n)
+        v = random_state.random_sample(n)
+        flip = u + v > 1
+        u[flip] = 1 - u[flip]
+        v[flip] = 1 - v[flip]
+        points = triangles[faces, 0] + u[:, None] * edges_1[faces] + v[:, None] * edges_2[faces]
+        normals = face_normals[faces]
+
+    rotation = euler_to_matrix(params["rotation"]) if params["type"] != "sphere" else np.eye(3)
+    points = points @ rotation.T + np.asarray(params["location"], dtype=np.float64)
+    normals = normals @ rotation.T
+    return points, normals
+
+
+def sample_scene_points(object_params, n_points, random_state=None, viewpoint=None):
+    """
+    Samples a point cloud on all objects of a scene, distributing the points by surface area.
+
+    Parameters:
+        object_params (list): Object params as returned by generate_scene().
+        n_points (int): Number of points sampled before culling.
+        random_state (np.random.RandomState or None): Source of randomness.
+        viewpoint (sequence or None): If given, points on surfaces facing away
+            from the viewpoint are dropped. Planes are two-sided, so their
+            normals are flipped towards the viewpoint instead. Occlusion by
+            other objects is not taken into account.
+
+    Returns:
+        tuple: Points (N, 3), normals (N, 3) and object labels (N,), where a
+               label is the index of the object in 'object_params'.
+    """
+    if random_state is None:
+        random_state = np.random.RandomState()
+    if not object_params:
+        return np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0, dtype=np.int64)
+
+    areas = np.array([object_area(params) for params in object_params])
+    counts = random_state.multinomial(n_points, areas / areas.sum())
+
+    points, normals, labels = [], [], []
+    for label, (params, count) in enumerate(zip(object_params, counts)):
+        if count == 0:
+            continue
+        object_points, object_normals = sample_object_surface(params, count, random_state)
+        if viewpoint is not None:
+            facing = np.einsum("ij,ij->i", object_normals, np.asarray(viewpoint) - object_points)
+            if params["type"] == "plane":
+                object_normals[facing < 0] *= -1
+            else:
+                object_points = object_points[facing > 0]
+                object_normals = object_normals[facing > 0]
+        points.append(object_points)
+        normals.append(object_normals)
+        labels.append(np.full(len(object_points), label, dtype=np.int64))
+
+    if not points:
+        return np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0, dtype=np.int64)
+    return np.concatenate(points), np.concatenate(normals), np.concatenate(labels)
+
+
+def local_extents(params):
+    """
+    Returns the half extents of the local bounding box of a primitive.
+    """
+    if params["type"] == "sphere":
+        r = params["size"]
+        return np.array([r, r, r], dtype=np.float64)
+    if params["type"] == "box":
+        return np.asarray(params["size"], dtype=np.float64) / 2.0
+    if params["type"] == "plane":
+        return np.array([params["radius"], params["radius"], 0.0])
+    return np.array([params["radius"], params["radius"], params["depth"] / 2.0])
+
+
+def world_obb(params):
+    """
+    Returns the oriented bounding box of a primitive: its center, its axes as
+    the columns of a rotation matrix, and its half extents along them.
+    """
+    axes = euler_to_matrix(params["rotation"]) if params["type"] != "sphere" else np.eye(3)
+    return np.asarray(params["location"], dtype=np.float64), axes, local_extents(params)
+
+
+def world_aabb(params):
+    """
+    Returns the world-axis aligned bounding box of a primitive, computed from
+    the corners of its local bounding box like get_aabb() does in Blender.
+    """
+    extents = local_extents(params)
+    corners = np.array([[sx, sy, sz] for sx in (-1, 1) for sy in (-1, 1) for sz in (-1, 1)]) * extents
+    if params["type"] != "sphere":
+        corners = corners @ euler_to_matrix(params["rotation"]).T
+    corners += np.asarray(params["location"], dtype=np.float64)
+    return corners.min(axis=0), corners.max(axis=0)
+
+
+def draw_object_shape(obj: PrimitiveObjects, a: float, b: float, rng=random):
+    """
+    Draws the type and dimensions of an object with the same distributions as
+    the create_random_*() functions, for object sizes between a and b.
+
+    Returns:
+        dict: The "type" and dimension keys of the object params.
+    """
+    if obj.value == PrimitiveObjects.PLANE.value:
+        return {"type": "plane", "radius": (rng.random()*(b-a)+a)/2}
+    if obj.value == PrimitiveObjects.BOX.value:
+        return {"type": "box", "size": [rng.random()*(b-a)+a for _ in range(3)]}
+    if obj.value == PrimitiveObjects.SPHERE.value:
+        return {"type": "sphere", "size": (rng.random()*(b-a)+a)/2}
+
+    shape = {"radius": (rng.random()*(b-a)+a)/2, "depth": rng.random()*(b-a)+a}
+    if obj.value == PrimitiveObjects.CYLINDER.value:
+        shape.update(type="cylinder", vertices=NUMBER_OF_VERTICES)
+    else:
+        shape.update(type="pyramid", vertices={
+            PrimitiveObjects.CONE.value: NUMBER_OF_VERTICES,
+            PrimitiveObjects.TRIANGULAR_PYRAMID.value: 3,
+            PrimitiveObjects.RECTANGULAR_PYRAMID.value: 4,
+        }[obj.value])
+    return shape
+
+
+def sample_object_params(scene_params: SceneGeneratorParams, rng=random):
+    """
+    Draws object params with the same distributions as generate_scene(), but
+    without creating any Blender objects.
+
+    With allow_overlap set to False, the objects are placed by the placement
+    engine, like generate_scene() does.
+
+    Returns:
+        list: Object params in the format of generate_scene().
+    """
+    if not scene_params.allow_overlap:
+        # Imported here, as the placement engine builds on this module
+        from scene_generator.placement import PlacementEngine
+        return PlacementEngine(scene_params, rng=rng).place_objects()
+
+    number_of_objs = rng.randint(*scene_params.object_count_range)
+    objects = [rng.choice(sorted_primitives(scene_params.objects_to_generate)) for _ in range(number_of_objs)]
+    a, b = scene_params.object_size_range
+    mean, std = scene_params.object_height_distribution
+
+    object_params = []
+    for obj in objects:
+        location = [
+            rng.random()*scene_params.scene_size - scene_params.scene_size/2,
+            rng.random()*scene_params.scene_size - scene_params.scene_size/2,
+            mean + rng.uniform(-std, std)
+        ]
+        rotation = [rng.random()*math.pi*2 for _ in range(3)]
+        shape = draw_object_shape(obj, a, b, rng)
+        object_params.append(dict(type=shape.pop("type"), location=location, rotation=rotation, **shape))
+    return object_params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample ideal point clouds for the main2() size sweep.")
+    parser.add_argument("--output", required=True, help="Directory the sampled<n>.npz files are written to.")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=10_000)
+    parser.add_argument("--points", type=int, default=20_000, help="Points per scene before culling.")
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--cull", action="store_true", help="Drop points facing away from a random viewpoint.")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    rng = random.Random(args.seed)
+    random_state = np.random.RandomState(args.seed)
+    object_sizes = np.linspace(0.8/100, 1, 10_000)
+
+    for n in range(args.start, args.end):
+        obj_size = float(object_sizes[n])
+        scene_size = obj_size*2.5
+        ds = obj_size*0.5
+        sg_params = SceneGeneratorParams(
+            scene_size=scene_size,
+            objects_to_generate={
+                PrimitiveObjects.BOX,
+                PrimitiveObjects.CONE,
+                PrimitiveObjects.RECTANGULAR_PYRAMID,
+                PrimitiveObjects.CYLINDER,
+            },
+            object_count_range=(5, 8),
+            object_size_range=(obj_size - ds, obj_size + ds),
+            object_height_distribution=(0, scene_size/2),
+            allow_overlap=True
+        )
+        object_params = sample_object_params(sg_params, rng)
+
+        viewpoint = None
+        if args.cull:
+            viewpoint = [rng.random()*scene_size - scene_size/2 for _ in range(3)]
+        points, normals, labels = sample_scene_points(object_params, args.points, random_state, viewpoint)
+
+        np.savez(
+            os.path.join(args.output, f"sampled{n}.npz"),
+            points=points.astype(np.float32),
+            normals=normals.astype(np.float32),
+            labels=labels.astype(np.uint8),
+            viewpoint=np.asarray(viewpoint if viewpoint is not None else [np.nan] * 3),
+            object_params=json.dumps(object_params),
+        )
+
+
+if __name__ == "__main__":
+    main()
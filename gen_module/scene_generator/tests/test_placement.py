@@ -0,0 +1,123 @@
+# scene_generator/tests/test_placement.py
+
+import os
+import sys
+import math
+import random
+import unittest
+import subprocess
+import numpy as np
+from scene_generator.scene_generator_params import SceneGeneratorParams, PrimitiveObjects
+from scene_generator.surface_sampling import world_aabb, world_obb
+from scene_generator.clutter_params import ClutterParams
+from scene_generator.placement import OccupancyGrid, PlacementEngine, aabbs_overlap, obbs_overlap, scatter_objects
+
+
+class TestPlacement(unittest.TestCase):
+
+    def scene_params(self, count):
+        return SceneGeneratorParams(
+            scene_size=10,
+            objects_to_generate={PrimitiveObjects.BOX, PrimitiveObjects.CYLINDER, PrimitiveObjects.RECTANGULAR_PYRAMID},
+            object_count_range=(count, count),
+            object_size_range=(0.5, 1.5),
+            object_height_distribution=(0, 2),
+            allow_overlap=False
+        )
+
+    def test_seeded_scenes_do_not_depend_on_the_hash_seed(self):
+        # Sets of enum members iterate in an order that changes with PYTHONHASHSEED
+        script = (
+            "import random\n"
+            "from scene_generator.tests.test_placement import TestPlacement\n"
+            "from scene_generator.placement import PlacementEngine\n"
+            "params = TestPlacement().scene_params(12)\n"
+            "print([p['type'] for p in PlacementEngine(params, rng=random.Random(3)).place_objects()])\n"
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+        outputs = set()
+        for hash_seed in ("0", "1", "2", "3"):
+            env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+            outputs.add(subprocess.run([sys.executable, "-c", script], cwd=root, env=env, capture_output=True, text=True, check=True).stdout)
+        self.assertEqual(len(outputs), 1)
+
+    def test_grid_matches_brute_force(self):
+        rng = random.Random(1)
+        grid = OccupancyGrid(1.0)
+        aabbs = []
+        for _ in range(200):
+            low = [rng.uniform(-5, 5) for _ in range(3)]
+            aabb = (low, [v + rng.uniform(0.1, 1.5) for v in low])
+            expected = any(aabbs_overlap(aabb, other) for other in aabbs)
+            self.assertEqual(grid.overlaps(aabb), expected)
+            if not expected:
+                grid.insert(aabb)
+                aabbs.append(aabb)
+
+    def overlap(self, a, b):
+        return bool(obbs_overlap(a, *(np.array([value]) for value in b))[0])
+
+    def test_obb_overlap(self):
+        thin = np.array([1.0, 0.05, 0.05])
+        turned = world_obb(dict(type="box", location=[0, 0, 0], rotation=[0, 0, math.pi / 4], size=2 * thin))
+        # Parallel to the first one, the AABBs overlap but the boxes are 0.3 apart
+        shifted = world_obb(dict(type="box", location=[0.3, -0.3, 0], rotation=[0, 0, math.pi / 4], size=2 * thin))
+        self.assertTrue(aabbs_overlap(
+            world_aabb(dict(type="box", location=[0, 0, 0], rotation=[0, 0, math.pi / 4], size=2 * thin)),
+            world_aabb(dict(type="box", location=[0.3, -0.3, 0], rotation=[0, 0, math.pi / 4], size=2 * thin))))
+        self.assertFalse(self.overlap(turned, shifted))
+        # Crossing it
+        crossing = world_obb(dict(type="box", location=[0, 0, 0], rotation=[0, 0, -math.pi / 4], size=2 * thin))
+        self.assertTrue(self.overlap(turned, crossing))
+        # Only separated along an edge-edge cross product axis
+        edge = (np.zeros(3), np.eye(3), np.ones(3))
+        rotation = world_obb(dict(type="box", location=[0, 0, 0], rotation=[math.pi / 4, 0, math.pi / 4], size=[2, 2, 2]))[1]
+        self.assertFalse(self.overlap(edge, (np.array([2.3, 2.3, 0.0]), rotation, np.ones(3))))
+        self.assertTrue(self.overlap(edge, (np.array([1.5, 1.5, 0.0]), rotation, np.ones(3))))
+
+    def test_obb_overlap_matches_sampled_points(self):
+        rng = np.random.RandomState(0)
+        unit = np.stack(np.meshgrid(*[np.linspace(-1, 1, 9)] * 3), axis=-1).reshape(-1, 3)
+        for _ in range(200):
+            a, b = [world_obb(dict(type="box", location=rng.uniform(-1, 1, 3), rotation=rng.uniform(0, 2 * math.pi, 3),
+                                   size=rng.uniform(0.2, 2, 3))) for _ in range(2)]
+            points = a[0] + (unit * a[2]) @ a[1].T
+            local = (points - b[0]) @ b[1]
+            if np.any(np.all(np.abs(local) < b[2], axis=1)):
+                # A sample point of one box lies inside the other
+                self.assertTrue(self.overlap(a, b))
+
+    def test_requested_count_is_placed_without_overlap(self):
+        for seed in range(10):
+            object_params = PlacementEngine(self.scene_params(20), rng=random.Random(seed)).place_objects()
+            self.assertEqual(len(object_params), 20)
+            obbs = [world_obb(params) for params in object_params]
+            for i in range(len(obbs)):
+                for j in range(i):
+                    self.assertFalse(self.overlap(obbs[i], obbs[j]))
+
+    def test_full_scene_places_fewer_objects(self):
+        engine = PlacementEngine(self.scene_params(2000), maximum_attempts=1, candidates=4, rng=random.Random(0))
+        object_params = engine.place_objects()
+        self.assertLess(len(object_params), 2000)
+        self.assertEqual(len(object_params), len(engine.grid))
+
+    def test_clutter_avoids_scene_objects(self):
+        scene_params = self.scene_params(5)
+        targets = [world_aabb(params) for params in PlacementEngine(scene_params, rng=random.Random(0)).place_objects()]
+        clutter_params = ClutterParams(
+            objects_to_generate={PrimitiveObjects.BOX, PrimitiveObjects.CONE, PrimitiveObjects.SPHERE},
+            object_count_range=(2000, 2000),
+            object_size_range=(0.02, 0.1),
+            vertices=6
+        )
+        object_params, aabbs = scatter_objects(scene_params, clutter_params, occupied=targets, rng=random.Random(0))
+        self.assertGreater(len(object_params), 1500)
+        self.assertEqual(len(object_params), len(aabbs))
+        for aabb in aabbs:
+            self.assertFalse(any(aabbs_overlap(aabb, target) for target in targets))
+        self.assertTrue(all(params["vertices"] == 6 for params in object_params if params["type"] == "pyramid"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,49 @@
+# scene_generator/tests/test_surface_sampling.py
+
+import math
+import unittest
+import numpy as np
+from scene_generator import surface_sampling
+
+
+class TestSurfaceSampling(unittest.TestCase):
+
+    def setUp(self):
+        self.random_state = np.random.RandomState(2025)
+
+    def test_areas(self):
+        box = {"type": "box", "size": [1, 2, 3], "location": [0, 0, 0], "rotation": [0, 0, 0]}
+        sphere = {"type": "sphere", "size": 2, "location": [0, 0, 0], "rotation": [0, 0, 0]}
+        pyramid = {"type": "pyramid", "radius": 1, "depth": 2, "vertices": 4, "location": [0, 0, 0], "rotation": [0, 0, 0]}
+
+        self.assertAlmostEqual(surface_sampling.object_area(box), 22.0)
+        self.assertAlmostEqual(surface_sampling.object_area(sphere), 16 * math.pi)
+        self.assertAlmostEqual(surface_sampling.object_area(pyramid), 8.0)
+
+    def test_points_lie_on_rotated_box(self):
+        box = {"type": "box", "size": [1, 2, 3], "location": [1, -1, 2], "rotation": [0.3, 1.2, -0.7]}
+        points, normals = surface_sampling.sample_object_surface(box, 5000, self.random_state)
+
+        rotation = surface_sampling.euler_to_matrix(box["rotation"])
+        local = (points - box["location"]) @ rotation
+        distance_to_faces = np.min(np.abs(np.abs(local) - [0.5, 1.0, 1.5]), axis=1)
+        np.testing.assert_allclose(distance_to_faces, 0, atol=1e-9)
+        np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1)
+        # Normals point outwards
+        self.assertTrue(np.all(np.einsum("ij,ij->i", normals, points - box["location"]) > 0))
+
+    def test_points_are_area_weighted(self):
+        small = {"type": "sphere", "size": 1, "location": [-5, 0, 0], "rotation": [0, 0, 0]}
+        large = {"type": "sphere", "size": 2, "location": [5, 0, 0], "rotation": [0, 0, 0]}
+        _, _, labels = surface_sampling.sample_scene_points([small, large], 50000, self.random_state)
+        self.assertAlmostEqual(np.mean(labels == 1), 0.8, delta=0.01)
+
+    def test_visibility_culling(self):
+        sphere = {"type": "sphere", "size": 1, "location": [0, 0, 0], "rotation": [0, 0, 0]}
+        points, _, _ = surface_sampling.sample_scene_points([sphere], 10000, self.random_state, viewpoint=[100, 0, 0])
+        self.assertTrue(np.all(points[:, 0] > 0))
+        self.assertAlmostEqual(len(points) / 10000, 0.5, delta=0.03)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -133,19 +133,46 @@ def is_aabb_overlapping_with_any_aabb(in_aabb, drawn_aabbs):
     return False
 
 
-def create_random_plane(a, b, location, rotation):
-    radius = (random.random()*(b-a)+a)/2
+def purge_orphan_data(collections=("meshes", "materials", "actions")):
+    """
+    Removes datablocks that are no longer used by anything.
+
+    Removing an object with bpy.data.objects.remove() keeps its mesh in
+    bpy.data.meshes, so long runs slowly accumulate orphan data.
+
+    Parameters:
+        collections (tuple): Names of the bpy.data collections to purge.
+
+    Returns:
+        int: The number of removed datablocks.
+    """
+    removed = 0
+    for name in collections:
+        datablocks = getattr(bpy.data, name)
+        for block in list(datablocks):
+            if block.users == 0:
+                datablocks.remove(block)
+                removed += 1
+    return removed
+
+
+def create_plane(radius, location, rotation, pool=None):
+    if pool is not None:
+        pool.place("plane", location, rotation, (radius, radius, 1))
+        return
+
     bpy.ops.mesh.primitive_plane_add(
         radius=radius,
         location=location,
         rotation=rotation
     )
 
-    return radius
 
+def create_box(size, location, rotation, pool=None):
+    if pool is not None:
+        pool.place("box", location, rotation, [s / 2.0 for s in size])
+        return
 
-def create_random_box(a, b, location, rotation):
-    size = [random.random()*(b-a)+a for _ in range(3)]
     bpy.ops.mesh.primitive_cube_add(
         location=location,
         rotation=rotation
@@ -155,11 +182,12 @@ def create_random_box(a, b, location, rotation):
     box.scale[1] = size[1] / 2.0
     box.scale[2] = size[2] / 2.0
 
-    return size
 
+def create_sphere(size, location, pool=None):
+    if pool is not None:
+        pool.place("sphere", location, (0, 0, 0), (size, size, size))
+        return
 
-def create_random_sphere(a, b, location):
-    size = (random.random()*(b-a)+a)/2
     bpy.ops.mesh.primitive_uv_sphere_add(
         segments=64, 
         ring_count=64, 
@@ -167,12 +195,11 @@ def create_random_sphere(a, b, location):
         location=location
     )
 
-    return size
-    
 
-def create_random_cylinder(a, b, location, rotation, vertices):
-    radius = (random.random()*(b-a)+a)/2
-    depth = random.random()*(b-a)+a
+def create_cylinder(radius, depth, location, rotation, vertices, pool=None):
+    if pool is not None:
+        pool.place("cylinder", location, rotation, (radius, radius, depth/2), vertices=vertices)
+        return
 
     bpy.ops.mesh.primitive_cylinder_add(
         radius=radius,
@@ -182,12 +209,11 @@ def create_random_cylinder(a, b, location, rotation, vertices):
         rotation=rotation
     )
 
-    return radius, depth
-
 
-def create_random_pyramid(a, b, location, rotation, vertices):
-    radius = (random.random()*(b-a)+a)/2
-    depth = random.random()*(b-a)+a
+def create_pyramid(radius, depth, location, rotation, vertices, pool=None):
+    if pool is not None:
+        pool.place("cone", location, rotation, (radius, radius, depth/2), vertices=vertices)
+        return
 
     bpy.ops.mesh.primitive_cone_add(
         radius1=radius,
@@ -197,4 +223,54 @@ def create_random_pyramid(a, b, location, rotation, vertices):
         rotation=rotation
     )
 
+
+def create_object(params, pool=None):
+    """
+    Creates the object described by object params in the format of generate_scene().
+    The new object is bpy.context.object afterwards.
+    """
+    location, rotation = params["location"], params["rotation"]
+    if params["type"] == "plane":
+        create_plane(params["radius"], location, rotation, pool=pool)
+    elif params["type"] == "box":
+        create_box(params["size"], location, rotation, pool=pool)
+    elif params["type"] == "sphere":
+        create_sphere(params["size"], location, pool=pool)
+    elif params["type"] == "cylinder":
+        create_cylinder(params["radius"], params["depth"], location, rotation, params["vertices"], pool=pool)
+    elif params["type"] == "pyramid":
+        create_pyramid(params["radius"], params["depth"], location, rotation, params["vertices"], pool=pool)
+    else:
+        raise ValueError(f"Unknown object type: {params['type']}")
+
+
+def create_random_plane(a, b, location, rotation, pool=None):
+    radius = (random.random()*(b-a)+a)/2
+    create_plane(radius, location, rotation, pool=pool)
+    return radius
+
+
+def create_random_box(a, b, location, rotation, pool=None):
+    size = [random.random()*(b-a)+a for _ in range(3)]
+    create_box(size, location, rotation, pool=pool)
+    return size
+
+
+def create_random_sphere(a, b, location, pool=None):
+    size = (random.random()*(b-a)+a)/2
+    create_sphere(size, location, pool=pool)
+    return size
+    
+
+def create_random_cylinder(a, b, location, rotation, vertices, pool=None):
+    radius = (random.random()*(b-a)+a)/2
+    depth = random.random()*(b-a)+a
+    create_cylinder(radius, depth, location, rotation, vertices, pool=pool)
+    return radius, depth
+
+
+def create_random_pyramid(a, b, location, rotation, vertices, pool=None):
+    radius = (random.random()*(b-a)+a)/2
+    depth = random.random()*(b-a)+a
+    create_pyramid(radius, depth, location, rotation, vertices, pool=pool)
     return radius, depth